@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Accommodation, Application
+from django.utils import timezone
+from . import fulltext
+from .models import User, Accommodation, AccommodationAmenity, Amenity, Application, ContactMessage, Job
 
 
 @admin.register(User)
@@ -15,13 +17,32 @@ class CustomUserAdmin(UserAdmin):
     )
 
 
+class AccommodationAmenityInline(admin.TabularInline):
+    model = AccommodationAmenity
+    autocomplete_fields = ('amenity',)
+    extra = 0
+
+
+@admin.register(Amenity)
+class AmenityAdmin(admin.ModelAdmin):
+    list_display = ('name', 'key')
+    search_fields = ('name', 'key')
+
+
 @admin.register(Accommodation)
 class AccommodationAdmin(admin.ModelAdmin):
+    inlines = (AccommodationAmenityInline,)
     list_display = ('title', 'type', 'location', 'price', 'status', 'religious_preference', 'created_at')
     list_filter = ('type', 'status', 'religious_preference', 'created_at')
     search_fields = ('title', 'location', 'address', 'description')
     readonly_fields = ('created_at', 'updated_at')
 
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index instead of icontains over every TextField
+        if not search_term:
+            return queryset, False
+        return fulltext.apply_search(queryset, search_term), False
+
 
 @admin.register(Application)
 class ApplicationAdmin(admin.ModelAdmin):
@@ -30,3 +51,25 @@ class ApplicationAdmin(admin.ModelAdmin):
     search_fields = ('user_name', 'user_email', 'accommodation__title')
     readonly_fields = ('created_at',)
 
+
+
+@admin.register(ContactMessage)
+class ContactMessageAdmin(admin.ModelAdmin):
+    list_display = ('name', 'email', 'subject', 'created_at')
+    search_fields = ('name', 'email', 'subject')
+    readonly_fields = ('created_at',)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'updated_at')
+    list_filter = ('status', 'name')
+    search_fields = ('idempotency_key',)
+    readonly_fields = ('created_at', 'updated_at', 'locked_at', 'locked_by', 'last_error')
+    actions = ['retry_now']
+
+    @admin.action(description='Queue selected jobs to run again now')
+    def retry_now(self, request, queryset):
+        queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, run_at=timezone.now(), attempts=0, locked_at=None, locked_by='',
+        )
@@ -0,0 +1,108 @@
+"""
+Interned amenity names
+
+Amenities are stored once in :class:`Amenity`, keyed by a canonical form of
+the name (case, spacing and punctuation folded, so "WiFi", "wifi" and
+"Wi-Fi " are one amenity), and linked to listings through
+:class:`AccommodationAmenity`. Filters and counts are joins on the
+``(amenity, accommodation)`` index instead of scans over JSON lists.
+
+Writes that replace a listing's amenities go through :func:`set_amenities`
+or, for bulk paths, :func:`set_many`, which intern all names of a batch with
+one lookup and one INSERT.
+"""
+import re
+
+from django.db.models import Count
+from django.utils import timezone
+
+from . import cache
+from .models import Accommodation, AccommodationAmenity, Amenity
+
+MAX_AMENITY_FILTERS = 10
+
+
+def canonical_key(name):
+    """The form names are interned on: casefolded, letters and digits only"""
+    return re.sub(r'[\W_]+', '', str(name).casefold())[:100]
+
+
+def display_name(name):
+    return ' '.join(str(name).split())[:100]
+
+
+def parse(value, limit=None):
+    """Amenity names from a comma-separated string, one per canonical key"""
+    names = {}
+    for name in (value or '').split(','):
+        key = canonical_key(name)
+        if key:
+            names.setdefault(key, display_name(name))
+    return list(names.values())[:limit]
+
+
+def intern(names, using='default'):
+    """Return ``{key: amenity_id}`` for ``names``, creating the missing amenities"""
+    wanted = {}
+    for name in names:
+        key = canonical_key(name)
+        if key:
+            wanted.setdefault(key, display_name(name))
+    if not wanted:
+        return {}
+    amenities = Amenity.objects.using(using)
+    interned = dict(amenities.filter(key__in=wanted).values_list('key', 'pk'))
+    missing = [Amenity(key=key, name=name) for key, name in wanted.items() if key not in interned]
+    if missing:
+        # Another request may intern the same name concurrently
+        amenities.bulk_create(missing, ignore_conflicts=True)
+        interned.update(amenities.filter(key__in=[amenity.key for amenity in missing]).values_list('key', 'pk'))
+    return interned
+
+
+def set_many(names_by_accommodation, using='default'):
+    """Replace the amenities of several accommodations: ``{accommodation_id: [name, ...]}``"""
+    if not names_by_accommodation:
+        return
+    interned = intern(
+        (name for names in names_by_accommodation.values() for name in names), using=using
+    )
+    rows = []
+    for accommodation_id, names in names_by_accommodation.items():
+        amenity_ids = dict.fromkeys(interned[key] for key in map(canonical_key, names) if key)
+        rows.extend(
+            AccommodationAmenity(accommodation_id=accommodation_id, amenity_id=amenity_id)
+            for amenity_id in amenity_ids
+        )
+    links = AccommodationAmenity.objects.using(using)
+    links.filter(accommodation_id__in=list(names_by_accommodation)).delete()
+    links.bulk_create(rows, batch_size=1000)
+    # Amenities are part of a listing, so its ETag / Last-Modified (derived
+    # from updated_at) must change with them
+    Accommodation.objects.using(using).filter(pk__in=list(names_by_accommodation)).update(updated_at=timezone.now())
+    cache.bump(cache.ACCOMMODATIONS)
+
+
+def set_amenities(accommodation, names):
+    """Replace the amenities of one saved accommodation"""
+    set_many({accommodation.pk: list(names)}, using=accommodation._state.db or 'default')
+
+
+def filter_amenities(queryset, names):
+    """Restrict ``queryset`` to accommodations that have every amenity in ``names``"""
+    for key in dict.fromkeys(map(canonical_key, names)):
+        if key:
+            queryset = queryset.filter(
+                pk__in=AccommodationAmenity.objects.filter(amenity__key=key).values('accommodation_id')
+            )
+    return queryset
+
+
+def amenity_counts(queryset):
+    """``[(name, key, count), ...]`` for the amenities of ``queryset``, most common first"""
+    return list(
+        Amenity.objects.filter(accommodation_rows__accommodation__in=queryset.order_by().values('pk'))
+        .annotate(n=Count('accommodation_rows'))
+        .order_by('-n', 'name')
+        .values_list('name', 'key', 'n')
+    )
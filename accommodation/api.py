@@ -0,0 +1,286 @@
+"""
+Versioned JSON API (``/api/v1/``)
+
+Read-only endpoints for accommodations, applications and users:
+
+* list endpoints are filtered with query parameters and keyset paginated
+  (``?cursor=`` / ``next_cursor``, see :mod:`accommodation.pagination`);
+* ``?fields=title,price`` returns a sparse fieldset and only loads those
+  columns from the database (``QuerySet.only()``);
+* every response carries a strong ``ETag`` derived from ``updated_at``, and
+  single objects a ``Last-Modified`` header too. Conditional requests
+  (``If-None-Match`` / ``If-Modified-Since``) are answered with 304 before
+  anything is serialized.
+
+Authentication uses the regular session; unauthenticated requests get a 401
+instead of a redirect to the login page.
+"""
+import hashlib
+from functools import wraps
+
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from . import images
+from .models import Accommodation, Application, User
+from .pagination import InvalidCursor, paginate_keyset
+from .search import SORT_ORDERINGS, ListingQuery
+
+API_PAGE_SIZE = 20
+MAX_API_PAGE_SIZE = 100
+
+
+class ApiError(Exception):
+    """A client error reported as a JSON body with ``status``"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def api_view(admin_only=False):
+    """Session authentication, JSON errors and GET/HEAD only"""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                response = JsonResponse({'error': 'Method not allowed.'}, status=405)
+                response['Allow'] = 'GET, HEAD'
+                return response
+            if not request.user.is_authenticated:
+                return JsonResponse({'error': 'Authentication required.'}, status=401)
+            if admin_only and request.user.role != 'admin':
+                return JsonResponse({'error': 'Admin access required.'}, status=403)
+            try:
+                response = view_func(request, *args, **kwargs)
+            except ApiError as exc:
+                return JsonResponse({'error': exc.message}, status=exc.status)
+            # Responses depend on the session, so shared caches must not reuse
+            # them, but clients may keep them and revalidate with the ETag
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
+
+
+class Resource:
+    """How a model is exposed through the API"""
+    model = None
+    # Public fields in output order; foreign keys are rendered as ids
+    fields = ()
+    ordering = ('-created_at', '-id')
+    # Query parameter -> model field filtered for equality
+    filters = {}
+
+    def get_queryset(self, request):
+        return self.model.objects.all()
+
+    def filter_queryset(self, queryset, params):
+        for param, field_name in self.filters.items():
+            value = params.get(param)
+            if value:
+                self.check_value(param, field_name, value)
+                queryset = queryset.filter(**{field_name: value})
+        return queryset
+
+    def get_ordering(self, params):
+        return self.ordering
+
+    def check_value(self, param, field_name, value):
+        field = self.model._meta.get_field(field_name)
+        if field.choices and value not in {choice for choice, _ in field.choices}:
+            raise ApiError(f'Invalid value for {param}: {value!r}.')
+        if field.is_relation and not value.isdigit():
+            raise ApiError(f'{param} must be an id.')
+
+    def selected_fields(self, params):
+        """The fields requested with ``?fields=``, all public fields by default"""
+        requested = params.get('fields')
+        if not requested:
+            return self.fields
+        names = tuple(dict.fromkeys(name.strip() for name in requested.split(',') if name.strip()))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(f'Unknown fields: {", ".join(unknown)}.')
+        return names
+
+    def only(self, queryset, fields, ordering=None):
+        # Ordering columns feed the cursor and updated_at the validators
+        columns = {'id', 'updated_at', *fields, *(name.lstrip('-') for name in ordering or self.ordering)}
+        # Many-to-many fields are fetched with one extra query per page
+        related = {name for name in fields if self.model._meta.get_field(name).many_to_many}
+        return queryset.only(*columns - related).prefetch_related(*related)
+
+    def serialize(self, obj, fields):
+        data = {'id': obj.pk}
+        for name in fields:
+            field = self.model._meta.get_field(name)
+            if field.many_to_many:
+                data[name] = [str(related) for related in getattr(obj, name).all()]
+            else:
+                data[name] = getattr(obj, field.attname)
+        return data
+
+    def list(self, request):
+        params = request.GET
+        fields = self.selected_fields(params)
+        try:
+            page_size = min(max(int(params.get('page_size', API_PAGE_SIZE)), 1), MAX_API_PAGE_SIZE)
+        except ValueError:
+            raise ApiError('page_size must be a number.')
+
+        queryset = self.filter_queryset(self.get_queryset(request), params)
+        ordering = self.get_ordering(params)
+        try:
+            page = paginate_keyset(
+                self.only(queryset, fields, ordering), ordering, cursor=params.get('cursor'), page_size=page_size
+            )
+        except InvalidCursor:
+            raise ApiError('Invalid cursor.')
+
+        # No Last-Modified: deleting a row would not move the newest
+        # updated_at of a page, while it does change the ETag
+        validators = [(obj.pk, obj.updated_at) for obj in page]
+        etag = _etag(self.model._meta.label, fields, page.next_cursor, validators)
+        not_modified = _not_modified(request, etag, None)
+        if not_modified:
+            return not_modified
+
+        response = JsonResponse({
+            'results': [self.serialize(obj, fields) for obj in page],
+            'next_cursor': page.next_cursor,
+        })
+        return _with_validators(response, etag, None)
+
+    def detail(self, request, pk):
+        fields = self.selected_fields(request.GET)
+        obj = self.only(self.get_queryset(request), fields).filter(pk=pk).first()
+        if obj is None:
+            raise ApiError('Not found.', status=404)
+
+        etag = _etag(self.model._meta.label, fields, obj.pk, obj.updated_at)
+        not_modified = _not_modified(request, etag, obj.updated_at)
+        if not_modified:
+            return not_modified
+        return _with_validators(JsonResponse(self.serialize(obj, fields)), etag, obj.updated_at)
+
+
+class AccommodationResource(Resource):
+    model = Accommodation
+    fields = (
+        'title', 'description', 'type', 'location', 'address', 'price',
+        'religious_preference', 'status', 'bedrooms', 'bathrooms', 'amenities',
+        'images', 'contact_email', 'contact_phone', 'latitude', 'longitude',
+        'created_at', 'updated_at',
+    )
+    def filter_queryset(self, queryset, params):
+        # Same semantics as the listing page ("Any" listings match every preference)
+        listing = ListingQuery.from_params(params)
+        for param in ('type', 'religious_preference', 'status'):
+            if params.get(param):
+                self.check_value(param, param, params[param])
+        return super().filter_queryset(queryset & listing.queryset(), params)
+
+    def serialize(self, obj, fields):
+        data = super().serialize(obj, fields)
+        if 'images' in data:
+            data['images'] = images.manifest_urls(data['images'])
+        return data
+
+    def get_ordering(self, params):
+        sort = params.get('sort')
+        if sort and sort not in SORT_ORDERINGS:
+            raise ApiError(f'Invalid value for sort: {sort!r}.')
+        return SORT_ORDERINGS.get(sort, self.ordering)
+
+
+class ApplicationResource(Resource):
+    model = Application
+    fields = (
+        'accommodation', 'user', 'user_name', 'user_email', 'user_phone',
+        'message', 'status', 'created_at', 'updated_at',
+    )
+    filters = {'status': 'status', 'accommodation': 'accommodation', 'user': 'user'}
+
+    def get_queryset(self, request):
+        # Regular users only ever see their own applications
+        if request.user.role == 'admin':
+            return Application.objects.all()
+        return Application.objects.filter(user=request.user)
+
+
+class UserResource(Resource):
+    model = User
+    fields = (
+        'username', 'email', 'first_name', 'last_name', 'phone', 'role',
+        'religious_preference', 'is_active', 'date_joined', 'updated_at',
+    )
+    ordering = ('-date_joined', '-id')
+    filters = {'role': 'role', 'religious_preference': 'religious_preference'}
+
+
+def _etag(*parts):
+    return '"%s"' % hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+
+
+def _timestamp(value):
+    return int(value.timestamp()) if value else None
+
+
+def _with_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(_timestamp(last_modified))
+    return response
+
+
+def _not_modified(request, etag, last_modified):
+    """A 304/412 response if the request's preconditions allow one, else None"""
+    response = get_conditional_response(request, etag=etag, last_modified=_timestamp(last_modified))
+    if response is not None and response.status_code == 304:
+        _with_validators(response, etag, last_modified)
+    return response
+
+
+accommodations = AccommodationResource()
+applications = ApplicationResource()
+users = UserResource()
+
+
+@api_view()
+def accommodation_list(request):
+    """Accommodations, filterable by type, religious_preference, location and status"""
+    return accommodations.list(request)
+
+
+@api_view()
+def accommodation_detail(request, accommodation_id):
+    """A single accommodation"""
+    return accommodations.detail(request, accommodation_id)
+
+
+@api_view()
+def application_list(request):
+    """Applications (all for admins, own for users), filterable by status, accommodation and user"""
+    return applications.list(request)
+
+
+@api_view()
+def application_detail(request, application_id):
+    """A single application"""
+    return applications.detail(request, application_id)
+
+
+@api_view(admin_only=True)
+def user_list(request):
+    """Users, filterable by role and religious_preference"""
+    return users.list(request)
+
+
+@api_view(admin_only=True)
+def user_detail(request, user_id):
+    """A single user"""
+    return users.detail(request, user_id)
@@ -5,3 +5,6 @@ class AccommodationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accommodation'
 
+    def ready(self):
+        from . import profiling, signals, tasks  # noqa: F401
+        profiling.install()
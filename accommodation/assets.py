@@ -0,0 +1,98 @@
+"""
+Minified CSS bundles
+
+Stylesheets are kept as readable sources under ``static/css/`` (shared
+layout in ``base.css``, per-page styles in ``pages/``). ``CSS_BUNDLES`` maps
+each bundle the templates link to, such as ``css/site.min.css``, to the
+sources it concatenates. :class:`BundleFinder` is a staticfiles finder that
+builds the bundles into ``CSS_BUNDLE_ROOT`` on demand, rebuilding one when a
+source is newer. The development server and WhiteNoise's finder mode serve
+them like any other static file. ``collectstatic`` picks them up and
+``CompressedManifestStaticFilesStorage`` gives them content-hashed names and
+gzip (and, with the ``Brotli`` package, ``.br``) copies. Hashed names are
+served with a far-future, immutable Cache-Control header.
+"""
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.finders import BaseFinder
+from django.core.checks import Error
+from django.core.files.storage import FileSystemStorage
+
+_STRINGS = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')''')
+_STRINGS_OR_COMMENTS = re.compile(_STRINGS.pattern + r'|/\*.*?\*/', re.S)
+_SPACE_AROUND = re.compile(r'\s*([{};,>])\s*')
+_SPACE_AFTER_COLON = re.compile(r':\s+')
+
+
+def minify_css(css):
+    """Strip comments and insignificant whitespace, leaving string literals alone"""
+    # Comments become whitespace; "/*" inside a string is not a comment
+    parts = _STRINGS.split(_STRINGS_OR_COMMENTS.sub(lambda match: match.group(1) or ' ', css))
+    for i in range(0, len(parts), 2):
+        code = ' '.join(parts[i].split())
+        code = _SPACE_AROUND.sub(r'\1', code)
+        parts[i] = _SPACE_AFTER_COLON.sub(':', code).replace(';}', '}')
+    return ''.join(parts).strip() + '\n'
+
+
+def bundle_sources(name):
+    """Absolute paths of the sources of bundle ``name``, in order"""
+    paths = []
+    for source in settings.CSS_BUNDLES[name]:
+        if source in settings.CSS_BUNDLES:
+            raise ValueError(f'CSS bundle {name} cannot include another bundle ({source})')
+        path = finders.find(source)
+        if path is None:
+            raise FileNotFoundError(f'CSS bundle {name}: static file {source} not found')
+        paths.append(path)
+    return paths
+
+
+def build_bundle(name):
+    """Write bundle ``name`` to ``CSS_BUNDLE_ROOT`` if it is missing or stale; returns its path"""
+    target = os.path.join(settings.CSS_BUNDLE_ROOT, name)
+    sources = bundle_sources(name)
+    if os.path.exists(target) and os.path.getmtime(target) >= max(map(os.path.getmtime, sources)):
+        return target
+    css = []
+    for path in sources:
+        with open(path, encoding='utf-8') as source:
+            css.append(minify_css(source.read()))
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    # Written aside and renamed so concurrent workers never read half a file
+    partial = f'{target}.{os.getpid()}.tmp'
+    with open(partial, 'w', encoding='utf-8') as output:
+        output.write(''.join(css))
+    os.replace(partial, target)
+    return target
+
+
+class BundleFinder(BaseFinder):
+    """Find (building them first) the bundles listed in ``CSS_BUNDLES``"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.storage = FileSystemStorage(location=settings.CSS_BUNDLE_ROOT)
+
+    def check(self, **kwargs):
+        errors = []
+        for name in settings.CSS_BUNDLES:
+            try:
+                bundle_sources(name)
+            except (ValueError, FileNotFoundError) as exc:
+                errors.append(Error(str(exc), id='accommodation.E001'))
+        return errors
+
+    def find(self, path, all=False):
+        if path not in settings.CSS_BUNDLES:
+            return []
+        target = build_bundle(path)
+        return [target] if all else target
+
+    def list(self, ignore_patterns):
+        for name in settings.CSS_BUNDLES:
+            build_bundle(name)
+            yield name, self.storage
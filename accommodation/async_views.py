@@ -0,0 +1,195 @@
+"""
+Async versions of the read-heavy views
+
+Served when ``ASYNC_VIEWS`` is enabled (see urls.py), ideally under an ASGI
+server (``gunicorn -c gunicorn_asgi.conf.py``). Each view starts its
+independent queries together with ``asyncio.gather`` instead of running them
+one after another, so a page costs roughly its slowest query rather than the
+sum of all of them.
+
+Django's own async ORM methods (``aget()``, ``async for``) hand every query to
+a single thread per request, which would serialize the fan-out again. The
+query functions are therefore run with ``thread_sensitive=False``: each one
+gets a worker thread and, with it, its own database connection, released
+through ``close_old_connections()`` according to ``DB_CONNECTION_MODE`` (size
+``DB_POOL_MAX_SIZE`` for the fan-out when using the in-process pool). Set
+``ASYNC_CONCURRENT_QUERIES=False`` to keep all queries on the request's
+connection, e.g. when the data lives in an uncommitted test transaction.
+"""
+import asyncio
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.db import close_old_connections
+from django.http import Http404
+from django.shortcuts import render
+
+from . import cache, dashboard, facets, geo
+from .models import Application, User
+from .pagination import InvalidCursor
+from .search import ListingQuery, search_listings
+from .views import _page_number, dashboard_fragments, fragment_cached, is_admin
+
+
+def _query(func, *args, **kwargs):
+    """Awaitable running the blocking ORM call ``func`` off the event loop"""
+    def call():
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if settings.ASYNC_CONCURRENT_QUERIES:
+                close_old_connections()
+
+    return sync_to_async(call, thread_sensitive=not settings.ASYNC_CONCURRENT_QUERIES)()
+
+
+async def _render(request, template_name, context):
+    return await sync_to_async(render)(request, template_name, context)
+
+
+def async_login_required(view_func):
+    """``login_required`` for coroutine views"""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        # Resolve the lazy user once so templates never hit the DB from the loop
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def async_admin_required(view_func):
+    """``login_required`` + ``user_passes_test(is_admin)`` for coroutine views"""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        request.user = await request.auser()
+        if not is_admin(request.user):
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def _listing_page(query, cursor, page_number, role):
+    try:
+        page = cache.get_or_set(
+            (cache.ACCOMMODATIONS,),
+            ('listing', query.key(), cursor, page_number),
+            lambda: search_listings(query, cursor=cursor, page=page_number),
+        )
+    except InvalidCursor:
+        # Stale or tampered cursor - start again from the first page
+        cursor, page_number = None, 1
+        page = search_listings(query)
+    grid_cache_key = cache.make_key((cache.ACCOMMODATIONS,), 'grid', query.key(), cursor, page_number, role)
+    return page, grid_cache_key
+
+
+@async_login_required
+async def accommodations(request):
+    """Accommodation listing page with filters"""
+    query = ListingQuery.from_params(request.GET)
+    (page, grid_cache_key), facet_options = await asyncio.gather(
+        _query(_listing_page, query, request.GET.get('cursor'), _page_number(request), request.user.role),
+        _query(facets.facet_options, query),
+    )
+
+    context = {
+        'accommodations': page,
+        'page': page,
+        'grid_cache_key': grid_cache_key,
+        'grid_cache_timeout': settings.LISTING_CACHE_TIMEOUT,
+        'next_page_query': query.next_page_querystring(page),
+        'first_page_query': query.querystring(),
+        'is_first_page': not (request.GET.get('cursor') or _page_number(request) > 1),
+        'religious_filter': query.religious_preference,
+        'type_filter': query.type,
+        'location_search': query.location,
+        'keywords': query.keywords,
+        'listing': query,
+        'sort_choices': query.sort_choices,
+        'radius_choices': geo.RADIUS_CHOICES,
+        'facets': facet_options,
+    }
+    return await _render(request, 'accommodation/accommodations.html', context)
+
+
+def _applications_for(user_id):
+    return list(
+        Application.objects.filter(user_id=user_id)
+        .select_related('accommodation')
+        .order_by('-created_at')
+    )
+
+
+@async_login_required
+async def my_applications(request):
+    """User dashboard - view their own applications"""
+    # Status counts are denormalized onto the user row (see counters.py)
+    applications_list = await _query(_applications_for, request.user.pk)
+    context = {
+        'applications': applications_list,
+        'pending_count': request.user.pending_applications,
+        'approved_count': request.user.approved_applications,
+        'rejected_count': request.user.rejected_applications,
+        'total_count': request.user.total_applications,
+    }
+    return await _render(request, 'accommodation/my_applications.html', context)
+
+
+def _keyset_page(fetch, cursor):
+    try:
+        return fetch(cursor=cursor)
+    except InvalidCursor:
+        return fetch()
+
+
+@async_admin_required
+async def admin_dashboard(request):
+    """Admin dashboard"""
+    active_section = request.GET.get('section', 'accommodations')
+    if active_section not in ('accommodations', 'applications', 'users'):
+        active_section = 'accommodations'
+    fragments = dashboard_fragments()
+    users = dashboard.recent_users()
+    # Fetched alongside the rest only when the users fragment will render;
+    # otherwise the lazy queryset is evaluated only if the fragment expires
+    users_cached = fragment_cached('admin_users', fragments['users_cache_key'], active_section)
+    stats, accommodations_page, applications_page, *fetched_users = await asyncio.gather(
+        _query(cache.get_or_set, cache.NAMESPACES, ('dashboard_stats',), dashboard.headline_stats),
+        _query(_keyset_page, dashboard.recent_accommodations, request.GET.get('accommodations_cursor')),
+        _query(_keyset_page, dashboard.recent_applications, request.GET.get('applications_cursor')),
+        *([] if users_cached else [_query(list, users)]),
+    )
+
+    context = {
+        'stats': stats,
+        'accommodations': accommodations_page,
+        'applications': applications_page,
+        'users': fetched_users[0] if fetched_users else users,
+        'pending_count': stats['pending_applications'],
+        'total_users': stats['total_users'],
+        'active_section': active_section,
+        **fragments,
+    }
+    return await _render(request, 'accommodation/admin.html', context)
+
+
+@async_admin_required
+async def view_user(request, user_id):
+    """View user details and their applications"""
+    # The applications only need the id from the URL, so both queries start together
+    user, applications_page = await asyncio.gather(
+        _query(User.objects.filter(id=user_id).first),
+        _query(_keyset_page, partial(dashboard.user_applications, user_id), request.GET.get('cursor')),
+    )
+    if user is None:
+        raise Http404('No User matches the given query.')
+    # Counts come from the denormalized counters on the user row
+    return await _render(request, 'accommodation/view_user.html', {
+        'user_obj': user,
+        'applications': applications_page,
+        'is_first_page': not request.GET.get('cursor'),
+    })
@@ -0,0 +1,48 @@
+"""
+Authentication by email address
+
+Users sign in with their email address. :class:`EmailBackend` finds the
+account with one query on ``lower(email)``, which the ``user_email_ci_unique``
+index covers, instead of looking the user up by email and then again by
+username. Identifiers without an ``@`` are treated as usernames, so the
+Django admin login keeps working.
+
+Passwords are checked with ``User.check_password()``, which re-hashes the
+password with the preferred hasher (``PASSWORD_HASHER``, see hashers.py)
+whenever the stored hash uses another algorithm or other cost parameters.
+"""
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Value
+from django.db.models.functions import Lower
+
+from .models import User
+
+
+def find_user(identifier):
+    """The user with email (ignoring case) or username ``identifier``, or None"""
+    if not identifier:
+        return None
+    users = User._default_manager.all()
+    if '@' in identifier:
+        users = users.exclude(email='').alias(email_lower=Lower('email')).filter(
+            email_lower=Lower(Value(identifier.strip()))
+        )
+    else:
+        users = users.filter(username=identifier)
+    return users.first()
+
+
+class EmailBackend(ModelBackend):
+    """ModelBackend that signs users in by email address"""
+
+    def authenticate(self, request, username=None, password=None, email=None, **kwargs):
+        if password is None:
+            return None
+        user = find_user(email or username or kwargs.get(User.USERNAME_FIELD))
+        if user is None:
+            # Hash anyway so unknown addresses take as long as wrong passwords
+            User().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
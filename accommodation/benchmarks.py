@@ -0,0 +1,334 @@
+"""
+Synthetic datasets and per-route measurements
+
+:func:`seed` fills the database with a reproducible dataset of any size
+using ``bulk_create`` in batches. The signal receivers do not run for bulk
+inserts, so it writes the derived data itself: the status counters are
+computed while the applications are generated, and the full-text index,
+amenity links and cache versions are refreshed batch by batch.
+
+:func:`route_requests` turns every named pattern in ``accommodation.urls``
+into a GET request against the seeded rows, made as the kind of user the
+page is meant for. The query-count regression tests and the
+``benchmark_views`` command both use it, so a view added to the URLconf is
+measured without further changes and fails the tests until it has a query
+budget in :data:`QUERY_BUDGETS`.
+"""
+import random
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from decimal import Decimal
+from importlib import import_module
+
+from django.contrib.auth.hashers import make_password
+from django.db import connections, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+
+from . import amenities, cache, fulltext, geo
+from .models import APPLICATION_COUNTER_FIELDS, Accommodation, AccommodationImage, Application, User
+from .profiling import percentiles
+
+LOCATIONS = ('Karachi', 'Lahore', 'Islamabad', 'Peshawar', 'Quetta', 'Multan', 'Faisalabad', 'Hyderabad')
+# City centres (as in data/gazetteer.csv); seeded listings are scattered
+# around them with a spread of about 5 km
+CITY_CENTRES = {
+    'Karachi': (24.8607, 67.0011), 'Lahore': (31.5204, 74.3587), 'Islamabad': (33.6844, 73.0479),
+    'Peshawar': (34.0151, 71.5249), 'Quetta': (30.1798, 66.9750), 'Multan': (30.1575, 71.5249),
+    'Faisalabad': (31.4504, 73.1350), 'Hyderabad': (25.3960, 68.3578),
+}
+LOCATION_SPREAD_DEGREES = 0.045
+AMENITY_POOL = ('WiFi', 'Parking', 'Air Conditioning', 'Laundry', 'Gym', 'Kitchen', 'Security', 'Generator')
+APPLICATION_STATUSES = tuple(status for status, _ in Application.STATUS_CHOICES)
+
+# Routes requested without logging in, and routes requested as a regular
+# user; everything else is requested as an admin
+ANONYMOUS_ROUTES = {'index', 'about', 'contact', 'auth_login', 'auth_signup'}
+USER_ROUTES = {
+    'accommodations', 'recommended_accommodations', 'search_api', 'my_applications', 'apply_accommodation',
+    'api_accommodation_list', 'api_accommodation_detail', 'api_application_list', 'api_application_detail',
+}
+# Routes that cannot be requested repeatedly with the same client
+SKIPPED_ROUTES = {'auth_logout': 'ends the session'}
+QUERY_STRINGS = {'search_api': 'q=apartment'}
+
+# Exact query count of each route on an empty cache, with database-backed
+# sessions (one session read per logged-in request). The counts must not
+# depend on the number of rows; see tests/test_query_counts.py.
+QUERY_BUDGETS = {
+    'index': 0,
+    'about': 0,
+    'contact': 0,
+    'auth_login': 0,
+    'auth_signup': 0,
+    'accommodations': 6,
+    # Two to sync the recommender's feature index, as the cache was cleared
+    'recommended_accommodations': 7,
+    'search_api': 4,
+    'api_accommodation_list': 4,
+    'api_accommodation_detail': 4,
+    'api_application_list': 3,
+    'api_application_detail': 3,
+    'api_user_list': 3,
+    'api_user_detail': 3,
+    'my_applications': 3,
+    'apply_accommodation': 3,
+    'admin_dashboard': 6,
+    'cache_stats': 2,
+    'query_stats': 2,
+    'create_accommodation': 2,
+    'import_accommodations': 2,
+    # Plus one amenity prefetch per further bulk.EXPORT_CHUNK_SIZE rows
+    'export_accommodations': 4,
+    'edit_accommodation': 6,
+    'delete_accommodation': 3,
+    'upload_accommodation_images': 3,
+    'delete_accommodation_image': 3,
+    'bulk_update_application_status': 2,
+    'view_application': 4,
+    'update_application_status': 3,
+    'manage_users': 3,
+    'create_user': 2,
+    'view_user': 4,
+    'edit_user': 3,
+    'delete_user': 3,
+}
+
+
+@dataclass
+class Dataset:
+    admin: User
+    user: User
+    accommodation_id: int
+    application_id: int
+    image_id: int
+    counts: dict = field(default_factory=dict)
+
+    def url_kwargs(self):
+        return {
+            'accommodation_id': self.accommodation_id,
+            'application_id': self.application_id,
+            'user_id': self.user.pk,
+            'image_id': self.image_id,
+        }
+
+
+def _batches(count, batch_size):
+    for start in range(0, count, batch_size):
+        yield range(start, min(start + batch_size, count))
+
+
+def _pick(choices, i):
+    return choices[i % len(choices)][0]
+
+
+def _user(i, token, password, counts):
+    return User(
+        username=f'seed-{token}-{i}',
+        email=f'seed-{token}-{i}@example.invalid',
+        password=password,
+        first_name='Seed',
+        last_name=str(i),
+        phone=f'0300{i:07d}',
+        religious_preference=_pick(User._meta.get_field('religious_preference').choices, i),
+        **counts,
+    )
+
+
+def _accommodation(i, rng, counts):
+    kind = _pick(Accommodation.ACCOMMODATION_TYPES, i)
+    location = LOCATIONS[i % len(LOCATIONS)]
+    latitude, longitude = CITY_CENTRES[location]
+    accommodation = Accommodation(
+        title=f'{kind} {i} in {location}',
+        description=f'A {rng.choice(("bright", "quiet", "spacious", "furnished"))} {kind.lower()} near the city centre.',
+        type=kind,
+        location=location,
+        address=f'{i} Seed Street, {location}',
+        price=Decimal(rng.randrange(5_000, 150_000, 500)),
+        religious_preference=_pick(Accommodation.RELIGIOUS_PREFERENCES, i),
+        # Random rather than cyclic, so no user's applications cover all available listings
+        status=rng.choice(Accommodation.STATUS_CHOICES)[0],
+        bedrooms=rng.randint(1, 5),
+        bathrooms=Decimal(rng.choice(('1', '1.5', '2', '3'))),
+        contact_email=f'owner-{i}@example.invalid',
+        contact_phone=f'0321{i:07d}',
+        **counts,
+    )
+    # bulk_create() skips the pre_save signal that geocodes listings
+    geo.set_coordinates(accommodation, (
+        round(latitude + rng.gauss(0, LOCATION_SPREAD_DEGREES), 6),
+        round(longitude + rng.gauss(0, LOCATION_SPREAD_DEGREES), 6),
+    ))
+    return accommodation
+
+
+def seed(accommodations=1000, applications=None, users=None, batch_size=2000, random_seed=0, using='default'):
+    """
+    Insert a synthetic dataset and return a :class:`Dataset`.
+
+    ``applications`` defaults to ``accommodations`` and ``users`` to a tenth
+    of the applications. Application ``i`` belongs to user ``i % users``
+    (user 0 is :attr:`Dataset.user`) and accommodation ``i % accommodations``.
+    """
+    rng = random.Random(random_seed)
+    accommodations = max(accommodations, 1)
+    applications = accommodations if applications is None else applications
+    users = max(users or applications // 10, 1)
+    token = f'{rng.getrandbits(48):012x}'
+    # Seeded users only ever log in through Client.force_login()
+    password = make_password(None)
+
+    statuses = [rng.choice(APPLICATION_STATUSES) for _ in range(applications)]
+    user_counts = [dict.fromkeys(APPLICATION_COUNTER_FIELDS.values(), 0) for _ in range(users)]
+    accommodation_counts = [dict.fromkeys(APPLICATION_COUNTER_FIELDS.values(), 0) for _ in range(accommodations)]
+    for i, status in enumerate(statuses):
+        user_counts[i % users][APPLICATION_COUNTER_FIELDS[status]] += 1
+        accommodation_counts[i % accommodations][APPLICATION_COUNTER_FIELDS[status]] += 1
+
+    admin = User.objects.db_manager(using).create_user(
+        username=f'seed-admin-{token}', email=f'seed-admin-{token}@example.invalid', password=None, role='admin',
+    )
+    seeded_users = []
+    for batch in _batches(users, batch_size):
+        seeded_users.extend(User.objects.using(using).bulk_create(
+            [_user(i, token, password, user_counts[i]) for i in batch]
+        ))
+
+    accommodation_ids = []
+    for batch in _batches(accommodations, batch_size):
+        ids = [
+            accommodation.pk for accommodation in Accommodation.objects.using(using).bulk_create(
+                [_accommodation(i, rng, accommodation_counts[i]) for i in batch]
+            )
+        ]
+        accommodation_ids.extend(ids)
+        fulltext.index_accommodations(ids, using=using)
+        amenities.set_many({pk: rng.sample(AMENITY_POOL, rng.randint(1, 4)) for pk in ids}, using=using)
+
+    application_ids = []
+    for batch in _batches(applications, batch_size):
+        application_ids.extend(application.pk for application in Application.objects.using(using).bulk_create([
+            Application(
+                accommodation_id=accommodation_ids[i % accommodations],
+                user=seeded_users[i % users],
+                user_name=seeded_users[i % users].get_full_name(),
+                user_email=seeded_users[i % users].email,
+                user_phone=seeded_users[i % users].phone,
+                message=f'Synthetic application {i}.',
+                status=statuses[i],
+            )
+            for i in batch
+        ]))
+
+    # One photo row, so the image routes have something to address
+    image = AccommodationImage.objects.using(using).create(
+        accommodation_id=accommodation_ids[0], content_hash=token, original=f'images/originals/{token}.jpg',
+        width=1600, height=1200, alt='Synthetic photo',
+    )
+    for namespace in cache.NAMESPACES:
+        cache.bump(namespace)
+
+    return Dataset(
+        admin=admin,
+        user=seeded_users[0],
+        accommodation_id=accommodation_ids[0],
+        application_id=application_ids[0] if application_ids else 0,
+        image_id=image.pk,
+        counts={'accommodations': accommodations, 'applications': applications, 'users': users + 1},
+    )
+
+
+@dataclass
+class RouteRequest:
+    name: str
+    path: str
+    user: User = None
+
+
+def route_requests(dataset, urlconf='accommodation.urls'):
+    """A GET request for every named route in ``urlconf``, skipped routes excluded"""
+    requests = []
+    kwargs = dataset.url_kwargs()
+    for pattern in import_module(urlconf).urlpatterns:
+        if not isinstance(pattern, URLPattern) or not pattern.name or pattern.name in SKIPPED_ROUTES:
+            continue
+        path = reverse(pattern.name, kwargs={name: kwargs[name] for name in pattern.pattern.converters})
+        if pattern.name in QUERY_STRINGS:
+            path = f'{path}?{QUERY_STRINGS[pattern.name]}'
+        if pattern.name in ANONYMOUS_ROUTES:
+            user = None
+        elif pattern.name in USER_ROUTES:
+            user = dataset.user
+        else:
+            user = dataset.admin
+        requests.append(RouteRequest(pattern.name, path, user))
+    return requests
+
+
+class Clients:
+    """One logged-in test client per user, reused across requests"""
+
+    def __init__(self):
+        self._clients = {}
+
+    def __getitem__(self, user):
+        key = user.pk if user is not None else None
+        if key not in self._clients:
+            client = Client()
+            if user is not None:
+                client.force_login(user)
+            self._clients[key] = client
+        return self._clients[key]
+
+
+def consume(response):
+    """Read a streaming response to the end, so its queries and time are counted"""
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def measure(route, client, repeat=20, using='default'):
+    """
+    Request ``route`` ``repeat`` times and return its status, query count,
+    latency percentiles (ms) and peak traced memory (KiB).
+
+    The first request runs with every cache namespace bumped, counts the
+    queries and is not timed; memory is traced during one more request so
+    that tracing does not slow down the timed ones.
+    """
+    for namespace in cache.NAMESPACES:
+        cache.bump(namespace)
+    # CaptureQueriesContext counts from the end of a bounded log that the
+    # seeding may have filled
+    reset_queries()
+    with CaptureQueriesContext(connections[using]) as queries:
+        response = consume(client.get(route.path))
+    # The log is cleared again by the next request
+    query_count = len(queries)
+
+    tracemalloc.start()
+    try:
+        consume(client.get(route.path))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    timings = []
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        consume(client.get(route.path))
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'path': route.path,
+        'user': 'anonymous' if route.user is None else route.user.role,
+        'status': response.status_code,
+        'queries': query_count,
+        'latency_ms': percentiles(sorted(timings)),
+        'peak_memory_kib': round(peak / 1024, 1),
+    }
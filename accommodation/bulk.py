@@ -0,0 +1,277 @@
+"""
+Bulk import and export of accommodations
+
+Imports stream CSV or JSONL rows through :class:`AccommodationForm`, so a
+bulk-loaded listing is validated exactly like one created in the dashboard.
+Valid rows are written per chunk with ``bulk_create`` (rows without an id) or
+``bulk_update`` (rows whose id already exists), each chunk in its own
+transaction. Invalid rows are reported with their line number and skipped;
+they never abort the rest of the import. Uploads are checked with
+:func:`check_encoding` before anything is written; a stream that still fails
+to decode stops the import at that line, keeping the rows read before it
+(see ``ImportResult.read_error``).
+
+Exports read the table with ``iterator(chunk_size=...)`` and yield encoded
+lines, so both directions run in constant memory whatever the file size.
+"""
+import codecs
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from functools import partial
+
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from . import amenities, cache, fulltext, geo
+from .forms import AccommodationForm
+from .models import Accommodation
+
+IMPORT_CHUNK_SIZE = 500
+EXPORT_CHUNK_SIZE = 2000
+FORMATS = ('csv', 'jsonl')
+# Errors beyond this many are counted but not kept, to bound memory
+MAX_REPORTED_ERRORS = 200
+
+FIELDS = tuple(AccommodationForm._meta.fields)
+# Amenities are a many-to-many relation, written through accommodation.amenities
+COLUMNS = tuple(name for name in FIELDS if name != 'amenities')
+EXPORT_FIELDS = ('id',) + FIELDS
+# Derived from location and address by accommodation.geo
+GEO_COLUMNS = ('latitude', 'longitude', 'geohash')
+
+
+class ImportFormatError(ValueError):
+    """Raised when the input cannot be parsed as the requested format"""
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+    # Why the input stopped being readable, when it did
+    read_error: str = ''
+
+    def add_error(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, errors))
+
+    @property
+    def truncated_errors(self):
+        return self.failed - len(self.errors)
+
+
+def guess_format(filename):
+    """``csv`` or ``jsonl`` from a file name, defaulting to CSV"""
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, row_dict)`` from a text stream"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        if reader.fieldnames is None:
+            return
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            if not isinstance(row, dict):
+                # Reported like any other invalid row
+                row = {'__error__': 'Not a JSON object'}
+            yield line_number, row
+    else:
+        raise ImportFormatError(f'Unsupported format: {fmt}')
+
+
+def _readable_rows(rows, result):
+    """``rows`` up to the first line that cannot be decoded, recorded in ``result``"""
+    rows = iter(rows)
+    line_number = 0
+    while True:
+        try:
+            line_number, row = next(rows)
+        except StopIteration:
+            return
+        except UnicodeDecodeError as exc:
+            result.read_error = f'The file could not be decoded after line {line_number}: {exc.reason}.'
+            return
+        yield line_number, row
+
+
+def _form_data(row):
+    data = {name: row.get(name) for name in FIELDS if row.get(name) is not None}
+    if isinstance(data.get('amenities'), list):
+        data['amenities'] = ', '.join(str(amenity) for amenity in data['amenities'])
+    return data
+
+
+def _row_id(row):
+    value = row.get('id')
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid id: {value!r}')
+
+
+def import_accommodations(rows, chunk_size=IMPORT_CHUNK_SIZE, dry_run=False):
+    """
+    Validate and write ``(line_number, row)`` pairs, ``chunk_size`` at a time.
+
+    Returns an :class:`ImportResult`. With ``dry_run`` rows are validated
+    (including the existence of ids to update) but nothing is written.
+    """
+    result = ImportResult()
+    chunk = []
+    for line_number, row in _readable_rows(rows, result):
+        if '__error__' in row:
+            result.add_error(line_number, {'__all__': [row['__error__']]})
+            continue
+        try:
+            pk = _row_id(row)
+        except ValueError as exc:
+            result.add_error(line_number, {'id': [str(exc)]})
+            continue
+
+        form = AccommodationForm(data=_form_data(row))
+        if not form.is_valid():
+            result.add_error(line_number, {name: list(messages) for name, messages in form.errors.items()})
+            continue
+
+        instance = form.save(commit=False)
+        instance.pk = pk
+        instance._amenity_names = form.cleaned_data['amenities']
+        chunk.append((line_number, instance))
+        if len(chunk) >= chunk_size:
+            _write_chunk(chunk, result, dry_run)
+            chunk = []
+
+    if chunk:
+        _write_chunk(chunk, result, dry_run)
+    if (result.created or result.updated) and not dry_run:
+        cache.bump(cache.ACCOMMODATIONS)
+    return result
+
+
+def _write_chunk(chunk, result, dry_run):
+    update_ids = [instance.pk for _, instance in chunk if instance.pk is not None]
+    existing = set(Accommodation.objects.filter(pk__in=update_ids).values_list('pk', flat=True))
+
+    to_create, to_update = [], []
+    for line_number, instance in chunk:
+        if instance.pk is None:
+            to_create.append((line_number, instance))
+        elif instance.pk in existing:
+            to_update.append((line_number, instance))
+        else:
+            result.add_error(line_number, {'id': [f'Accommodation {instance.pk} does not exist']})
+
+    if dry_run:
+        result.created += len(to_create)
+        result.updated += len(to_update)
+        return
+
+    # Bulk writes also bypass the pre_save signal that geocodes listings;
+    # the whole chunk is looked up in one gazetteer query instead
+    geo.locate(instance for _, instance in to_create + to_update)
+    try:
+        with transaction.atomic():
+            created = Accommodation.objects.bulk_create([instance for _, instance in to_create])
+            if to_update:
+                # bulk_update() skips auto_now, and the counters are owned by
+                # accommodation.counters, so neither comes from the file
+                now = timezone.now()
+                for _, instance in to_update:
+                    instance.updated_at = now
+                Accommodation.objects.bulk_update(
+                    [instance for _, instance in to_update], COLUMNS + GEO_COLUMNS + ('updated_at',)
+                )
+            # ... and the post_save signal that maintains the index
+            written = created + [instance for _, instance in to_update]
+            fulltext.index_accommodations([instance.pk for instance in written])
+            amenities.set_many({instance.pk: instance._amenity_names for instance in written})
+    except DatabaseError as exc:
+        for line_number, _ in to_create + to_update:
+            result.add_error(line_number, {'__all__': [f'Database error: {exc}']})
+        return
+
+    result.created += len(to_create)
+    result.updated += len(to_update)
+
+
+class _Echo:
+    """File-like object handing back what csv.writer writes"""
+
+    def write(self, value):
+        return value
+
+
+def _export_value(accommodation, name, fmt):
+    value = getattr(accommodation, name)
+    if name == 'amenities':
+        names = [amenity.name for amenity in value.all()]
+        return ', '.join(names) if fmt == 'csv' else names
+    if fmt == 'jsonl' and name in ('price', 'bathrooms'):
+        return str(value)
+    return value
+
+
+def export_accommodations(fmt='csv', queryset=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield the export of ``queryset`` (all accommodations by default) as text
+    lines, in a format that :func:`import_accommodations` reads back.
+    """
+    if fmt not in FORMATS:
+        raise ImportFormatError(f'Unsupported format: {fmt}')
+    if queryset is None:
+        queryset = Accommodation.objects.all()
+    rows = (
+        queryset.order_by('pk').only('id', *COLUMNS).prefetch_related('amenities')
+        .iterator(chunk_size=chunk_size)
+    )
+
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        for accommodation in rows:
+            yield writer.writerow([_export_value(accommodation, name, fmt) for name in EXPORT_FIELDS])
+    else:
+        for accommodation in rows:
+            yield json.dumps({name: _export_value(accommodation, name, fmt) for name in EXPORT_FIELDS}) + '\n'
+
+
+def check_encoding(binary_file, encoding='utf-8-sig', chunk_size=64 * 1024):
+    """
+    Decode the whole of a seekable binary file, then rewind it.
+
+    Raises :class:`ImportFormatError` naming the first line that is not valid
+    ``encoding``, so a bad upload is rejected before any row is written.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    line_number = 1
+    try:
+        for data in iter(partial(binary_file.read, chunk_size), b''):
+            line_number += decoder.decode(data).count('\n')
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError as exc:
+        line_number += exc.object[:exc.start].count(b'\n')
+        raise ImportFormatError(f'Line {line_number} is not valid {encoding}: {exc.reason}.') from None
+    finally:
+        binary_file.seek(0)
+
+
+def text_stream(binary_file, encoding='utf-8-sig'):
+    """Wrap an uploaded or opened binary file for :func:`read_rows`"""
+    return io.TextIOWrapper(binary_file, encoding=encoding, newline='')
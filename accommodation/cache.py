@@ -0,0 +1,140 @@
+"""
+Versioned caching for listing data and public pages
+
+Cache keys embed a version number per namespace (``accommodations``,
+``applications``, ``users``, ``places``). Model signals bump the version of the
+namespace they touch, so every entry derived from that data is invalidated at
+once without having to track or delete individual keys; stale entries simply
+age out. Works with any Django cache backend - local memory by default, or
+Redis/file caches through the ``CACHE_URL`` setting. The versions live in the
+cache too, so invalidation only reaches the processes that share it:
+:func:`warn_if_private` complains when a deployment runs without one.
+"""
+import hashlib
+import logging
+import time
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+
+KEY_PREFIX = 'ams'
+ACCOMMODATIONS = 'accommodations'
+APPLICATIONS = 'applications'
+USERS = 'users'
+PLACES = 'places'
+NAMESPACES = (ACCOMMODATIONS, APPLICATIONS, USERS, PLACES)
+
+# Per-process hit/miss counters, exposed through cache_stats()
+_stats = Counter()
+
+logger = logging.getLogger(__name__)
+
+
+def _version_key(namespace):
+    return f'{KEY_PREFIX}:version:{namespace}'
+
+
+def namespace_version(namespace):
+    """Current version of ``namespace``"""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted counter never goes back to a
+        # version that older entries were stored under
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump(namespace):
+    """Invalidate every entry cached under ``namespace``"""
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        namespace_version(namespace)
+
+
+def make_key(namespaces, *parts):
+    """Build a key for ``parts`` that changes whenever a namespace is bumped"""
+    versions = '.'.join(str(namespace_version(namespace)) for namespace in namespaces)
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'{KEY_PREFIX}:{"+".join(namespaces)}:{versions}:{digest}'
+
+
+def get_or_set(namespaces, parts, producer, timeout=None):
+    """Return the cached value for ``parts``, computing it with ``producer`` on a miss"""
+    key = make_key(namespaces, *parts)
+    value = cache.get(key)
+    if value is not None:
+        _stats['hits'] += 1
+        return value
+    _stats['misses'] += 1
+    value = producer()
+    cache.set(key, value, timeout if timeout is not None else settings.LISTING_CACHE_TIMEOUT)
+    return value
+
+
+def cache_anonymous_page(timeout=None, namespaces=(ACCOMMODATIONS,)):
+    """
+    Cache a view's full response for anonymous GET requests.
+
+    Requests from logged-in users, or with flash messages waiting to be
+    shown, always reach the view because the page would differ for them.
+    Cached pages are dropped when one of ``namespaces`` is bumped.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if (
+                request.method != 'GET'
+                or request.user.is_authenticated
+                or len(messages.get_messages(request))
+            ):
+                return view_func(request, *args, **kwargs)
+
+            key = make_key(namespaces, 'page', request.get_full_path())
+            response = cache.get(key)
+            if response is not None:
+                _stats['hits'] += 1
+                return response
+            _stats['misses'] += 1
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                cache.set(key, response, timeout if timeout is not None else settings.PAGE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    """Hit/miss counters for this process plus the current namespace versions"""
+    lookups = _stats['hits'] + _stats['misses']
+    return {
+        'hits': _stats['hits'],
+        'misses': _stats['misses'],
+        'hit_ratio': round(_stats['hits'] / lookups, 4) if lookups else None,
+        'backend': settings.CACHES['default']['BACKEND'],
+        'namespaces': {namespace: namespace_version(namespace) for namespace in NAMESPACES},
+    }
+
+
+def warn_if_private():
+    """
+    Log a warning if this process's invalidations cannot reach the others.
+
+    Called when a web worker or the job worker starts. Deployments
+    (``DEBUG=False``) run several processes - gunicorn workers and
+    ``run_jobs`` - so a private cache serves stale data. Returns whether it warned.
+    """
+    if settings.SHARED_CACHE or settings.DEBUG:
+        return False
+    logger.warning(
+        'The cache (%s) is private to each process, so changes made in one worker are not seen by the others '
+        'until their entries expire (up to %ss). Set CACHE_URL to a cache every worker shares, e.g. '
+        'redis://host:6379/1.',
+        settings.CACHES['default']['BACKEND'], max(settings.LISTING_CACHE_TIMEOUT, settings.PAGE_CACHE_TIMEOUT),
+    )
+    return True
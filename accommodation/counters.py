@@ -0,0 +1,108 @@
+"""
+Denormalized application status counters
+
+``User`` and ``Accommodation`` carry ``pending_applications``,
+``approved_applications`` and ``rejected_applications`` columns so status
+badges are plain field reads. The counters are adjusted with atomic F()
+updates from the Application signal receivers (creates, status transitions,
+deletes including cascades); paths that bypass signals, such as
+``QuerySet.update()``, call :func:`apply_status_changes` directly.
+Transitions are counted from the status stored in the locked row (see
+``Application.save`` and ``reviews.update_statuses``), never from a status
+read earlier, so concurrent reviews of one application count once.
+:func:`reconcile` repairs any drift in bulk.
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import APPLICATION_COUNTER_FIELDS, Accommodation, Application, User
+
+COUNTED_MODELS = (
+    (User, 'user'),
+    (Accommodation, 'accommodation'),
+)
+
+
+def apply_status_changes(changes):
+    """
+    Apply a batch of counter changes.
+
+    ``changes`` is an iterable of ``(user_id, accommodation_id, old_status,
+    new_status, count)`` tuples; ``old_status`` is None for new applications
+    and ``new_status`` is None for deleted ones. Changes are merged so each
+    affected row gets a single UPDATE.
+    """
+    deltas = {User: defaultdict(Counter), Accommodation: defaultdict(Counter)}
+    for user_id, accommodation_id, old_status, new_status, count in changes:
+        if old_status == new_status:
+            continue
+        for model, pk in ((User, user_id), (Accommodation, accommodation_id)):
+            if old_status in APPLICATION_COUNTER_FIELDS:
+                deltas[model][pk][APPLICATION_COUNTER_FIELDS[old_status]] -= count
+            if new_status in APPLICATION_COUNTER_FIELDS:
+                deltas[model][pk][APPLICATION_COUNTER_FIELDS[new_status]] += count
+
+    for model, rows in deltas.items():
+        for pk, fields in rows.items():
+            updates = {field: F(field) + delta for field, delta in fields.items() if delta}
+            if updates:
+                model.objects.filter(pk=pk).update(**updates)
+
+
+def record_status_change(application, old_status, new_status):
+    """Adjust counters for a single application"""
+    apply_status_changes([
+        (application.user_id, application.accommodation_id, old_status, new_status, 1),
+    ])
+
+
+def _actual_count(fk_name, status):
+    applications = (
+        Application.objects.filter(**{fk_name: OuterRef('pk')}, status=status)
+        .order_by()
+        .values(fk_name)
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    return Coalesce(Subquery(applications), 0)
+
+
+def reconcile(batch_size=1000, dry_run=False):
+    """
+    Recompute every counter from the applications table.
+
+    Rows are processed in primary-key ranges of ``batch_size``; within each
+    range only rows whose stored counters differ from the real counts are
+    updated. Returns ``{model_name: rows_with_drift}``.
+    """
+    report = {}
+    for model, fk_name in COUNTED_MODELS:
+        actual = {field: _actual_count(fk_name, status) for status, field in APPLICATION_COUNTER_FIELDS.items()}
+        drift = Q()
+        for field in APPLICATION_COUNTER_FIELDS.values():
+            drift |= ~Q(**{field: F(f'actual_{field}')})
+
+        drifted = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                model.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1]
+
+            stale_ids = list(
+                model.objects.filter(pk__in=batch)
+                .annotate(**{f'actual_{field}': expression for field, expression in actual.items()})
+                .filter(drift)
+                .values_list('pk', flat=True)
+            )
+            drifted += len(stale_ids)
+            if stale_ids and not dry_run:
+                model.objects.filter(pk__in=stale_ids).update(**actual)
+
+        report[model._meta.model_name] = drifted
+    return report
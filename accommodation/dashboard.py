@@ -0,0 +1,160 @@
+"""
+Admin dashboard data service
+
+Headline counters come from a single aggregate query; the activity lists are
+bounded keyset pages so the dashboard costs the same no matter how many
+applications have been received.
+
+The user management pages work the same way. The user list is a keyset page
+in join order, optionally restricted by role and religious preference
+(each has a composite index with the join order) and by a search term.
+Searches match the start of the email, first name, last name or phone number.
+Each is a range on an indexed column or ``LOWER()`` expression, and the
+database combines them with an index union. That is only fast while few
+users match: a term like "03" matches almost every phone number, and
+sorting all of them costs far more than walking the join order until a page
+is full. So the union is first read for up to ``MAX_SEARCH_CANDIDATES`` ids.
+If there are no more than that, the page is taken from those ids.
+Otherwise the rows are checked in join order. Application counts come from
+the counters on the user row (see counters.py), so listing a page needs
+no join or GROUP BY.
+"""
+from django.db.models import Count, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Lower
+
+from .models import Accommodation, Application, User
+from .pagination import paginate_keyset
+
+DASHBOARD_PAGE_SIZE = 10
+RECENT_USERS_LIMIT = 6
+ACTIVITY_ORDERING = ('-created_at', '-id')
+USER_PAGE_SIZE = 25
+USER_ORDERING = ('-date_joined', '-id')
+MAX_SEARCH_CANDIDATES = 1000
+# Sorts after every character of a search term, closing its prefix range
+PREFIX_END = '\U0010ffff'
+
+
+def _aggregate(queryset, **aggregates):
+    """
+    Conditional aggregates over a whole table as a single-row queryset.
+
+    Grouping on a constant makes Django emit ``SELECT COUNT(...) ... FROM t``
+    without a GROUP BY, so the query always yields exactly one row and can be
+    embedded into another query as a scalar subquery.
+    """
+    return queryset.order_by().annotate(_all=Value(1)).values('_all').annotate(**aggregates)
+
+
+def headline_stats():
+    """Return every dashboard counter from one database round trip"""
+    user_counts = _aggregate(
+        User.objects.all(),
+        total=Count('id'),
+        admins=Count('id', filter=Q(role='admin')),
+    )
+    # Application totals are summed from the per-accommodation counters
+    # (see counters.py) rather than counted from the applications table
+    stats = _aggregate(
+        Accommodation.objects.all(),
+        total_accommodations=Count('id'),
+        available_accommodations=Count('id', filter=Q(status='Available')),
+        occupied_accommodations=Count('id', filter=Q(status='Occupied')),
+        pending_applications=Coalesce(Sum('pending_applications'), 0),
+        approved_applications=Coalesce(Sum('approved_applications'), 0),
+        rejected_applications=Coalesce(Sum('rejected_applications'), 0),
+    ).annotate(
+        total_users=Subquery(user_counts.values('total')),
+        admin_users=Subquery(user_counts.values('admins')),
+    )
+    row = stats.get()
+    row.pop('_all')
+    row['total_applications'] = (
+        row['pending_applications'] + row['approved_applications'] + row['rejected_applications']
+    )
+    return row
+
+
+def recent_accommodations(cursor=None, page_size=DASHBOARD_PAGE_SIZE):
+    """Newest accommodations, one keyset page at a time"""
+    return paginate_keyset(
+        Accommodation.objects.all(), ACTIVITY_ORDERING, cursor=cursor, page_size=page_size
+    )
+
+
+def recent_applications(cursor=None, page_size=DASHBOARD_PAGE_SIZE):
+    """Newest applications with their accommodation joined in"""
+    return paginate_keyset(
+        Application.objects.select_related('accommodation'),
+        ACTIVITY_ORDERING,
+        cursor=cursor,
+        page_size=page_size,
+    )
+
+
+def recent_users(limit=RECENT_USERS_LIMIT):
+    """
+    The most recently registered users, as a lazy queryset: admin.html only
+    evaluates it when its users fragment is not cached
+    """
+    return User.objects.order_by('-date_joined', '-id')[:limit]
+
+
+def _prefix_q(field, term, indexed):
+    """``field`` starts with ``term``; as a range an index on ``field`` serves if ``indexed``"""
+    q = Q(**{f'{field}__startswith': term})
+    if indexed:
+        q &= Q(**{f'{field}__gte': term, f'{field}__lt': term + PREFIX_END})
+    return q
+
+
+def user_search_q(term, indexed=True):
+    """
+    Users whose email, first or last name (case-insensitive) or phone starts
+    with ``term``, on the aliases that :func:`search_users` adds
+    """
+    term = ' '.join(term.split())
+    lowered = term.lower()
+    # The unique index on LOWER(email) leaves out blank emails
+    q = ~Q(email='') & _prefix_q('email_lower', lowered, indexed)
+    q |= _prefix_q('phone', term, indexed)
+    first, _, rest = lowered.partition(' ')
+    if rest:
+        # "Jane Do" - first name, then the start of the last name
+        q |= Q(first_name_lower=first) & _prefix_q('last_name_lower', rest, indexed)
+    else:
+        q |= _prefix_q('first_name_lower', lowered, indexed) | _prefix_q('last_name_lower', lowered, indexed)
+    return q
+
+
+def search_users(term='', role='', religious_preference='', cursor=None, page_size=USER_PAGE_SIZE):
+    """Newest users matching the filters, one keyset page at a time"""
+    users = User.objects.all()
+    if term.strip():
+        users = users.alias(
+            email_lower=Lower('email'), first_name_lower=Lower('first_name'), last_name_lower=Lower('last_name'),
+        )
+        # Probed on the term alone, which stops early however rare the role is
+        candidates = list(
+            users.filter(user_search_q(term)).order_by().values_list('pk', flat=True)[:MAX_SEARCH_CANDIDATES + 1]
+        )
+        if len(candidates) <= MAX_SEARCH_CANDIDATES:
+            users = User.objects.filter(pk__in=candidates)
+        else:
+            # Too many to sort: check rows in join order until a page is full
+            users = users.filter(user_search_q(term, indexed=False))
+    if role:
+        users = users.filter(role=role)
+    if religious_preference:
+        users = users.filter(religious_preference=religious_preference)
+    return paginate_keyset(users, USER_ORDERING, cursor=cursor, page_size=page_size)
+
+
+def user_applications(user_id, cursor=None, page_size=DASHBOARD_PAGE_SIZE):
+    """A user's newest applications with their accommodation joined in"""
+    return paginate_keyset(
+        Application.objects.filter(user_id=user_id).select_related('accommodation'),
+        ACTIVITY_ORDERING,
+        cursor=cursor,
+        page_size=page_size,
+    )
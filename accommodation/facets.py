@@ -0,0 +1,142 @@
+"""
+Facet counts for the accommodations filter bar
+
+All counts come from one grouped query: accommodations matching the
+non-facet filters (location, keywords) are grouped by type, religious
+preference, status, bedroom bucket and price band. That small table -
+at most a few hundred rows - is cached under the ``accommodations``
+namespace, so any Accommodation write invalidates it, and the counts for
+each facet are rolled up from it in Python.
+
+Counts are disjunctive: the numbers shown for one facet apply every other
+selected filter but not the facet's own selection, so they tell the user
+what they would get by switching to that option.
+
+Amenities are combined with AND, so their counts are taken over the current
+results (one grouped join, see amenities.amenity_counts) and tell the user
+how many results would remain after also requiring that amenity.
+"""
+from collections import Counter
+
+from django.db.models import Case, CharField, Count, Value, When
+
+from . import amenities, cache
+from .models import Accommodation
+from .search import BEDROOM_BUCKETS, PRICE_BANDS, bedroom_bucket_q, price_band_q
+
+FACETS = ('type', 'religious_preference', 'status', 'bedrooms', 'price_band')
+AMENITY_FACET_LIMIT = 12
+
+
+def _bucket_case(buckets, to_q):
+    return Case(
+        *(When(to_q(value), then=Value(value)) for value, *_ in buckets),
+        default=Value(''),
+        output_field=CharField(),
+    )
+
+
+def facet_index(query):
+    """
+    Grouped counts for the non-facet filters of ``query``, as a list of
+    ``(type, religious_preference, status, bedrooms, price_band, count)``
+    """
+    def produce():
+        rows = (
+            query.base_queryset()
+            .order_by()
+            .annotate(
+                bedroom_bucket=_bucket_case(BEDROOM_BUCKETS, bedroom_bucket_q),
+                price_bucket=_bucket_case(PRICE_BANDS, price_band_q),
+            )
+            .values_list('type', 'religious_preference', 'status', 'bedroom_bucket', 'price_bucket')
+            .annotate(n=Count('id'))
+        )
+        return [tuple(row) for row in rows]
+
+    return cache.get_or_set((cache.ACCOMMODATIONS,), ('facets', query.base_key()), produce)
+
+
+def _matches(facet, value, selected):
+    if not selected:
+        return True
+    if facet == 'religious_preference':
+        # Listings open to any religion match every preference
+        return selected == 'Any' or value in (selected, 'Any')
+    return value == selected
+
+
+def facet_counts(query):
+    """
+    Return ``{'total': n, facet: {option: count}}`` for the listing filters
+    in ``query``.
+    """
+    selected = {
+        'type': query.type,
+        'religious_preference': query.religious_preference,
+        'status': query.status,
+        'bedrooms': query.bedrooms,
+        'price_band': query.price_band,
+    }
+    counts = {facet: Counter() for facet in FACETS}
+    total = 0
+
+    for *values, n in facet_index(query):
+        matched = [_matches(facet, value, selected[facet]) for facet, value in zip(FACETS, values)]
+        if all(matched):
+            total += n
+        for position, (facet, value) in enumerate(zip(FACETS, values)):
+            if all(matched[:position]) and all(matched[position + 1:]):
+                counts[facet][value] += n
+
+    # A filter on one religion also returns the listings open to any religion
+    religions = counts['religious_preference']
+    open_to_all = religions.pop('Any', 0)
+    for choice, _ in Accommodation.RELIGIOUS_PREFERENCES:
+        if choice != 'Any':
+            religions[choice] += open_to_all
+
+    result = {facet: dict(counter) for facet, counter in counts.items()}
+    result['total'] = total
+    return result
+
+
+def amenity_options(query):
+    """``[(name, label, count, selected), ...]`` for the most common amenities of the results"""
+    counts = cache.get_or_set(
+        (cache.ACCOMMODATIONS,), ('amenity_facets', query.key()),
+        lambda: amenities.amenity_counts(query.queryset()),
+    )
+    selected = {amenities.canonical_key(name): name for name in query.amenities}
+    options = [
+        (name, name, n, key in selected)
+        for position, (name, key, n) in enumerate(counts)
+        if position < AMENITY_FACET_LIMIT or key in selected
+    ]
+    shown = {amenities.canonical_key(name) for name, *_ in options}
+    options.extend((name, name, 0, True) for key, name in selected.items() if key not in shown)
+    return options
+
+
+def facet_options(query):
+    """
+    Dropdown options with counts for the listing template:
+    ``{facet: [(value, label, count, selected), ...], 'total': n}``
+    """
+    counts = facet_counts(query)
+    choices = {
+        'type': Accommodation.ACCOMMODATION_TYPES,
+        'religious_preference': [c for c in Accommodation.RELIGIOUS_PREFERENCES if c[0] != 'Any'],
+        'status': Accommodation.STATUS_CHOICES,
+        'bedrooms': [(value, label) for value, label, *_ in BEDROOM_BUCKETS],
+        'price_band': [(value, label) for value, label, *_ in PRICE_BANDS],
+    }
+    options = {'total': counts['total']}
+    for facet, facet_choices in choices.items():
+        current = getattr(query, facet)
+        options[facet] = [
+            (value, label, counts[facet].get(value, 0), value == current)
+            for value, label in facet_choices
+        ]
+    options['amenities'] = amenity_options(query)
+    return options
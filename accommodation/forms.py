@@ -1,6 +1,8 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
-from .models import Accommodation, Application, User
+from . import amenities
+from .backends import find_user
+from .models import Accommodation, Application, ContactMessage, User
 
 
 class UserSignupForm(UserCreationForm):
@@ -30,6 +32,12 @@ class UserSignupForm(UserCreationForm):
         for field_name, field in self.fields.items():
             field.widget.attrs.update({'class': 'form-control'})
     
+    def clean_email(self):
+        email = self.cleaned_data['email']
+        if find_user(email) is not None:
+            raise forms.ValidationError('A user with that email address already exists.')
+        return email
+    
     def save(self, commit=True):
         user = super().save(commit=False)
         user.email = self.cleaned_data['email']
@@ -71,21 +79,16 @@ class AccommodationForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         if self.instance and self.instance.pk:
-            # Convert amenities list to comma-separated string for editing
-            self.initial['amenities'] = ', '.join(self.instance.amenities or [])
+            # Convert amenities to a comma-separated string for editing
+            self.initial['amenities'] = ', '.join(str(amenity) for amenity in self.instance.amenities.all())
     
     def clean_amenities(self):
-        amenities_str = self.cleaned_data.get('amenities', '')
-        if amenities_str:
-            return [a.strip() for a in amenities_str.split(',') if a.strip()]
-        return []
+        # One name per canonical amenity, so "WiFi, wifi" is stored once
+        return amenities.parse(self.cleaned_data.get('amenities', ''))
     
-    def save(self, commit=True):
-        instance = super().save(commit=False)
-        instance.amenities = self.cleaned_data['amenities']
-        if commit:
-            instance.save()
-        return instance
+    def _save_m2m(self):
+        # Runs after the instance is saved, from save() or save_m2m()
+        amenities.set_amenities(self.instance, self.cleaned_data['amenities'])
 
 
 class ApplicationForm(forms.ModelForm):
@@ -100,3 +103,10 @@ class ApplicationForm(forms.ModelForm):
             'message': forms.Textarea(attrs={'class': 'form-control', 'rows': 5}),
         }
 
+
+
+class ContactForm(forms.ModelForm):
+    """Contact page form"""
+    class Meta:
+        model = ContactMessage
+        fields = ['name', 'email', 'subject', 'message']
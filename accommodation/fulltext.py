@@ -0,0 +1,164 @@
+"""
+Full-text search over accommodation listings
+
+PostgreSQL keeps a generated ``search_vector`` tsvector column (with a GIN
+index) on ``accommodation_accommodation``. SQLite keeps an FTS5 shadow table,
+``accommodation_search``, whose rowid is the accommodation id and which is
+updated from the ``post_save``/``post_delete`` signals. Both are created by
+migration 0004.
+"""
+import re
+
+from django.db import connections
+
+ACCOMMODATION_TABLE = 'accommodation_accommodation'
+FTS_TABLE = 'accommodation_search'
+
+# Column weights: title matters most, then location/address, then description
+FTS_COLUMNS = ('title', 'location', 'address', 'description')
+BM25_WEIGHTS = '10.0, 4.0, 2.0, 1.0'
+
+MAX_QUERY_TERMS = 8
+SEARCH_PAGE_SIZE = 24
+# Pages numbered past this are served as page 1, which keeps OFFSET within
+# what the database accepts however large the number in the URL
+MAX_PAGE_NUMBER = 1000
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchPage:
+    """One page of ranked search results"""
+
+    def __init__(self, object_list, number, has_next, page_size):
+        self.object_list = object_list
+        self.number = number
+        self.has_next = has_next
+        self.page_size = page_size
+
+    @property
+    def has_previous(self):
+        return self.number > 1
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+def page_number(value):
+    """A page number from 1 to ``MAX_PAGE_NUMBER``; anything else is page 1"""
+    value = str(value).strip()
+    if not value.isascii() or not value.isdigit() or len(value) > len(str(MAX_PAGE_NUMBER)):
+        return 1
+    number = int(value)
+    return number if 1 <= number <= MAX_PAGE_NUMBER else 1
+
+
+def tokenize(text):
+    """Split user input into plain word terms, dropping any query syntax"""
+    return _TERM_RE.findall((text or '').lower())[:MAX_QUERY_TERMS]
+
+
+def _vendor(using):
+    return connections[using].vendor
+
+
+def apply_search(queryset, text):
+    """
+    Restrict ``queryset`` to accommodations matching ``text`` and annotate
+    each row with ``search_rank`` (higher is better). Every term must match,
+    and the last characters of each term are treated as a prefix.
+    """
+    terms = tokenize(text)
+    if not terms:
+        return queryset.none()
+
+    if _vendor(queryset.db) == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        return queryset.extra(
+            select={
+                'search_rank': f"ts_rank_cd({ACCOMMODATION_TABLE}.search_vector, to_tsquery('english', %s))",
+            },
+            select_params=[tsquery],
+            where=[f"{ACCOMMODATION_TABLE}.search_vector @@ to_tsquery('english', %s)"],
+            params=[tsquery],
+        )
+
+    match = ' '.join(f'"{term}"*' for term in terms)
+    return queryset.extra(
+        # bm25() is lower-is-better, so negate it to share ordering with ts_rank
+        select={'search_rank': f'-bm25({FTS_TABLE}, {BM25_WEIGHTS})'},
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = {ACCOMMODATION_TABLE}.id', f'{FTS_TABLE} MATCH %s'],
+        params=[match],
+    )
+
+
+def search_page(queryset, text, page=1, page_size=SEARCH_PAGE_SIZE):
+    """Return one page of ``queryset`` ranked by relevance to ``text``"""
+    page = page_number(page)
+    if not tokenize(text):
+        # Nothing to match (e.g. only punctuation): none() has no search_rank
+        return SearchPage([], page, False, page_size)
+    offset = (page - 1) * page_size
+    ranked = apply_search(queryset, text).order_by('-search_rank', '-id')
+    rows = list(ranked[offset:offset + page_size + 1])
+    return SearchPage(rows[:page_size], page, len(rows) > page_size, page_size)
+
+
+def index_accommodation(accommodation):
+    """Add or refresh one accommodation in the SQLite FTS5 table"""
+    using = accommodation._state.db or 'default'
+    if _vendor(using) != 'sqlite':
+        # PostgreSQL maintains search_vector as a generated column
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [accommodation.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, {", ".join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s, %s)',
+            [accommodation.pk] + [getattr(accommodation, column) or '' for column in FTS_COLUMNS],
+        )
+
+
+def index_accommodations(ids, using='default'):
+    """Refresh several accommodations in the SQLite FTS5 table in one pass"""
+    ids = list(ids)
+    if not ids or _vendor(using) != 'sqlite':
+        return
+    placeholders = ', '.join(['%s'] * len(ids))
+    columns = ', '.join(FTS_COLUMNS)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', ids)
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, {columns}) '
+            f'SELECT id, {columns} FROM {ACCOMMODATION_TABLE} WHERE id IN ({placeholders})',
+            ids,
+        )
+
+
+def unindex_accommodation(pk, using='default'):
+    """Remove one accommodation from the SQLite FTS5 table"""
+    if _vendor(using) != 'sqlite':
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pk])
+
+
+def rebuild_index(using='default'):
+    """Rebuild the SQLite FTS5 table from scratch; returns the row count"""
+    if _vendor(using) != 'sqlite':
+        return None
+    columns = ', '.join(FTS_COLUMNS)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, {columns}) SELECT id, {columns} FROM {ACCOMMODATION_TABLE}'
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
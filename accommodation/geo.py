@@ -0,0 +1,365 @@
+"""
+Offline geocoding and radius search
+
+Listings only have free-text ``location`` and ``address`` fields. The
+geocoder places them using the local :class:`~accommodation.models.Place`
+gazetteer, loaded from ``data/gazetteer.csv`` (or any file in the same
+format, see ``manage.py load_gazetteer``), without calling any web service.
+Every run of up to ``MAX_PLACE_WORDS`` words of the text is looked up in
+one query. The most specific match wins: a landmark over an area over a
+city. An area or landmark only counts if its city is named too, or if its
+name belongs to a single city. Coordinates are therefore as precise as the
+gazetteer entry, e.g. a campus or a neighbourhood centroid.
+
+Each geocoded listing also gets a geohash, which has a B-tree index. A
+radius search covers the bounding box of its circle with the finest
+geohash cells that take at most ``MAX_COVERING_CELLS``, and selects them as
+prefix ranges (``geohash >= 'tkrt' AND geohash < 'tkrv'``), one per run of
+cells that are adjacent in geohash order. Both SQLite and PostgreSQL serve
+those with index range scans. Only the rows in those cells go through the
+exact checks: a bounding box, then the distance. Distances use
+the equirectangular approximation, which stays within 0.1% of the
+great-circle distance at the radii offered. It needs no trigonometry in
+SQL, so it is the same plain arithmetic on both databases.
+"""
+import csv
+import math
+import re
+from pathlib import Path
+
+from django.db.models import ExpressionWrapper, F, FloatField, Q, Value
+from django.db.models.functions import Sqrt
+from django.db.models.lookups import LessThanOrEqual
+from django.utils import timezone
+
+from . import cache
+from .fulltext import SearchPage, page_number
+from .models import Accommodation, Place
+
+GAZETTEER_PATH = Path(__file__).resolve().parent / 'data' / 'gazetteer.csv'
+GAZETTEER_COLUMNS = ('name', 'kind', 'city', 'latitude', 'longitude')
+KM_PER_DEGREE = 6371.0088 * math.pi / 180
+GEOHASH_PRECISION = 9
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+MAX_PLACE_WORDS = 5
+MAX_COVERING_CELLS = 16
+# Radius options of the listing filter, in km
+RADIUS_CHOICES = (1, 2, 5, 10, 25, 50)
+DEFAULT_RADIUS_KM = 5
+MAX_RADIUS_KM = 50
+SPECIFICITY = {Place.CITY: 0, Place.AREA: 1, Place.LANDMARK: 2}
+PLACE_CACHE_TIMEOUT = 24 * 60 * 60
+
+_COORDINATES = re.compile(r'^\s*(-?\d{1,2}(?:\.\d+)?)\s*,\s*(-?\d{1,3}(?:\.\d+)?)\s*$')
+
+
+def place_key(name):
+    """Normalized form places are looked up by: casefolded words of letters and digits"""
+    return ' '.join(re.sub(r'[\W_]+', ' ', str(name).casefold()).split())[:100]
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Geohash of a point"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        value, bounds = (longitude, lon_range) if even else (latitude, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """``(height, width)`` in degrees of the geohash cells of ``precision``"""
+    bits = 5 * precision
+    return 180 / 2 ** (bits // 2), 360 / 2 ** ((bits + 1) // 2)
+
+
+def _next_prefix(prefix):
+    """The smallest string after every string starting with ``prefix``, or None"""
+    while prefix:
+        position = GEOHASH_ALPHABET.index(prefix[-1])
+        if position + 1 < len(GEOHASH_ALPHABET):
+            return prefix[:-1] + GEOHASH_ALPHABET[position + 1]
+        prefix = prefix[:-1]
+    return None
+
+
+def radius_degrees(latitude, radius_km):
+    """
+    ``(latitude, longitude)`` half-extents in degrees of a circle of
+    ``radius_km``; a circle around a pole spans every longitude (180)
+    """
+    lat_degrees = radius_km / KM_PER_DEGREE
+    if abs(latitude) + lat_degrees >= 90:
+        return lat_degrees, 180.0
+    return lat_degrees, min(lat_degrees / math.cos(math.radians(latitude)), 180.0)
+
+
+def covering_prefixes(latitude, longitude, radius_km):
+    """Geohash prefixes whose cells cover the circle, or [] when it is too large"""
+    lat_degrees, lon_degrees = radius_degrees(latitude, radius_km)
+    if lon_degrees >= 180:
+        return []
+    south, north = max(latitude - lat_degrees, -90.0), min(latitude + lat_degrees, 90.0)
+    west, east = longitude - lon_degrees, longitude + lon_degrees
+    # The finest cells that cover the bounding box in at most MAX_COVERING_CELLS
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        first_row, first_column = math.floor((south + 90) / height), math.floor((west + 180) / width)
+        rows = math.floor((north + 90) / height) - first_row + 1
+        columns = math.floor((east + 180) / width) - first_column + 1
+        if rows * columns <= MAX_COVERING_CELLS:
+            break
+    else:
+        return []
+    prefixes = set()
+    for row in range(rows):
+        for column in range(columns):
+            # The centre of each cell, wrapped around the antimeridian
+            lat = min((first_row + row + 0.5) * height - 90, 90.0)
+            lon = ((first_column + column + 0.5) * width) % 360.0 - 180.0
+            prefixes.add(encode(lat, lon, precision))
+    return sorted(prefixes)
+
+
+def distance_sq(latitude, longitude):
+    """Squared distance, in degrees of latitude, from a point to each row"""
+    scale = math.cos(math.radians(latitude))
+    dlat = F('latitude') - Value(latitude)
+    dlon = (F('longitude') - Value(longitude)) * Value(scale)
+    return ExpressionWrapper(dlat * dlat + dlon * dlon, output_field=FloatField())
+
+
+def filter_within(queryset, latitude, longitude, radius_km):
+    """Rows of ``queryset`` within ``radius_km`` of the point"""
+    # Neighbouring cells are often adjacent in geohash order: one range each run
+    ranges = []
+    for prefix in covering_prefixes(latitude, longitude, radius_km):
+        if ranges and ranges[-1][1] == prefix:
+            ranges[-1][1] = _next_prefix(prefix)
+        else:
+            ranges.append([prefix, _next_prefix(prefix)])
+    cells = None
+    for lower, upper in ranges:
+        cell = Q(geohash__gte=lower, geohash__lt=upper) if upper else Q(geohash__gte=lower)
+        cells = cell if cells is None else cells | cell
+    lat_degrees, lon_degrees = radius_degrees(latitude, radius_km)
+    queryset = queryset.filter(latitude__range=(latitude - lat_degrees, latitude + lat_degrees))
+    if lon_degrees < 180:
+        queryset = queryset.filter(longitude__range=(longitude - lon_degrees, longitude + lon_degrees))
+    if cells is not None:
+        queryset = queryset.filter(cells)
+    return queryset.filter(LessThanOrEqual(distance_sq(latitude, longitude), Value(lat_degrees ** 2)))
+
+
+def annotate_distance(queryset, latitude, longitude):
+    """Annotate each row with ``distance_km`` from the point"""
+    return queryset.annotate(
+        distance_km=ExpressionWrapper(
+            Sqrt(distance_sq(latitude, longitude)) * Value(KM_PER_DEGREE), output_field=FloatField(),
+        ),
+    )
+
+
+def nearest_page(queryset, latitude, longitude, page=1, page_size=24):
+    """One page of ``queryset``, nearest to the point first"""
+    page = page_number(page)
+    offset = (page - 1) * page_size
+    ordered = annotate_distance(queryset, latitude, longitude).order_by('distance_km', 'id')
+    rows = list(ordered[offset:offset + page_size + 1])
+    return SearchPage(rows[:page_size], page, len(rows) > page_size, page_size)
+
+
+def _word_runs(texts):
+    """``{key: position of the text it first appears in}`` for every run of words"""
+    runs = {}
+    for position, text in enumerate(texts):
+        words = place_key(text or '').split()
+        for start in range(len(words)):
+            for length in range(1, min(MAX_PLACE_WORDS, len(words) - start) + 1):
+                runs.setdefault(' '.join(words[start:start + length]), position)
+    return runs
+
+
+def _best_place(places, runs):
+    cities = {place.key for place in places if place.kind == Place.CITY}
+    keys_in_cities = {}
+    for place in places:
+        keys_in_cities.setdefault(place.key, set()).add(place.city)
+
+    def fits(place):
+        if place.kind == Place.CITY:
+            return True
+        if cities:
+            return place.city in cities
+        # No city named: only a name that exists in a single city will do
+        return len(keys_in_cities[place.key]) == 1
+
+    candidates = [place for place in places if fits(place)]
+    if not candidates:
+        return None
+    # Most specific first, then the earliest text (location before
+    # address), then the longest name
+    return max(candidates, key=lambda place: (SPECIFICITY[place.kind], -runs[place.key], len(place.key)))
+
+
+def geocode_many(items, using='default'):
+    """
+    Geocode several listings with one gazetteer query.
+
+    ``items`` maps any key to a tuple of texts, most telling first (e.g.
+    ``(location, address)``). Returns ``{key: (latitude, longitude)}`` for
+    the items that could be placed.
+    """
+    runs = {key: _word_runs(texts) for key, texts in items.items()}
+    wanted = set().union(*runs.values()) if runs else set()
+    if not wanted:
+        return {}
+    by_key = {}
+    for place in Place.objects.using(using).filter(key__in=wanted):
+        by_key.setdefault(place.key, []).append(place)
+
+    located = {}
+    for key, item_runs in runs.items():
+        best = _best_place([place for run in item_runs for place in by_key.get(run, ())], item_runs)
+        if best is not None:
+            located[key] = (best.latitude, best.longitude)
+    return located
+
+
+def geocode(*texts, using='default'):
+    """``(latitude, longitude)`` for the place named in ``texts``, or None"""
+    return geocode_many({None: texts}, using=using).get(None)
+
+
+def set_coordinates(accommodation, coordinates):
+    if coordinates is None:
+        accommodation.latitude = accommodation.longitude = None
+        accommodation.geohash = ''
+    else:
+        accommodation.latitude, accommodation.longitude = coordinates
+        accommodation.geohash = encode(*coordinates)
+
+
+def locate(accommodations, using='default'):
+    """Set the coordinates of ``accommodations`` from their location and address"""
+    accommodations = list(accommodations)
+    located = geocode_many(
+        {index: (accommodation.location, accommodation.address) for index, accommodation in enumerate(accommodations)},
+        using=using,
+    )
+    for index, accommodation in enumerate(accommodations):
+        set_coordinates(accommodation, located.get(index))
+    return accommodations
+
+
+def resolve(near):
+    """
+    Coordinates of a search centre: a ``"lat,lng"`` pair or a place name
+    looked up in the gazetteer (cached). None if it cannot be placed.
+    """
+    match = _COORDINATES.match(near or '')
+    if match:
+        latitude, longitude = float(match.group(1)), float(match.group(2))
+        if -90 <= latitude <= 90 and -180 <= longitude <= 180:
+            return latitude, longitude
+        return None
+    if not place_key(near or ''):
+        return None
+    # A list, because the cache treats None as a miss
+    found = cache.get_or_set(
+        (cache.PLACES,), ('place', place_key(near)), lambda: list(geocode(near) or ()),
+        timeout=PLACE_CACHE_TIMEOUT,
+    )
+    return tuple(found) or None
+
+
+def read_gazetteer(path=GAZETTEER_PATH):
+    """
+    :class:`Place` instances (unsaved) from a CSV file with the columns of
+    ``GAZETTEER_COLUMNS``. ``city`` is the name of the city an area or
+    landmark is in, empty for cities.
+    """
+    kinds = {kind for kind, _ in Place.KIND_CHOICES}
+    with open(path, newline='', encoding='utf-8') as source:
+        reader = csv.DictReader(source)
+        missing = set(GAZETTEER_COLUMNS) - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f'{path}: missing columns {", ".join(sorted(missing))}')
+        for line_number, row in enumerate(reader, start=2):
+            try:
+                latitude, longitude = float(row['latitude']), float(row['longitude'])
+            except ValueError:
+                raise ValueError(f'{path}, line {line_number}: invalid coordinates')
+            if row['kind'] not in kinds or not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+                raise ValueError(f'{path}, line {line_number}: invalid kind or coordinates')
+            yield Place(
+                name=' '.join(row['name'].split())[:100],
+                key=place_key(row['name']),
+                kind=row['kind'],
+                city='' if row['kind'] == Place.CITY else place_key(row['city']),
+                latitude=latitude,
+                longitude=longitude,
+            )
+
+
+def load_gazetteer(path=GAZETTEER_PATH, using='default'):
+    """Add the places of a gazetteer file, updating those already present; returns ``(created, updated)``"""
+    existing = {(place.key, place.city): place for place in Place.objects.using(using)}
+    to_create, to_update = {}, []
+    for place in read_gazetteer(path):
+        current = existing.get((place.key, place.city))
+        if current is None:
+            to_create[place.key, place.city] = place
+        elif (current.name, current.kind, current.latitude, current.longitude) != (
+            place.name, place.kind, place.latitude, place.longitude,
+        ):
+            current.name, current.kind = place.name, place.kind
+            current.latitude, current.longitude = place.latitude, place.longitude
+            to_update.append(current)
+    Place.objects.using(using).bulk_create(to_create.values())
+    Place.objects.using(using).bulk_update(to_update, ['name', 'kind', 'latitude', 'longitude'])
+    if to_create or to_update:
+        cache.bump(cache.PLACES)
+        cache.bump(cache.ACCOMMODATIONS)
+    return len(to_create), len(to_update)
+
+
+def geocode_accommodations(missing_only=False, batch_size=1000, using='default'):
+    """
+    (Re)compute the coordinates of every accommodation, ``batch_size`` rows
+    and one gazetteer query at a time. Returns ``(processed, located)``.
+    """
+    processed = located = 0
+    last_pk = 0
+    rows = Accommodation.objects.using(using).only('pk', 'location', 'address', 'latitude', 'longitude', 'geohash')
+    if missing_only:
+        rows = rows.filter(latitude__isnull=True)
+    while True:
+        batch = list(rows.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        before = {accommodation.pk: accommodation.geohash for accommodation in batch}
+        locate(batch, using=using)
+        changed = [accommodation for accommodation in batch if accommodation.geohash != before[accommodation.pk]]
+        # bulk_update() skips auto_now, and the API validators come from updated_at
+        now = timezone.now()
+        for accommodation in changed:
+            accommodation.updated_at = now
+        Accommodation.objects.using(using).bulk_update(changed, ['latitude', 'longitude', 'geohash', 'updated_at'])
+        processed += len(batch)
+        located += sum(accommodation.latitude is not None for accommodation in batch)
+    cache.bump(cache.ACCOMMODATIONS)
+    return processed, located
@@ -0,0 +1,32 @@
+"""
+Password hashers with costs taken from settings
+
+Django's hashers hard-code their work factors. These subclasses read them
+from ``ARGON2_TIME_COST``, ``ARGON2_MEMORY_COST``, ``ARGON2_PARALLELISM`` and
+``PBKDF2_ITERATIONS``. Their ``must_update()`` compares a stored hash with the
+current parameters, so after a cost change each password is re-hashed the
+next time its owner signs in. ``manage.py benchmark_login`` measures what a
+setting costs per login.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+
+
+class ConfigurableArgon2PasswordHasher(Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return settings.PBKDF2_ITERATIONS
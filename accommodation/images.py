@@ -0,0 +1,234 @@
+"""
+Accommodation photos
+
+Uploads are validated with Pillow and stored unchanged under a name derived
+from the SHA-256 of their content, in the storage configured by
+``IMAGE_STORAGE`` (local filesystem, Supabase Storage or memory). A
+background job (``tasks.PROCESS_IMAGE``) then decodes each original once and
+writes WebP and JPEG variants at every width in ``IMAGE_WIDTHS`` up to the
+original's width, again under content-hash names.
+
+Because a file name changes whenever its bytes do, every image URL is
+immutable and served with a far-future Cache-Control header. Identical
+files are stored once, however many listings use them.
+
+Ready images are summarized in ``Accommodation.images`` (see
+:func:`refresh_manifest`), so the listing grid renders ``srcset`` markup
+without querying the images table.
+"""
+import hashlib
+import io
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps
+
+from . import cache
+from .models import Accommodation, AccommodationImage
+
+ORIGINALS_DIR = 'images/originals'
+VARIANTS_DIR = 'images/variants'
+# Pillow format -> file extension of accepted uploads
+UPLOAD_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+# (variant format, Pillow format, extension, MIME type, save options)
+VARIANT_FORMATS = (
+    ('webp', 'WEBP', 'webp', 'image/webp', {'quality': 80, 'method': 4}),
+    ('jpeg', 'JPEG', 'jpg', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+# Larger uploads are rejected before they are decoded
+MAX_PIXELS = 40_000_000
+# Width of the fallback ``src`` for browsers without srcset support
+FALLBACK_WIDTH = 640
+
+
+class ImageError(ValueError):
+    """Raised for uploads that are not acceptable images"""
+
+
+@lru_cache(maxsize=None)
+def _storage(path):
+    return import_string(path)()
+
+
+def get_storage():
+    """The storage configured by ``IMAGE_STORAGE``"""
+    return _storage(settings.IMAGE_STORAGE)
+
+
+def _hashed_name(directory, data, extension):
+    digest = hashlib.sha256(data).hexdigest()
+    return digest, f'{directory}/{digest[:2]}/{digest}.{extension}'
+
+
+def _store(name, data):
+    storage = get_storage()
+    if storage.exists(name):
+        # Same name, same bytes
+        return name
+    return storage.save(name, ContentFile(data))
+
+
+def add_image(accommodation, upload, alt=''):
+    """
+    Validate and store an uploaded file for ``accommodation``.
+
+    Returns ``(image, created)``; uploading a photo the accommodation already
+    has returns the existing image. The caller queues the processing job.
+    """
+    if upload.size > settings.IMAGE_MAX_UPLOAD_SIZE:
+        raise ImageError(f'Images must be smaller than {settings.IMAGE_MAX_UPLOAD_SIZE // (1024 * 1024)} MB.')
+    data = upload.read()
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image_format = image.format
+            width, height = image.size
+            if width * height > MAX_PIXELS:
+                raise ImageError('The image has too many pixels.')
+            image.verify()
+    except ImageError:
+        raise
+    except Exception:
+        # Pillow raises a range of errors for truncated or malformed files
+        raise ImageError('The file is not a valid image.')
+    if image_format not in UPLOAD_FORMATS:
+        raise ImageError('Upload JPEG, PNG or WebP images.')
+
+    digest, name = _hashed_name(ORIGINALS_DIR, data, UPLOAD_FORMATS[image_format])
+    existing = accommodation.photos.filter(content_hash=digest).first()
+    if existing is not None:
+        return existing, False
+
+    last_position = accommodation.photos.aggregate(last=Max('position'))['last']
+    image = AccommodationImage.objects.create(
+        accommodation=accommodation,
+        content_hash=digest,
+        original=_store(name, data),
+        width=width,
+        height=height,
+        alt=alt[:200],
+        position=0 if last_position is None else last_position + 1,
+    )
+    return image, True
+
+
+def variant_widths(width):
+    """Widths generated for an original ``width`` pixels wide"""
+    return sorted({min(target, width) for target in settings.IMAGE_WIDTHS})
+
+
+def _encode(image, pil_format, options):
+    if pil_format == 'JPEG' and image.mode == 'RGBA':
+        # JPEG has no alpha channel: flatten onto white
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def process(image_id):
+    """Generate the variants of one image and publish it in the manifest"""
+    image = AccommodationImage.objects.filter(pk=image_id).first()
+    if image is None:
+        return
+    with get_storage().open(image.original) as original:
+        data = original.read()
+
+    with Image.open(io.BytesIO(data)) as source:
+        largest = max(settings.IMAGE_WIDTHS)
+        # Lets the JPEG decoder scale down by 1/2, 1/4 or 1/8 while decoding
+        source.draft('RGB', (largest, largest))
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ('RGB', 'RGBA'):
+            source = source.convert('RGBA' if 'transparency' in source.info or source.mode in ('LA', 'P') else 'RGB')
+        # Dimensions after rotation, scaled back to the original if decoded smaller
+        scale = max(image.width, image.height) / max(source.size)
+        width, height = round(source.width * scale), round(source.height * scale)
+
+        variants = {variant: [] for variant, *_ in VARIANT_FORMATS}
+        for target in variant_widths(width):
+            size = (min(target, source.width), max(1, round(source.height * min(target, source.width) / source.width)))
+            resized = source if size == source.size else source.resize(size, Image.LANCZOS)
+            for variant, pil_format, extension, _, options in VARIANT_FORMATS:
+                encoded = _encode(resized, pil_format, options)
+                _, name = _hashed_name(VARIANTS_DIR, encoded, extension)
+                variants[variant].append([target, _store(name, encoded)])
+
+    AccommodationImage.objects.filter(pk=image.pk).update(
+        width=width, height=height, variants=variants, status=AccommodationImage.READY,
+    )
+    refresh_manifest(image.accommodation_id)
+
+
+def refresh_manifest(accommodation_id):
+    """Rewrite ``Accommodation.images`` from the accommodation's ready images"""
+    manifest = [
+        {'id': pk, 'width': width, 'height': height, 'alt': alt, 'variants': variants}
+        for pk, width, height, alt, variants in AccommodationImage.objects.filter(
+            accommodation_id=accommodation_id, status=AccommodationImage.READY,
+        ).order_by('position', 'id').values_list('pk', 'width', 'height', 'alt', 'variants')
+    ]
+    Accommodation.objects.filter(pk=accommodation_id).update(images=manifest, updated_at=timezone.now())
+    cache.bump(cache.ACCOMMODATIONS)
+
+
+def delete_files(content_hash, names):
+    """Delete an image's files unless another image has the same content"""
+    if AccommodationImage.objects.filter(content_hash=content_hash).exists():
+        return
+    storage = get_storage()
+    for name in names:
+        storage.delete(name)
+
+
+def image_files(image):
+    """Every storage name used by ``image``"""
+    return [image.original] + [name for sizes in image.variants.values() for _, name in sizes]
+
+
+def url(name):
+    return get_storage().url(name)
+
+
+def _srcset(sizes):
+    return ', '.join(f'{url(name)} {width}w' for width, name in sizes)
+
+
+def picture(entry):
+    """
+    Template data for one manifest entry: ``sources`` as ``(mime_type,
+    srcset)`` for ``<source>`` elements, plus the ``<img>`` fallback.
+    """
+    variants = entry.get('variants') or {}
+    sources = [
+        (mime_type, _srcset(variants[variant]))
+        for variant, _, _, mime_type, _ in VARIANT_FORMATS
+        if variants.get(variant)
+    ]
+    fallback = variants.get('jpeg') or next(iter(variants.values()), [])
+    if not fallback:
+        return None
+    src = min(fallback, key=lambda size: abs(size[0] - FALLBACK_WIDTH))[1]
+    return {
+        'sources': sources,
+        'src': url(src),
+        'width': entry.get('width'),
+        'height': entry.get('height'),
+        'alt': entry.get('alt', ''),
+    }
+
+
+def manifest_urls(manifest):
+    """``Accommodation.images`` with storage names replaced by URLs"""
+    return [
+        dict(entry, variants={
+            variant: [[width, url(name)] for width, name in sizes]
+            for variant, sizes in (entry.get('variants') or {}).items()
+        })
+        for entry in manifest or []
+    ]
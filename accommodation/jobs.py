@@ -0,0 +1,163 @@
+"""
+Database-backed background job queue
+
+Request handlers call :func:`enqueue` and return; the job row is written in
+the same transaction as the data it refers to, so a job is never lost or
+run for a write that was rolled back. ``manage.py run_jobs`` workers pick up
+due jobs and run the registered handler.
+
+* Claiming is a conditional UPDATE (``status=queued`` -> ``running``), so any
+  number of worker processes can poll the same table on SQLite or
+  PostgreSQL without running a job twice. Jobs whose worker died are
+  reclaimed once their lock is older than ``JOB_LOCK_TIMEOUT`` seconds.
+* Failures are retried with exponential backoff (``JOB_RETRY_BACKOFF``
+  seconds, doubled per attempt, with jitter) until ``max_attempts``.
+* An ``idempotency_key`` makes enqueueing the same event twice a no-op.
+
+Handlers are registered with :func:`task` and receive the job payload as
+keyword arguments.
+"""
+import logging
+import os
+import random
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF = 3600
+
+_registry = {}
+
+
+class UnknownTask(LookupError):
+    """Raised for jobs whose name has no registered handler"""
+
+
+def task(name):
+    """Register the decorated function as the handler for jobs called ``name``"""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def _new_job(name, payload, idempotency_key, run_at, max_attempts):
+    if name not in _registry:
+        raise UnknownTask(name)
+    return Job(
+        name=name,
+        payload=payload or {},
+        idempotency_key=idempotency_key,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def enqueue(name, payload=None, idempotency_key=None, run_at=None, max_attempts=None):
+    """
+    Queue the task ``name``. Returns the job, or the existing job when one
+    with the same ``idempotency_key`` was already queued.
+    """
+    job = _new_job(name, payload, idempotency_key, run_at, max_attempts)
+    if idempotency_key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        return Job.objects.get(idempotency_key=idempotency_key)
+    return job
+
+
+def enqueue_many(jobs):
+    """
+    Queue several ``(name, payload, idempotency_key)`` tuples with one INSERT.
+    Keys that already exist are skipped.
+    """
+    Job.objects.bulk_create(
+        [_new_job(name, payload, key, None, None) for name, payload, key in jobs],
+        ignore_conflicts=True,
+    )
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def backoff(attempts):
+    """Seconds to wait before retrying a job that has failed ``attempts`` times"""
+    delay = min(settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1), MAX_BACKOFF)
+    return delay + random.uniform(0, delay / 10)
+
+
+def claim(worker_id, limit=10):
+    """Atomically take up to ``limit`` due jobs for ``worker_id``"""
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    due = Q(status=Job.QUEUED, run_at__lte=now) | Q(status=Job.RUNNING, locked_at__lt=stale)
+    candidates = list(Job.objects.filter(due).order_by('run_at', 'id').values_list('pk', 'status', 'locked_at')[:limit])
+
+    claimed = []
+    for pk, status, locked_at in candidates:
+        # Only succeeds if no other worker changed the row since it was read
+        won = Job.objects.filter(pk=pk, status=status, locked_at=locked_at).update(
+            status=Job.RUNNING, locked_at=now, locked_by=worker_id, attempts=F('attempts') + 1, updated_at=now,
+        )
+        if won:
+            claimed.append(pk)
+    return list(Job.objects.filter(pk__in=claimed).order_by('run_at', 'id'))
+
+
+def run(job):
+    """Run one claimed job and record the outcome. Returns True on success."""
+    try:
+        handler = _registry.get(job.name)
+        if handler is None:
+            raise UnknownTask(job.name)
+        handler(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            retry_at = timezone.now() + timedelta(seconds=backoff(job.attempts))
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.QUEUED, run_at=retry_at, locked_at=None, locked_by='', last_error=error, updated_at=timezone.now(),
+            )
+            logger.warning('Job %s failed (attempt %s/%s), retrying at %s', job, job.attempts, job.max_attempts, retry_at)
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.FAILED, locked_at=None, last_error=error, updated_at=timezone.now(),
+            )
+            logger.error('Job %s failed permanently after %s attempts', job, job.attempts)
+        return False
+
+    Job.objects.filter(pk=job.pk).update(status=Job.DONE, locked_at=None, last_error='', updated_at=timezone.now())
+    return True
+
+
+def run_pending(worker_id=None, limit=10):
+    """Claim and run one batch of due jobs. Returns ``(succeeded, failed)``."""
+    worker_id = worker_id or default_worker_id()
+    succeeded = failed = 0
+    for job in claim(worker_id, limit=limit):
+        if run(job):
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
+
+
+def purge(older_than_days=7):
+    """Delete finished jobs older than ``older_than_days``"""
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deleted, _ = Job.objects.filter(status=Job.DONE, updated_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,108 @@
+import json
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accommodation import counters
+from accommodation.models import Accommodation, Application, User
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare approving N pending applications one POST at a time with the '
+        'bulk review endpoint. Runs inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--applications', type=int, default=500)
+        parser.add_argument('--accommodations', type=int, default=50)
+        parser.add_argument(
+            '--follow', action='store_true',
+            help='Also render the dashboard each POST redirects to, like a browser would',
+        )
+        parser.add_argument('--json', action='store_true', help='Print raw results as JSON')
+
+    def handle(self, *args, **options):
+        results = {}
+        for path in ('per_row', 'bulk'):
+            try:
+                with transaction.atomic():
+                    client, ids = self._seed(options['applications'], options['accommodations'])
+                    results[path] = getattr(self, f'_run_{path}')(client, ids, options['follow'])
+                    results[path]['counter_drift'] = sum(counters.reconcile(dry_run=True).values())
+                    raise Rollback
+            except Rollback:
+                pass
+
+        per_row, bulk = results['per_row'], results['bulk']
+        results['speedup'] = round(per_row['seconds'] / bulk['seconds'], 1) if bulk['seconds'] else None
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f'{"path":<10}{"seconds":>10}{"queries":>10}{"drift":>8}')
+        for path in ('per_row', 'bulk'):
+            result = results[path]
+            self.stdout.write(f'{path:<10}{result["seconds"]:>10.3f}{result["queries"]:>10}{result["counter_drift"]:>8}')
+        self.stdout.write(f'Bulk review is {results["speedup"]}x faster for {options["applications"]} applications.')
+
+    def _seed(self, count, accommodation_count):
+        token = uuid.uuid4().hex[:12]
+        admin = User.objects.create_user(
+            username=f'bench-admin-{token}', email=f'bench-admin-{token}@example.invalid',
+            password=uuid.uuid4().hex, role='admin',
+        )
+        applicant = User.objects.create_user(
+            username=f'bench-{token}', email=f'bench-{token}@example.invalid', password=uuid.uuid4().hex,
+        )
+        accommodations = Accommodation.objects.bulk_create([
+            Accommodation(
+                title=f'Benchmark unit {i}', description='Benchmark', type='Room', location='Benchmark',
+                address='Benchmark', price=Decimal('100'), religious_preference='Any', bedrooms=1,
+                bathrooms=Decimal('1'), contact_email='bench@example.invalid', contact_phone='0',
+            )
+            for i in range(max(accommodation_count, 1))
+        ])
+        # Created one by one so the counters start out consistent
+        ids = [
+            Application.objects.create(
+                accommodation=accommodations[i % len(accommodations)], user=applicant, user_name='Benchmark',
+                user_email=applicant.email, user_phone='0', message='Benchmark',
+            ).pk
+            for i in range(count)
+        ]
+        client = Client()
+        client.force_login(admin)
+        return client, ids
+
+    def _measure(self, func):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            func()
+            seconds = time.perf_counter() - start
+        return {'seconds': round(seconds, 4), 'queries': len(queries)}
+
+    def _run_per_row(self, client, ids, follow):
+        def run():
+            for pk in ids:
+                client.post(reverse('update_application_status', args=[pk]), {'status': 'Approved'}, follow=follow)
+        return self._measure(run)
+
+    def _run_bulk(self, client, ids, follow):
+        def run():
+            client.post(
+                reverse('bulk_update_application_status'),
+                {'status': 'Approved', 'application_ids': ids},
+                follow=follow,
+            )
+        return self._measure(run)
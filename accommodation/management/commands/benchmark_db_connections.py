@@ -0,0 +1,114 @@
+import copy
+import json
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.db.utils import load_backend
+from django.test import Client
+
+from accommodation.models import User
+
+MODES = ('pooler', 'persistent', 'pool')
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure p50/p99 request latency for each database connection mode. '
+        'Point DB_* at a local PostgreSQL (e.g. the postgres Docker image) '
+        'with USE_SUPABASE=True before running.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--path', default='/accommodations/')
+        parser.add_argument('--modes', default=','.join(MODES))
+        parser.add_argument('--pool-size', type=int, default=4)
+        parser.add_argument('--json', action='store_true', help='Print raw results as JSON')
+
+    def handle(self, *args, **options):
+        if connections[DEFAULT_DB_ALIAS].vendor != 'postgresql':
+            raise CommandError('This benchmark needs a PostgreSQL database (set USE_SUPABASE=True and DB_*).')
+
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f'Unknown mode(s): {", ".join(sorted(unknown))}')
+
+        base_settings = copy.deepcopy(connections[DEFAULT_DB_ALIAS].settings_dict)
+        user = User.objects.create_user(
+            username=f'bench-{uuid.uuid4().hex[:12]}',
+            email=f'bench-{uuid.uuid4().hex[:12]}@example.invalid',
+            password=uuid.uuid4().hex,
+        )
+        results = {}
+        try:
+            for mode in modes:
+                self._use_mode(mode, base_settings, options['pool_size'])
+                results[mode] = self._run(user, options)
+        finally:
+            self._use_mode(None, base_settings, options['pool_size'])
+            user.delete()
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f'{"mode":<12}{"p50 ms":>10}{"p99 ms":>10}{"mean ms":>10}{"req/s":>10}')
+        for mode, result in results.items():
+            self.stdout.write(
+                f'{mode:<12}{result["p50_ms"]:>10.2f}{result["p99_ms"]:>10.2f}'
+                f'{result["mean_ms"]:>10.2f}{result["requests_per_second"]:>10.1f}'
+            )
+
+    def _use_mode(self, mode, base_settings, pool_size):
+        """Swap the default connection for one configured for ``mode``"""
+        settings_dict = copy.deepcopy(base_settings)
+        if mode is not None:
+            settings_dict.pop('POOL', None)
+            settings_dict['ENGINE'] = 'django.db.backends.postgresql'
+            settings_dict['CONN_MAX_AGE'] = 0
+            if mode == 'persistent':
+                settings_dict['CONN_MAX_AGE'] = 600
+            elif mode == 'pool':
+                settings_dict['ENGINE'] = 'harmony_housing.pooled_postgresql'
+                settings_dict['POOL'] = {'MAX_SIZE': pool_size}
+
+        connections[DEFAULT_DB_ALIAS].close()
+        backend = load_backend(settings_dict['ENGINE'])
+        connections[DEFAULT_DB_ALIAS] = backend.DatabaseWrapper(settings_dict, DEFAULT_DB_ALIAS)
+
+    def _run(self, user, options):
+        client = Client()
+        client.force_login(user)
+
+        def request():
+            # The test client deliberately skips Django's per-request
+            # connection cleanup, so emulate what a real server does
+            close_old_connections()
+            started = time.perf_counter()
+            response = client.get(options['path'])
+            elapsed = time.perf_counter() - started
+            close_old_connections()
+            if response.status_code >= 400:
+                raise CommandError(f'{options["path"]} returned {response.status_code}')
+            return elapsed
+
+        for _ in range(options['warmup']):
+            request()
+
+        started = time.perf_counter()
+        timings = [request() for _ in range(options['requests'])]
+        wall_time = time.perf_counter() - started
+
+        percentiles = statistics.quantiles(timings, n=100)
+        return {
+            'requests': len(timings),
+            'p50_ms': percentiles[49] * 1000,
+            'p99_ms': percentiles[98] * 1000,
+            'mean_ms': statistics.fmean(timings) * 1000,
+            'requests_per_second': len(timings) / wall_time,
+        }
@@ -0,0 +1,124 @@
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from accommodation.models import User
+
+HASHERS = {
+    'argon2': 'accommodation.hashers.ConfigurableArgon2PasswordHasher',
+    'pbkdf2': 'accommodation.hashers.ConfigurablePBKDF2PasswordHasher',
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure sign-in cost per password hasher: authenticate() calls per '
+        'second on one core, queries per login, the full login POST, and '
+        'rehashing of a hash made by the other hasher. Runs inside a '
+        'transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=50, help='authenticate() calls per hasher')
+        parser.add_argument(
+            '--hashers', nargs='+', choices=sorted(HASHERS), default=None,
+            help='Hashers to compare (default: both, argon2 only if argon2-cffi is installed)',
+        )
+        parser.add_argument('--json', action='store_true', help='Print raw results as JSON')
+
+    def handle(self, *args, **options):
+        hashers = options['hashers'] or [
+            name for name in ('argon2', 'pbkdf2') if name != 'argon2' or self._argon2_available()
+        ]
+        results = {
+            'settings': {
+                'ARGON2_TIME_COST': settings.ARGON2_TIME_COST,
+                'ARGON2_MEMORY_COST': settings.ARGON2_MEMORY_COST,
+                'ARGON2_PARALLELISM': settings.ARGON2_PARALLELISM,
+                'PBKDF2_ITERATIONS': settings.PBKDF2_ITERATIONS,
+            },
+            'hashers': {},
+        }
+        for name in hashers:
+            preferred = [HASHERS[name]] + [path for key, path in HASHERS.items() if key != name]
+            try:
+                with override_settings(PASSWORD_HASHERS=preferred), transaction.atomic():
+                    results['hashers'][name] = self._run(name, options['logins'])
+                    raise Rollback
+            except Rollback:
+                pass
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f'{"hasher":<8}{"ms/login":>10}{"logins/s/core":>15}{"queries":>9}{"POST ms":>9}{"rehash":>8}'
+        )
+        for name, result in results['hashers'].items():
+            self.stdout.write(
+                f'{name:<8}{result["ms_per_login"]:>10.1f}{result["logins_per_second_per_core"]:>15.1f}'
+                f'{result["queries_per_login"]:>9}{result["login_post_ms"]:>9.1f}'
+                f'{"yes" if result["rehashed_on_login"] else "no":>8}'
+            )
+
+    def _argon2_available(self):
+        try:
+            import argon2  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def _run(self, name, logins):
+        token = uuid.uuid4().hex[:12]
+        password = uuid.uuid4().hex
+        email = f'Bench-Login-{token}@Example.invalid'
+        user = User.objects.create_user(username=f'bench-login-{token}', email=email, password=password)
+        algorithm = identify_hasher(user.password).algorithm
+
+        # Mixed case on purpose: the lookup ignores case
+        with CaptureQueriesContext(connection) as queries:
+            assert authenticate(email=email.lower(), password=password) is not None
+        # Read now: the login request below clears the query log
+        login_queries = len(queries)
+        start = time.perf_counter()
+        for _ in range(logins):
+            authenticate(email=email, password=password)
+        seconds = (time.perf_counter() - start) / max(logins, 1)
+
+        client = Client()
+        start = time.perf_counter()
+        response = client.post(reverse('auth_login'), {'email': email, 'password': password})
+        post_ms = (time.perf_counter() - start) * 1000
+
+        # A hash made by the other hasher is replaced on the first login
+        other = next(key for key in HASHERS if key != name)
+        legacy = User.objects.create_user(
+            username=f'bench-legacy-{token}', email=f'bench-legacy-{token}@example.invalid',
+        )
+        with override_settings(PASSWORD_HASHERS=[HASHERS[other], HASHERS[name]]):
+            User.objects.filter(pk=legacy.pk).update(password=make_password(password))
+        authenticate(email=legacy.email, password=password)
+        legacy.refresh_from_db(fields=['password'])
+
+        return {
+            'algorithm': algorithm,
+            'ms_per_login': round(seconds * 1000, 2),
+            'logins_per_second_per_core': round(1 / seconds, 1) if seconds else None,
+            'queries_per_login': login_queries,
+            'login_post_status': response.status_code,
+            'login_post_ms': round(post_ms, 1),
+            'rehashed_on_login': identify_hasher(legacy.password).algorithm == algorithm,
+        }
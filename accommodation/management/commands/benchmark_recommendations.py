@@ -0,0 +1,111 @@
+import json
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accommodation import benchmarks, recommendations
+from accommodation.models import Accommodation, Application, User
+from accommodation.profiling import percentiles
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic dataset and time the recommender: building the feature '
+        'index, an incremental sync after one save, scoring (top-k) per user, '
+        'and recommend() on a cold cache. Runs inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--accommodations', type=int, default=100_000)
+        parser.add_argument('--users', type=int, default=200, help='Users to score (and seed)')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--json', action='store_true', help='Print raw results as JSON')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                start = time.perf_counter()
+                benchmarks.seed(
+                    accommodations=options['accommodations'], users=options['users'],
+                    batch_size=options['batch_size'],
+                )
+                seconds = time.perf_counter() - start
+                self.stderr.write(f'Seeded {options["accommodations"]} accommodations in {seconds:.1f} s')
+                result = self._run(options['users'])
+                raise Rollback
+        except Rollback:
+            pass
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+        self.stdout.write(
+            f'{result["listings"]} listings, feature index {result["index_kib"]} KiB\n'
+            f'build:             {result["build_ms"]:>8.1f} ms\n'
+            f'sync after a save: {result["sync_ms"]:>8.1f} ms, {result["sync_queries"]} queries\n'
+            f'scoring (top {recommendations.RECOMMENDATION_COUNT}): p50 {result["score_ms"]["p50"]} ms, '
+            f'p95 {result["score_ms"]["p95"]} ms over {result["users"]} users\n'
+            f'recommend(), cold cache: p50 {result["recommend_ms"]["p50"]} ms, '
+            f'p95 {result["recommend_ms"]["p95"]} ms'
+        )
+
+    def _run(self, user_count):
+        # As if the listings were written a while ago: rows updated within
+        # SYNC_OVERLAP of the last sync are read again by every sync
+        Accommodation.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        index = recommendations.FeatureIndex()
+        start = time.perf_counter()
+        index.sync()
+        build_ms = (time.perf_counter() - start) * 1000
+
+        # One save moves the cache version; only that row is read again
+        accommodation = Accommodation.objects.order_by('pk').first()
+        accommodation.price += 1
+        accommodation.save()
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            index.sync()
+            sync_ms = (time.perf_counter() - start) * 1000
+        sync_queries = len(queries)
+
+        users = list(User.objects.filter(role='user').order_by('pk')[:user_count])
+        history = {}
+        for user_id, accommodation_id in Application.objects.filter(user__in=users).values_list(
+            'user_id', 'accommodation_id',
+        ):
+            history.setdefault(user_id, []).append(accommodation_id)
+
+        scoring = []
+        for user in users:
+            start = time.perf_counter()
+            index.top(user.religious_preference, history.get(user.pk, []))
+            scoring.append((time.perf_counter() - start) * 1000)
+
+        # Each user has their own cache entry, so every call below is a miss
+        recommending = []
+        recommendations.get_index()
+        for user in users[:50]:
+            start = time.perf_counter()
+            recommendations.recommend(user)
+            recommending.append((time.perf_counter() - start) * 1000)
+
+        nbytes = sum(array.nbytes for array in (index.ids, index.codes, index.values, index.available))
+        return {
+            'listings': len(index),
+            'index_kib': round(nbytes / 1024),
+            'build_ms': round(build_ms, 1),
+            'sync_ms': round(sync_ms, 1),
+            'sync_queries': sync_queries,
+            'users': len(users),
+            'score_ms': percentiles(sorted(scoring)),
+            'recommend_ms': percentiles(sorted(recommending)),
+        }
@@ -0,0 +1,111 @@
+import json
+import uuid
+
+from django.core.cache import cache as django_cache
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from accommodation import benchmarks
+from accommodation.models import User
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+MESSAGE_STORAGES = {
+    'fallback': 'django.contrib.messages.storage.fallback.FallbackStorage',
+    'cookie': 'django.contrib.messages.storage.cookie.CookieStorage',
+    'session': 'django.contrib.messages.storage.session.SessionStorage',
+}
+# Warm requests made as the logged-in user after the login redirect
+ROUTES = ('accommodations', 'my_applications')
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Count the queries per request, and how many of them touch django_session, '
+        'for each session engine and message storage: the login POST, the redirect '
+        'that shows the welcome message, and warm requests to the listing and '
+        'my-applications pages. Runs inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', nargs='+', choices=list(SESSION_ENGINES), default=list(SESSION_ENGINES))
+        parser.add_argument(
+            '--messages', nargs='+', choices=list(MESSAGE_STORAGES), default=['fallback', 'cookie'],
+        )
+        parser.add_argument('--accommodations', type=int, default=500, help='Size of the seeded dataset')
+        parser.add_argument('--json', action='store_true', help='Print raw results as JSON')
+
+    def handle(self, *args, **options):
+        results = []
+        try:
+            with transaction.atomic():
+                dataset = benchmarks.seed(accommodations=options['accommodations'])
+                email, password = self._user(dataset)
+                for session in options['sessions']:
+                    for storage in options['messages']:
+                        with override_settings(
+                            SESSION_ENGINE=SESSION_ENGINES[session], MESSAGE_STORAGE=MESSAGE_STORAGES[storage],
+                        ):
+                            results.append({'sessions': session, 'messages': storage, **self._run(email, password)})
+                raise Rollback
+        except Rollback:
+            pass
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write('queries per request (of which django_session)')
+        columns = ['login POST', 'redirect'] + list(ROUTES)
+        self.stdout.write(f'{"sessions":<16}{"messages":<10}' + ''.join(f'{column:>18}' for column in columns))
+        for result in results:
+            cells = ''.join(
+                f'{"%d (%d)" % (result[column]["queries"], result[column]["session_queries"]):>18}'
+                for column in columns
+            )
+            self.stdout.write(f'{result["sessions"]:<16}{result["messages"]:<10}{cells}')
+
+    def _user(self, dataset):
+        # The seeded user has an unusable password; give it one to log in with
+        password = uuid.uuid4().hex
+        user = User.objects.get(pk=dataset.user.pk)
+        user.set_password(password)
+        user.save(update_fields=['password'])
+        return user.email, password
+
+    def _count(self, request):
+        # The query log is bounded and cleared by every request: start
+        # empty and read it before the next one
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            response = benchmarks.consume(request())
+        return response, {
+            'status': response.status_code,
+            'queries': len(queries),
+            'session_queries': sum('django_session' in query['sql'] for query in queries),
+        }
+
+    def _run(self, email, password):
+        django_cache.clear()
+        # New client, so SessionMiddleware is built with the engine under test
+        client = Client()
+        result = {}
+        response, result['login POST'] = self._count(
+            lambda: client.post(reverse('auth_login'), {'email': email, 'password': password})
+        )
+        _, result['redirect'] = self._count(lambda: client.get(response.url))
+        for route in ROUTES:
+            # First request fills the page caches; the second is what a
+            # returning user costs
+            client.get(reverse(route))
+            _, result[route] = self._count(lambda: client.get(reverse(route)))
+        return result
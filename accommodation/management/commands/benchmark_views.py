@@ -0,0 +1,109 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accommodation import benchmarks
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed synthetic datasets and measure the query count, p50/p95 latency and '
+        'peak memory of every route in accommodation/urls.py. Each scale runs '
+        'inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales', type=int, nargs='+', default=[1000, 10000, 100000],
+            help='Number of accommodations (and applications) to seed, one run per value',
+        )
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per route')
+        parser.add_argument('--routes', nargs='+', help='Only measure these URL names')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('-o', '--output', help='Write the results as JSON to this file')
+        parser.add_argument('--json', action='store_true', help='Print raw results as JSON')
+        parser.add_argument(
+            '--baseline',
+            help='JSON results of an earlier run; fail if a route runs more queries or is slower',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=1.5,
+            help='Allowed p95 latency ratio against the baseline (default 1.5)',
+        )
+
+    def handle(self, *args, **options):
+        results = {
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'repeat': options['repeat'],
+            'scales': {},
+        }
+        for scale in options['scales']:
+            try:
+                with transaction.atomic():
+                    results['scales'][str(scale)] = self._run(scale, options)
+                    raise Rollback
+            except Rollback:
+                pass
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self._print(results)
+
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                regressions = self._compare(json.load(baseline), results, options['tolerance'])
+            if regressions:
+                raise CommandError('Performance regressions:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
+
+    def _run(self, scale, options):
+        self.stderr.write(f'Seeding {scale} accommodations and applications...')
+        start = time.perf_counter()
+        dataset = benchmarks.seed(accommodations=scale, applications=scale, batch_size=options['batch_size'])
+        run = {'dataset': dataset.counts, 'seed_seconds': round(time.perf_counter() - start, 2), 'routes': {}}
+
+        clients = benchmarks.Clients()
+        for route in benchmarks.route_requests(dataset):
+            if options['routes'] and route.name not in options['routes']:
+                continue
+            run['routes'][route.name] = benchmarks.measure(route, clients[route.user], options['repeat'])
+        return run
+
+    def _print(self, results):
+        for scale, run in results['scales'].items():
+            self.stdout.write(f'\n{scale} accommodations (seeded in {run["seed_seconds"]}s)')
+            self.stdout.write(f'{"route":<34}{"status":>7}{"queries":>9}{"p50 ms":>10}{"p95 ms":>10}{"peak KiB":>11}')
+            for name, route in run['routes'].items():
+                latency = route['latency_ms']
+                self.stdout.write(
+                    f'{name:<34}{route["status"]:>7}{route["queries"]:>9}'
+                    f'{latency["p50"]:>10.2f}{latency["p95"]:>10.2f}{route["peak_memory_kib"]:>11.1f}'
+                )
+
+    def _compare(self, baseline, results, tolerance):
+        regressions = []
+        for scale, run in results['scales'].items():
+            before = baseline.get('scales', {}).get(scale, {}).get('routes', {})
+            for name, route in run['routes'].items():
+                if name not in before:
+                    continue
+                if route['queries'] > before[name]['queries']:
+                    regressions.append(
+                        f'{scale} {name}: {route["queries"]} queries, was {before[name]["queries"]}'
+                    )
+                p95, old_p95 = route['latency_ms']['p95'], before[name]['latency_ms']['p95']
+                if p95 > old_p95 * tolerance:
+                    regressions.append(f'{scale} {name}: p95 {p95:.2f} ms, was {old_p95:.2f} ms')
+        return regressions
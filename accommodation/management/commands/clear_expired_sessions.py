@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from accommodation import sessions
+
+
+class Command(BaseCommand):
+    help = 'Delete expired rows from django_session in small batches (a gentler clearsessions)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep between batches')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        deleted = sessions.delete_expired(
+            batch_size=options['batch_size'], pause=options['pause'], using=options['database'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired sessions.'))
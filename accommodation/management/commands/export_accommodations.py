@@ -0,0 +1,24 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from accommodation import bulk
+
+
+class Command(BaseCommand):
+    help = 'Stream every accommodation to CSV or JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=bulk.FORMATS, default='csv')
+        parser.add_argument('--output', '-o', default='-', help="Output file, or '-' for stdout")
+        parser.add_argument('--chunk-size', type=int, default=bulk.EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        output = options['output']
+        stream = sys.stdout if output == '-' else open(output, 'w', encoding='utf-8', newline='')
+        try:
+            for line in bulk.export_accommodations(options['format'], chunk_size=options['chunk_size']):
+                stream.write(line)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
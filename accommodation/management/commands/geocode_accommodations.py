@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from accommodation import geo
+
+
+class Command(BaseCommand):
+    help = 'Set the coordinates of accommodations from their location and address using the gazetteer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--missing', action='store_true', help='Only accommodations without coordinates')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        processed, located = geo.geocode_accommodations(
+            missing_only=options['missing'], batch_size=options['batch_size'], using=options['database'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Located {located} of {processed} accommodations.'))
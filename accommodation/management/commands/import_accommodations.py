@@ -0,0 +1,46 @@
+import sys
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accommodation import bulk
+
+
+class Command(BaseCommand):
+    help = 'Create or update accommodations from a CSV or JSONL file (rows with an id are updated)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or '-' for stdin")
+        parser.add_argument('--format', choices=bulk.FORMATS, help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=bulk.IMPORT_CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Validate without writing')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or bulk.guess_format(path)
+        try:
+            if path != '-':
+                # stdin cannot be read twice; it stops at its first undecodable line instead
+                with open(path, 'rb') as binary_file:
+                    bulk.check_encoding(binary_file)
+            source = nullcontext(sys.stdin) if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        except (OSError, bulk.ImportFormatError) as exc:
+            raise CommandError(exc)
+
+        with source as stream:
+            result = bulk.import_accommodations(
+                bulk.read_rows(stream, fmt), chunk_size=options['chunk_size'], dry_run=options['dry_run']
+            )
+
+        for line_number, errors in result.errors:
+            for field_name, messages in errors.items():
+                self.stderr.write(f'line {line_number}: {field_name}: {" ".join(messages)}')
+        if result.truncated_errors:
+            self.stderr.write(f'... and {result.truncated_errors} more invalid row(s)')
+        if result.read_error:
+            self.stderr.write(f'{result.read_error} The rows before it were {"validated" if options["dry_run"] else "imported"}.')
+
+        verb = 'Would create' if options['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {result.created}, updated {result.updated}, skipped {result.failed} invalid row(s).'
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from accommodation import geo
+
+
+class Command(BaseCommand):
+    help = (
+        'Add or update gazetteer places from a CSV file with the columns '
+        'name,kind,city,latitude,longitude (default: the bundled gazetteer)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=str(geo.GAZETTEER_PATH))
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic(using=options['database']):
+                created, updated = geo.load_gazetteer(options['path'], using=options['database'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f'{created} places added, {updated} updated.'))
+        if created or updated:
+            self.stdout.write('Run geocode_accommodations to place existing listings with them.')
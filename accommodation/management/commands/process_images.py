@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from accommodation import images, tasks
+from accommodation.models import AccommodationImage
+
+
+class Command(BaseCommand):
+    help = 'Regenerate the resized variants of accommodation photos (e.g. after changing IMAGE_WIDTHS)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pending', action='store_true', help='Only photos that are not processed yet')
+        parser.add_argument('--sync', action='store_true', help='Process here instead of queueing jobs')
+
+    def handle(self, *args, **options):
+        photos = AccommodationImage.objects.order_by('pk')
+        if options['pending']:
+            photos = photos.filter(status=AccommodationImage.PENDING)
+
+        count = 0
+        for photo in photos.iterator():
+            if options['sync']:
+                images.process(photo.pk)
+            else:
+                tasks.image_uploaded(photo, reprocess=True)
+            count += 1
+
+        action = 'Processed' if options['sync'] else 'Queued'
+        self.stdout.write(self.style.SUCCESS(f'{action} {count} photos.'))
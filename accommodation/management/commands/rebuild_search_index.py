@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from accommodation import fulltext
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the accommodation full-text search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        count = fulltext.rebuild_index(using=options['database'])
+        if count is None:
+            self.stdout.write('PostgreSQL maintains search_vector automatically; nothing to rebuild.')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Indexed {count} accommodations.'))
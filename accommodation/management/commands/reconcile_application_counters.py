@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from accommodation import counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized application counters on users and accommodations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it')
+
+    def handle(self, *args, **options):
+        report = counters.reconcile(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        verb = 'Found' if options['dry_run'] else 'Repaired'
+        for model_name, drifted in report.items():
+            self.stdout.write(f'{verb} {drifted} {model_name} row(s) with counter drift.')
+        self.stdout.write(self.style.SUCCESS('Done.'))
@@ -0,0 +1,46 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from accommodation import cache, jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (emails and notifications) until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10, help='Jobs claimed per poll')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--burst', action='store_true', help='Exit once no jobs are due')
+        parser.add_argument('--purge-after', type=int, default=7, help='Delete finished jobs after this many days')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        worker_id = jobs.default_worker_id()
+        self.stdout.write(f'Worker {worker_id} started.')
+        cache.warn_if_private()
+
+        last_purge = 0
+        while not self.stopping:
+            close_old_connections()
+            if time.monotonic() - last_purge > 3600:
+                jobs.purge(options['purge_after'])
+                last_purge = time.monotonic()
+
+            succeeded, failed = jobs.run_pending(worker_id, limit=options['batch_size'])
+            if succeeded or failed:
+                self.stdout.write(f'Ran {succeeded + failed} job(s): {succeeded} succeeded, {failed} failed.')
+                continue
+            if options['burst']:
+                break
+            time.sleep(options['sleep'])
+
+        self.stdout.write(f'Worker {worker_id} stopped.')
+
+    def _stop(self, signum, frame):
+        # Finish the current batch, then exit
+        self.stopping = True
@@ -0,0 +1,55 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:35
+
+from django.db import migrations, models
+
+
+TRIGRAM_INDEXES = [
+    ('accom_location_trgm_idx', 'location'),
+    ('accom_address_trgm_idx', 'address'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Trigram indexes serving icontains location searches (PostgreSQL only)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON accommodation_accommodation '
+            f'USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accommodation', '0002_alter_accommodation_religious_preference_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='accommodation',
+            index=models.Index(fields=['-created_at', '-id'], name='accom_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accommodation',
+            index=models.Index(fields=['religious_preference', '-created_at', '-id'], name='accom_religion_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accommodation',
+            index=models.Index(fields=['type', '-created_at', '-id'], name='accom_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accommodation',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='accom_status_created_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
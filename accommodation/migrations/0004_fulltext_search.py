@@ -0,0 +1,51 @@
+from django.db import migrations
+
+
+SEARCH_VECTOR_SQL = """
+ALTER TABLE accommodation_accommodation ADD COLUMN search_vector tsvector
+GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(location, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(address, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'C')
+) STORED
+"""
+
+
+def create_search_index(apps, schema_editor):
+    """tsvector column + GIN index on PostgreSQL, FTS5 shadow table on SQLite"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(SEARCH_VECTOR_SQL)
+        schema_editor.execute(
+            'CREATE INDEX accom_search_vector_idx ON accommodation_accommodation USING gin (search_vector)'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE accommodation_search USING fts5("
+            "title, location, address, description, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            'INSERT INTO accommodation_search (rowid, title, location, address, description) '
+            'SELECT id, title, location, address, description FROM accommodation_accommodation'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS accom_search_vector_idx')
+        schema_editor.execute('ALTER TABLE accommodation_accommodation DROP COLUMN IF EXISTS search_vector')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS accommodation_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accommodation', '0003_listing_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:38
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+COUNTER_FIELDS = {
+    'Pending': 'pending_applications',
+    'Approved': 'approved_applications',
+    'Rejected': 'rejected_applications',
+}
+
+
+def backfill_counters(apps, schema_editor):
+    Application = apps.get_model('accommodation', 'Application')
+    for model_name, fk_name in (('User', 'user'), ('Accommodation', 'accommodation')):
+        model = apps.get_model('accommodation', model_name)
+        model.objects.update(**{
+            field: Coalesce(Subquery(
+                Application.objects.filter(**{fk_name: OuterRef('pk')}, status=status)
+                .order_by().values(fk_name).annotate(total=Count('id')).values('total')
+            ), 0)
+            for status, field in COUNTER_FIELDS.items()
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accommodation', '0005_dashboard_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accommodation',
+            name='approved_applications',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='accommodation',
+            name='pending_applications',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='accommodation',
+            name='rejected_applications',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='approved_applications',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='pending_applications',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='rejected_applications',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_amenity_index(apps, schema_editor):
+    """GIN index for amenity containment on PostgreSQL, join rows elsewhere"""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS accom_amenities_gin_idx ON accommodation_accommodation '
+            'USING gin (amenities jsonb_path_ops)'
+        )
+        return
+
+    Accommodation = apps.get_model('accommodation', 'Accommodation')
+    AccommodationAmenity = apps.get_model('accommodation', 'AccommodationAmenity')
+    db = schema_editor.connection.alias
+    last_pk = 0
+    while True:
+        batch = list(
+            Accommodation.objects.using(db).filter(pk__gt=last_pk)
+            .order_by('pk').values_list('pk', 'amenities')[:1000]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        rows = [
+            AccommodationAmenity(accommodation_id=pk, name=name[:100])
+            for pk, amenities in batch
+            for name in dict.fromkeys(str(name) for name in (amenities or []) if str(name).strip())
+        ]
+        AccommodationAmenity.objects.using(db).bulk_create(rows, ignore_conflicts=True)
+
+
+def drop_amenity_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS accom_amenities_gin_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accommodation', '0008_jobs_and_contact_messages'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccommodationAmenity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='accommodation',
+            index=models.Index(fields=['price', 'id'], name='accom_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accommodation',
+            index=models.Index(fields=['type', 'price', 'id'], name='accom_type_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accommodation',
+            index=models.Index(fields=['status', 'price', 'id'], name='accom_status_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accommodation',
+            index=models.Index(fields=['bedrooms'], name='accom_bedrooms_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accommodation',
+            index=models.Index(fields=['bathrooms'], name='accom_bathrooms_idx'),
+        ),
+        migrations.AddField(
+            model_name='accommodationamenity',
+            name='accommodation',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='amenity_rows', to='accommodation.accommodation'),
+        ),
+        migrations.AddIndex(
+            model_name='accommodationamenity',
+            index=models.Index(fields=['name', 'accommodation'], name='accom_amenity_name_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='accommodationamenity',
+            constraint=models.UniqueConstraint(fields=('accommodation', 'name'), name='accom_amenity_unique'),
+        ),
+        migrations.RunPython(create_amenity_index, drop_amenity_index),
+    ]
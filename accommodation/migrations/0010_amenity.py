@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accommodation', '0009_range_filters_and_amenity_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Amenity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('key', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+                'verbose_name_plural': 'amenities',
+            },
+        ),
+        migrations.AddField(
+            model_name='accommodationamenity',
+            name='amenity',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='accommodation_rows', to='accommodation.amenity'),
+        ),
+    ]
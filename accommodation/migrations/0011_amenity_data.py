@@ -0,0 +1,99 @@
+"""
+Convert the free-text ``Accommodation.amenities`` JSON lists into interned
+Amenity rows and links, one batch of accommodations at a time.
+"""
+import re
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+# Frozen copies of accommodation.amenities.canonical_key / display_name
+def canonical_key(name):
+    return re.sub(r'[\W_]+', '', str(name).casefold())[:100]
+
+
+def display_name(name):
+    return ' '.join(str(name).split())[:100]
+
+
+def forwards(apps, schema_editor):
+    Accommodation = apps.get_model('accommodation', 'Accommodation')
+    Amenity = apps.get_model('accommodation', 'Amenity')
+    AccommodationAmenity = apps.get_model('accommodation', 'AccommodationAmenity')
+    db = schema_editor.connection.alias
+
+    interned = dict(Amenity.objects.using(db).values_list('key', 'pk'))
+    names = dict(Amenity.objects.using(db).values_list('pk', 'name'))
+    last_pk = 0
+    while True:
+        batch = list(
+            Accommodation.objects.using(db).filter(pk__gt=last_pk)
+            .order_by('pk').values_list('pk', 'amenities')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+
+        wanted = {}
+        for _, raw_names in batch:
+            for raw in raw_names or []:
+                key = canonical_key(raw)
+                if key and key not in interned:
+                    wanted.setdefault(key, display_name(raw))
+        if wanted:
+            Amenity.objects.using(db).bulk_create(
+                [Amenity(key=key, name=name) for key, name in wanted.items()], ignore_conflicts=True
+            )
+            for pk, key, name in Amenity.objects.using(db).filter(key__in=wanted).values_list('pk', 'key', 'name'):
+                interned[key] = pk
+                names[pk] = name
+
+        rows = []
+        for pk, raw_names in batch:
+            amenity_ids = dict.fromkeys(interned[key] for key in map(canonical_key, raw_names or []) if key)
+            rows.extend(
+                AccommodationAmenity(accommodation_id=pk, amenity_id=amenity_id, name=names[amenity_id])
+                for amenity_id in amenity_ids
+            )
+        # Replaces the per-name rows that migration 0009 wrote on SQLite
+        AccommodationAmenity.objects.using(db).filter(accommodation_id__in=[pk for pk, _ in batch]).delete()
+        AccommodationAmenity.objects.using(db).bulk_create(rows, batch_size=BATCH_SIZE)
+
+
+def backwards(apps, schema_editor):
+    Accommodation = apps.get_model('accommodation', 'Accommodation')
+    AccommodationAmenity = apps.get_model('accommodation', 'AccommodationAmenity')
+    db = schema_editor.connection.alias
+
+    last_pk = 0
+    while True:
+        ids = list(
+            Accommodation.objects.using(db).filter(pk__gt=last_pk)
+            .order_by('pk').values_list('pk', flat=True)[:BATCH_SIZE]
+        )
+        if not ids:
+            break
+        last_pk = ids[-1]
+        lists = {pk: [] for pk in ids}
+        rows = (
+            AccommodationAmenity.objects.using(db).filter(accommodation_id__in=ids)
+            .order_by('accommodation_id', 'amenity__name').values_list('accommodation_id', 'amenity__name')
+        )
+        for pk, name in rows:
+            lists[pk].append(name)
+        Accommodation.objects.using(db).bulk_update(
+            [Accommodation(pk=pk, amenities=names) for pk, names in lists.items()], ['amenities']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accommodation', '0010_amenity'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS accom_amenities_gin_idx')
+
+
+def create_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS accom_amenities_gin_idx ON accommodation_accommodation '
+            'USING gin (amenities jsonb_path_ops)'
+        )
+
+
+def restore_link_names(apps, schema_editor):
+    # Before 0012 each link row carried the amenity name
+    Amenity = apps.get_model('accommodation', 'Amenity')
+    AccommodationAmenity = apps.get_model('accommodation', 'AccommodationAmenity')
+    db = schema_editor.connection.alias
+    for pk, name in Amenity.objects.using(db).values_list('pk', 'name'):
+        AccommodationAmenity.objects.using(db).filter(amenity_id=pk).update(name=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accommodation', '0011_amenity_data'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='accommodationamenity',
+            name='accom_amenity_unique',
+        ),
+        migrations.RemoveIndex(
+            model_name='accommodationamenity',
+            name='accom_amenity_name_idx',
+        ),
+        migrations.RunPython(migrations.RunPython.noop, restore_link_names),
+        # A default lets the column be re-added to existing rows when unapplied
+        migrations.AlterField(
+            model_name='accommodationamenity',
+            name='name',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.RemoveField(
+            model_name='accommodationamenity',
+            name='name',
+        ),
+        migrations.AlterField(
+            model_name='accommodationamenity',
+            name='amenity',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='accommodation_rows', to='accommodation.amenity'),
+        ),
+        migrations.AddConstraint(
+            model_name='accommodationamenity',
+            constraint=models.UniqueConstraint(fields=('accommodation', 'amenity'), name='accom_amenity_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='accommodationamenity',
+            index=models.Index(fields=['amenity', 'accommodation'], name='accom_amenity_idx'),
+        ),
+        migrations.RunPython(drop_gin_index, create_gin_index),
+        migrations.RemoveField(
+            model_name='accommodation',
+            name='amenities',
+        ),
+        migrations.AddField(
+            model_name='accommodation',
+            name='amenities',
+            field=models.ManyToManyField(blank=True, related_name='accommodations', through='accommodation.AccommodationAmenity', to='accommodation.amenity'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accommodation', '0012_accommodation_amenities_m2m'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccommodationImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(db_index=True, max_length=64)),
+                ('original', models.CharField(max_length=255)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('alt', models.CharField(blank=True, max_length=200)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('pending', 'Processing'), ('ready', 'Ready')], default='pending', max_length=10)),
+                ('variants', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('accommodation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='photos', to='accommodation.accommodation')),
+            ],
+            options={
+                'ordering': ['position', 'id'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='accommodationimage',
+            constraint=models.UniqueConstraint(fields=('accommodation', 'content_hash'), name='accom_image_unique'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+"""
+Load the bundled gazetteer (data/gazetteer.csv) into Place. Existing
+listings are geocoded afterwards by ``manage.py geocode_accommodations``.
+"""
+import csv
+import re
+from pathlib import Path
+
+from django.db import migrations
+
+GAZETTEER_PATH = Path(__file__).resolve().parent.parent / 'data' / 'gazetteer.csv'
+
+
+# Frozen copy of accommodation.geo.place_key
+def place_key(name):
+    return ' '.join(re.sub(r'[\W_]+', ' ', str(name).casefold()).split())[:100]
+
+
+def forwards(apps, schema_editor):
+    Place = apps.get_model('accommodation', 'Place')
+    db = schema_editor.connection.alias
+
+    with open(GAZETTEER_PATH, newline='', encoding='utf-8') as source:
+        places = [
+            Place(
+                name=' '.join(row['name'].split())[:100],
+                key=place_key(row['name']),
+                kind=row['kind'],
+                city='' if row['kind'] == 'city' else place_key(row['city']),
+                latitude=float(row['latitude']),
+                longitude=float(row['longitude']),
+            )
+            for row in csv.DictReader(source)
+        ]
+    Place.objects.using(db).bulk_create(places, ignore_conflicts=True)
+
+
+def backwards(apps, schema_editor):
+    apps.get_model('accommodation', 'Place').objects.using(schema_editor.connection.alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accommodation', '0015_geocoding'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -1,9 +1,46 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator
+from django.db.models.functions import Lower
 
 
-class User(AbstractUser):
+APPLICATION_COUNTER_FIELDS = {
+    'Pending': 'pending_applications',
+    'Approved': 'approved_applications',
+    'Rejected': 'rejected_applications',
+}
+
+
+class ApplicationCounters(models.Model):
+    """
+    Denormalized per-status application counters.
+
+    The counters are only ever written with F() expressions by
+    accommodation.counters, so a plain save() of the owning row leaves them
+    alone instead of overwriting them with possibly stale in-memory values.
+    """
+    pending_applications = models.PositiveIntegerField(default=0, editable=False)
+    approved_applications = models.PositiveIntegerField(default=0, editable=False)
+    rejected_applications = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def total_applications(self):
+        return self.pending_applications + self.approved_applications + self.rejected_applications
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            skipped = set(APPLICATION_COUNTER_FIELDS.values()) | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped and field.name not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(AbstractUser, ApplicationCounters):
     """Custom User model extending Django's AbstractUser"""
     phone = models.CharField(max_length=20, blank=True)
     role = models.CharField(
@@ -23,12 +60,89 @@ class User(AbstractUser):
         blank=True,
         null=True
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta(AbstractUser.Meta):
+        swappable = 'AUTH_USER_MODEL'
+        indexes = [
+            models.Index(fields=['-date_joined', '-id'], name='user_joined_idx'),
+            models.Index(fields=['role', '-date_joined', '-id'], name='user_role_joined_idx'),
+            models.Index(fields=['religious_preference', '-date_joined', '-id'], name='user_religion_joined_idx'),
+            # Prefix searches of the user list (see dashboard.user_search_q)
+            models.Index(Lower('first_name'), name='user_first_name_lower_idx'),
+            models.Index(Lower('last_name'), name='user_last_name_lower_idx'),
+            models.Index(fields=['phone'], name='user_phone_idx'),
+        ]
+        constraints = [
+            # Logins look users up by lower(email) (see backends.py); blank
+            # emails, allowed for accounts made with createsuperuser, are exempt
+            models.UniqueConstraint(
+                Lower('email'),
+                name='user_email_ci_unique',
+                condition=~models.Q(email=''),
+                violation_error_message='A user with that email address already exists.',
+            ),
+        ]
 
     def __str__(self):
         return self.email
 
 
-class Accommodation(models.Model):
+class Amenity(models.Model):
+    """
+    An amenity shared by every listing that offers it.
+
+    Names are interned on their canonical ``key`` (see
+    accommodation.amenities.canonical_key), so "WiFi", "wifi" and "Wi-Fi "
+    are stored once and filtered through one indexed id.
+    """
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = 'amenities'
+
+    def __str__(self):
+        return self.name
+
+
+class Place(models.Model):
+    """
+    A gazetteer entry: a city, an area of a city or a landmark such as a
+    campus, with the coordinates listings that mention it are placed at.
+
+    ``key`` is the normalized name (see accommodation.geo.place_key), and
+    ``city`` the key of the city an area or landmark belongs to, which tells
+    apart areas of the same name in different cities.
+    """
+    CITY = 'city'
+    AREA = 'area'
+    LANDMARK = 'landmark'
+    KIND_CHOICES = [
+        (CITY, 'City'),
+        (AREA, 'Area'),
+        (LANDMARK, 'Landmark'),
+    ]
+
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=100, db_index=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    city = models.CharField(max_length=100, blank=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+
+    class Meta:
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'city'], name='place_key_city_unique'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class Accommodation(ApplicationCounters):
     """Accommodation listing model"""
     ACCOMMODATION_TYPES = [
         ('Apartment', 'Apartment'),
@@ -62,19 +176,105 @@ class Accommodation(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Available')
     bedrooms = models.PositiveIntegerField()
     bathrooms = models.DecimalField(max_digits=3, decimal_places=1, validators=[MinValueValidator(0)])
-    amenities = models.JSONField(default=list, blank=True)
+    amenities = models.ManyToManyField(
+        Amenity, through='AccommodationAmenity', related_name='accommodations', blank=True
+    )
     images = models.JSONField(default=list, blank=True)
     contact_email = models.EmailField()
     contact_phone = models.CharField(max_length=20)
+    # Set from location/address by the offline geocoder (accommodation/geo.py)
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
+    geohash = models.CharField(max_length=12, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Composite indexes matching the listing's keyset ordering, so
+            # every filter combination can be served by an index range scan
+            models.Index(fields=['-created_at', '-id'], name='accom_created_idx'),
+            models.Index(fields=['religious_preference', '-created_at', '-id'], name='accom_religion_created_idx'),
+            models.Index(fields=['type', '-created_at', '-id'], name='accom_type_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='accom_status_created_idx'),
+            # Range filters and the price sorts
+            models.Index(fields=['price', 'id'], name='accom_price_idx'),
+            models.Index(fields=['type', 'price', 'id'], name='accom_type_price_idx'),
+            models.Index(fields=['status', 'price', 'id'], name='accom_status_price_idx'),
+            models.Index(fields=['bedrooms'], name='accom_bedrooms_idx'),
+            models.Index(fields=['bathrooms'], name='accom_bathrooms_idx'),
+            # Radius searches scan the geohash prefixes covering the circle;
+            # the coordinates let the exact checks run on the index alone
+            models.Index(fields=['geohash', 'latitude', 'longitude'], name='accom_geohash_idx'),
+        ]
     
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'location', 'address'} & set(update_fields):
+            # The coordinates are recomputed from these (see signals.geocode_accommodation)
+            kwargs['update_fields'] = [*update_fields, *{'latitude', 'longitude', 'geohash'} - set(update_fields)]
+        super().save(*args, **kwargs)
+
+
+class AccommodationAmenity(models.Model):
+    """Link between an accommodation and one of its amenities"""
+    accommodation = models.ForeignKey(Accommodation, on_delete=models.CASCADE, related_name='amenity_rows')
+    amenity = models.ForeignKey(Amenity, on_delete=models.CASCADE, related_name='accommodation_rows')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['accommodation', 'amenity'], name='accom_amenity_unique'),
+        ]
+        indexes = [
+            # "Which listings have amenity X" for the amenity filters and counts
+            models.Index(fields=['amenity', 'accommodation'], name='accom_amenity_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.accommodation_id}: {self.amenity_id}"
+
+
+class AccommodationImage(models.Model):
+    """
+    An uploaded photo of an accommodation.
+
+    Files are named after their content hash (see accommodation.images).
+    The resized variants are generated by a background job; once an image is
+    ready it is also listed in ``Accommodation.images``, which is what the
+    listing renders.
+    """
+    PENDING = 'pending'
+    READY = 'ready'
+    STATUS_CHOICES = [
+        (PENDING, 'Processing'),
+        (READY, 'Ready'),
+    ]
+
+    accommodation = models.ForeignKey(Accommodation, on_delete=models.CASCADE, related_name='photos')
+    content_hash = models.CharField(max_length=64, db_index=True)
+    original = models.CharField(max_length=255)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    alt = models.CharField(max_length=200, blank=True)
+    position = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    # {format: [[width, name], ...]} for every generated size
+    variants = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['position', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['accommodation', 'content_hash'], name='accom_image_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.accommodation_id}: {self.original}"
+
 
 class Application(models.Model):
     """Application model for accommodation applications"""
@@ -92,10 +292,91 @@ class Application(models.Model):
     message = models.TextField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='app_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='app_status_created_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='app_user_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user_name} - {self.accommodation.title}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self._state.adding or (update_fields is not None and 'status' not in update_fields):
+            return super().save(*args, **kwargs)
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            # Count the transition from the stored status rather than the one
+            # this instance was loaded with, which another request may have
+            # changed since; the row stays locked until the counters move
+            self._loaded_status = (
+                type(self)._base_manager.using(using).select_for_update()
+                .filter(pk=self.pk).values_list('status', flat=True).first()
+            )
+            super().save(*args, **kwargs)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so counter updates can detect transitions
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+
+
+class ContactMessage(models.Model):
+    """Message submitted through the contact page"""
+    name = models.CharField(max_length=100)
+    email = models.EmailField()
+    subject = models.CharField(max_length=200)
+    message = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.name} - {self.subject}"
+
+
+class Job(models.Model):
+    """Background job stored in the database (see accommodation.jobs)"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    idempotency_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField()
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['run_at', 'id']
+        indexes = [
+            # Workers poll for due jobs, and for running jobs whose lock expired
+            models.Index(fields=['status', 'run_at', 'id'], name='job_due_idx'),
+            models.Index(fields=['status', 'locked_at'], name='job_locked_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
@@ -0,0 +1,113 @@
+"""
+Keyset (cursor) pagination helpers
+
+Instead of OFFSET/LIMIT, each page is fetched with a WHERE clause that seeks
+past the last row of the previous page, so the cost of a page depends on the
+page size rather than on how deep into the result set it is.
+"""
+import base64
+import json
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded for the requested ordering"""
+
+
+class KeysetPage:
+    """A single page of keyset-paginated results"""
+
+    def __init__(self, object_list, next_cursor=None, page_size=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.page_size = page_size
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+def _split_ordering(ordering):
+    return [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+
+def encode_cursor(obj, ordering):
+    """Build an opaque cursor pointing just after ``obj``"""
+    values = []
+    for name, _ in _split_ordering(ordering):
+        value = getattr(obj, name)
+        field = obj._meta.get_field(name)
+        values.append(field.value_to_string(obj) if value is not None else None)
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    """Decode a cursor back into typed values for ``ordering``"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor('Malformed cursor') from exc
+
+    fields = _split_ordering(ordering)
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise InvalidCursor('Cursor does not match ordering')
+
+    try:
+        return [
+            model._meta.get_field(name).to_python(value)
+            for (name, _), value in zip(fields, values)
+        ]
+    except Exception as exc:
+        raise InvalidCursor('Cursor contains invalid values') from exc
+
+
+def keyset_filter(ordering, values):
+    """
+    Return a Q object selecting rows strictly after ``values`` in ``ordering``.
+
+    For ``('-created_at', '-id')`` this expands to
+    ``created_at < v0 OR (created_at = v0 AND id < v1)``, which an index on
+    the same columns can satisfy with a single range scan.
+    """
+    fields = _split_ordering(ordering)
+    condition = Q()
+    for position, (name, descending) in enumerate(fields):
+        lookup = 'lt' if descending else 'gt'
+        clause = Q(**{f'{name}__{lookup}': values[position]})
+        for prev_position in range(position):
+            clause &= Q(**{fields[prev_position][0]: values[prev_position]})
+        condition |= clause
+    return condition
+
+
+def paginate_keyset(queryset, ordering, cursor=None, page_size=20):
+    """
+    Fetch one page of ``queryset`` ordered by ``ordering``.
+
+    ``ordering`` must end with a unique column (normally ``id``) so that the
+    cursor identifies a single position. One extra row is fetched to find out
+    whether another page exists, so no COUNT query is needed.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, queryset.model, ordering)
+        queryset = queryset.filter(keyset_filter(ordering, values))
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1], ordering)
+    return KeysetPage(rows, next_cursor=next_cursor, page_size=page_size)
@@ -0,0 +1,208 @@
+"""
+Per-request SQL profiling
+
+One execute wrapper is installed on every database connection as it is
+created. It times each query and, while a request is being profiled, adds
+it to that request's :class:`RequestProfile`, found through a context
+variable, so queries run by async views in worker threads are counted too.
+Queries slower than ``SLOW_QUERY_MS`` are logged to the
+``accommodation.slow_queries`` logger, inside requests or not.
+
+:class:`QueryProfilerMiddleware` records, per URL name, the response time,
+DB time, query count and repeated queries (same SQL run more than once in a
+request, the signature of an N+1). It adds a ``Server-Timing`` header and
+keeps the last ``QUERY_PROFILER_WINDOW`` requests of each endpoint for
+:func:`profiler_stats`. Like the cache counters, the statistics are per
+process.
+
+The cost per query is two ``perf_counter()`` calls, a context variable
+lookup and a few increments under an uncontended lock, so the profiler is
+left on in production.
+"""
+import logging
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+
+slow_query_logger = logging.getLogger('accommodation.slow_queries')
+
+# Upper bounds (ms) of the response time histogram buckets
+HISTOGRAM_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+MAX_REPORTED_DUPLICATES = 5
+
+_current = ContextVar('request_profile', default=None)
+_endpoints = {}
+_endpoints_lock = threading.Lock()
+
+
+class RequestProfile:
+    __slots__ = ('queries', 'db_time', 'statements', '_lock')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+        # Concurrent queries of an async view record from their own threads
+        self._lock = threading.Lock()
+
+    def add(self, sql, duration):
+        with self._lock:
+            self.queries += 1
+            self.db_time += duration
+            self.statements[sql] += 1
+
+    def duplicates(self):
+        """``(sql, count)`` for statements run more than once, most repeated first"""
+        return [(sql, n) for sql, n in self.statements.most_common() if n > 1]
+
+
+def _record_query(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        profile = _current.get()
+        if profile is not None:
+            profile.add(sql, duration)
+        if duration * 1000 >= settings.SLOW_QUERY_MS:
+            slow_query_logger.warning(
+                'Slow query (%.1f ms) on %s: %s',
+                duration * 1000, context['connection'].alias, sql,
+                extra={'duration_ms': round(duration * 1000, 1)},
+            )
+
+
+def _install_wrapper(sender, connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        # First, so execute_wrapper() blocks entered before the connection
+        # was opened still pop their own wrapper
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+def install():
+    """Time every query on every connection opened from now on"""
+    connection_created.connect(_install_wrapper, dispatch_uid='accommodation.profiling')
+
+
+class _Endpoint:
+    """Rolling statistics of one URL name"""
+
+    def __init__(self, window):
+        self.requests = 0
+        self.samples = deque(maxlen=window)
+        self.duplicates = Counter()
+
+    def add(self, total_ms, profile):
+        self.requests += 1
+        repeated = profile.duplicates()
+        self.samples.append((total_ms, profile.db_time * 1000, profile.queries, sum(n - 1 for _, n in repeated)))
+        for sql, n in repeated[:MAX_REPORTED_DUPLICATES]:
+            self.duplicates[sql[:300]] += n - 1
+
+    def summary(self):
+        samples = list(self.samples)
+        if not samples:
+            return {'requests': self.requests}
+        totals = sorted(sample[0] for sample in samples)
+        histogram = Counter()
+        for total in totals:
+            histogram[next((f'<={bound}ms' for bound in HISTOGRAM_BUCKETS if total <= bound), 'slower')] += 1
+        return {
+            'requests': self.requests,
+            'window': len(samples),
+            'total_ms': percentiles(totals),
+            'db_ms': percentiles(sorted(sample[1] for sample in samples)),
+            'queries': percentiles(sorted(sample[2] for sample in samples)),
+            'duplicate_queries_per_request': round(sum(sample[3] for sample in samples) / len(samples), 2),
+            'histogram': {
+                label: histogram[label]
+                for label in [f'<={bound}ms' for bound in HISTOGRAM_BUCKETS] + ['slower']
+            },
+            'top_duplicates': [
+                {'sql': sql, 'repeats': n} for sql, n in self.duplicates.most_common(MAX_REPORTED_DUPLICATES)
+            ],
+        }
+
+
+def percentiles(values):
+    """p50/p95/p99/max of the sorted, non-empty ``values``, rounded to two places"""
+    def at(fraction):
+        return round(values[min(int(fraction * len(values)), len(values) - 1)], 2)
+    return {'p50': at(0.5), 'p95': at(0.95), 'p99': at(0.99), 'max': round(values[-1], 2)}
+
+
+def _endpoint_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match._func_path
+
+
+def profiler_stats():
+    """Rolling per-endpoint statistics for this process"""
+    with _endpoints_lock:
+        return {name: _endpoints[name].summary() for name in sorted(_endpoints)}
+
+
+def reset_stats():
+    with _endpoints_lock:
+        _endpoints.clear()
+
+
+class QueryProfilerMiddleware:
+    """Profile every request; see the module docstring"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.QUERY_PROFILER:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, profile, start)
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, profile, start)
+
+    def _finish(self, request, response, profile, start):
+        total_ms = (time.perf_counter() - start) * 1000
+        name = _endpoint_name(request)
+        with _endpoints_lock:
+            endpoint = _endpoints.get(name)
+            if endpoint is None:
+                endpoint = _endpoints[name] = _Endpoint(settings.QUERY_PROFILER_WINDOW)
+            endpoint.add(total_ms, profile)
+
+        if settings.SERVER_TIMING:
+            db_ms = profile.db_time * 1000
+            response['Server-Timing'] = (
+                f'db;dur={db_ms:.1f};desc="{profile.queries} queries", '
+                f'app;dur={max(total_ms - db_ms, 0):.1f}, total;dur={total_ms:.1f}'
+            )
+        return response
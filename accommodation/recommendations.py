@@ -0,0 +1,216 @@
+"""
+"Recommended for you" listings
+
+Each worker keeps the features that recommendations are scored on in
+NumPy arrays, one row per accommodation (:class:`FeatureIndex`): type,
+religious preference and location as integer codes, log price and creation
+time as floats, and whether the listing is available. Scoring a user is a
+handful of vectorized operations over those arrays followed by an
+``argpartition`` top-k, so its cost barely depends on the number of
+listings (about 3 ms for 100k on one core, see ``benchmark_recommendations``).
+
+A listing's score adds up:
+
+* how often the user applied to listings of its type and in its location;
+* how close its price is to the user's past applications (a Gaussian on
+  log price around their mean);
+* its recency, halving every ``RECENCY_HALF_LIFE_DAYS``.
+
+Listings that do not suit the user's religious preference (by the same
+rule as the listing filter), are not available, or that the user already
+applied to are left out. Users without applications get the newest
+suitable listings.
+
+The arrays are brought up to date before use whenever the
+``accommodations`` cache namespace has moved on, which every save, bulk
+import and photo change does, in any worker. Only the rows whose
+``updated_at`` is past the last sync are read again; rows deleted by
+other workers, or missed by that window, are found by comparing the ids in
+the table with those indexed. The accommodations
+recommended to a user are cached for ``RECOMMENDATION_CACHE_TIMEOUT``
+seconds, keyed on their application counters so a new application or a
+status change is taken into account at once.
+"""
+import math
+import threading
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from . import cache
+from .models import Accommodation, Application
+
+RECOMMENDATION_COUNT = 12
+WEIGHTS = {'type': 2.0, 'location': 2.0, 'price': 1.5, 'recency': 1.0}
+RECENCY_HALF_LIFE_DAYS = 30
+# Spread (in log price) of the price preference when the user's
+# applications are all at about the same price
+MIN_PRICE_SPREAD = 0.35
+# Rows updated up to this long before the last sync are read again, in case
+# their transaction committed after it
+SYNC_OVERLAP = timedelta(minutes=1)
+
+TYPE_CODES = {value: code for code, (value, _) in enumerate(Accommodation.ACCOMMODATION_TYPES)}
+RELIGION_CODES = {value: code for code, (value, _) in enumerate(Accommodation.RELIGIOUS_PREFERENCES)}
+ANY_RELIGION = RELIGION_CODES['Any']
+# Code for values outside the model choices
+OTHER = -1
+
+# Columns of FeatureIndex.codes and FeatureIndex.values
+TYPE, RELIGION, LOCATION = range(3)
+LOG_PRICE, CREATED = range(2)
+FIELDS = ('pk', 'type', 'religious_preference', 'location', 'price', 'status', 'created_at')
+
+
+def _location_key(location):
+    return ' '.join(location.split()).casefold()
+
+
+class FeatureIndex:
+    """Features of every accommodation, as NumPy arrays; see the module docstring"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.version = None
+        self.synced_to = None
+        # pk -> row number; deleted rows stay, marked in ``deleted``
+        self.positions = {}
+        self.deleted = set()
+        self.locations = {}
+        self.ids = np.empty(0, dtype=np.int64)
+        self.codes = np.empty((0, 3), dtype=np.int32)
+        self.values = np.empty((0, 2), dtype=np.float64)
+        self.available = np.empty(0, dtype=bool)
+
+    def __len__(self):
+        return len(self.positions) - len(self.deleted)
+
+    def sync(self, using='default'):
+        """Read the accommodations written since the last sync, if any were"""
+        version = cache.namespace_version(cache.ACCOMMODATIONS)
+        if version == self.version:
+            return
+        with self.lock:
+            started = timezone.now()
+            rows = Accommodation.objects.using(using).order_by()
+            if self.synced_to is not None:
+                rows = rows.filter(updated_at__gte=self.synced_to - SYNC_OVERLAP)
+            self.upsert(rows.values_list(*FIELDS))
+            self.synced_to = started
+            # Compared by id, as a count can stay the same when a deletion in
+            # another worker meets an insert the updated_at window missed
+            # (committed after a later sync started)
+            existing = set(Accommodation.objects.using(using).values_list('pk', flat=True))
+            for pk in set(self.positions) - existing - self.deleted:
+                self.remove(pk)
+            missing = existing - set(self.positions)
+            if missing:
+                self.upsert(Accommodation.objects.using(using).filter(pk__in=missing).values_list(*FIELDS))
+            self.version = version
+
+    def upsert(self, rows):
+        """Add or update rows of ``FIELDS`` values"""
+        with self.lock:
+            new = []
+            for pk, kind, religion, location, price, status, created_at in rows:
+                location_code = self.locations.setdefault(_location_key(location), len(self.locations))
+                features = (
+                    (TYPE_CODES.get(kind, OTHER), RELIGION_CODES.get(religion, OTHER), location_code),
+                    (math.log1p(float(price)), created_at.timestamp()),
+                    status == 'Available',
+                )
+                position = self.positions.get(pk)
+                if position is None:
+                    new.append((pk, *features))
+                else:
+                    self.codes[position], self.values[position], self.available[position] = features
+                    self.deleted.discard(pk)
+            if new:
+                ids, codes, values, available = zip(*new)
+                self.positions.update((pk, len(self.ids) + i) for i, pk in enumerate(ids))
+                self.ids = np.concatenate([self.ids, np.array(ids, dtype=np.int64)])
+                self.codes = np.concatenate([self.codes, np.array(codes, dtype=np.int32)])
+                self.values = np.concatenate([self.values, np.array(values, dtype=np.float64)])
+                self.available = np.concatenate([self.available, np.array(available, dtype=bool)])
+
+    def remove(self, pk):
+        with self.lock:
+            position = self.positions.get(pk)
+            if position is not None:
+                self.available[position] = False
+                self.deleted.add(pk)
+
+    def top(self, religious_preference, applied_ids, count=RECOMMENDATION_COUNT, now=None):
+        """``[(pk, score), ...]`` of the ``count`` best listings, best first"""
+        now = (now or timezone.now()).timestamp()
+        with self.lock:
+            eligible = self.available.copy()
+            if religious_preference in RELIGION_CODES and religious_preference != 'Any':
+                religions = self.codes[:, RELIGION]
+                eligible &= (religions == RELIGION_CODES[religious_preference]) | (religions == ANY_RELIGION)
+            applied = [self.positions[pk] for pk in applied_ids if pk in self.positions]
+            eligible[applied] = False
+            candidates = int(np.count_nonzero(eligible))
+            if not candidates or count < 1:
+                return []
+
+            age_days = np.maximum(now - self.values[:, CREATED], 0) / 86400
+            scores = WEIGHTS['recency'] * np.exp2(-age_days / RECENCY_HALF_LIFE_DAYS)
+            if applied:
+                history = self.codes[applied]
+                # Share of the user's applications per type and per location
+                # (types outside the choices go in an extra last slot)
+                types = np.bincount(history[:, TYPE] % (len(TYPE_CODES) + 1), minlength=len(TYPE_CODES) + 1)
+                locations = np.bincount(history[:, LOCATION], minlength=len(self.locations))
+                scores += WEIGHTS['type'] * (types / len(applied))[self.codes[:, TYPE] % (len(TYPE_CODES) + 1)]
+                scores += WEIGHTS['location'] * (locations / len(applied))[self.codes[:, LOCATION]]
+                prices = self.values[applied, LOG_PRICE]
+                spread = max(float(prices.std()), MIN_PRICE_SPREAD)
+                scores += WEIGHTS['price'] * np.exp(-0.5 * ((self.values[:, LOG_PRICE] - prices.mean()) / spread) ** 2)
+
+            scores[~eligible] = -np.inf
+            count = min(count, candidates)
+            best = np.argpartition(-scores, count - 1)[:count]
+            best = best[np.argsort(-scores[best], kind='stable')]
+            return list(zip(self.ids[best].tolist(), scores[best].round(4).tolist()))
+
+
+_index = FeatureIndex()
+
+
+def get_index():
+    """This worker's feature index, synced with the database"""
+    _index.sync()
+    return _index
+
+
+def forget(pk):
+    """Drop a deleted accommodation from this worker's index"""
+    _index.remove(pk)
+
+
+def _recommend(user, count):
+    index = get_index()
+    applied_ids = list(Application.objects.filter(user=user).values_list('accommodation_id', flat=True))
+    ranked = index.top(user.religious_preference, applied_ids, count=count)
+    accommodations = Accommodation.objects.filter(pk__in=[pk for pk, _ in ranked]).prefetch_related('amenities')
+    by_id = {accommodation.pk: accommodation for accommodation in accommodations}
+    result = []
+    for pk, score in ranked:
+        if pk in by_id:
+            by_id[pk].recommendation_score = score
+            result.append(by_id[pk])
+    return result
+
+
+def recommend(user, count=RECOMMENDATION_COUNT):
+    """Up to ``count`` accommodations recommended to ``user``, best first"""
+    history = (user.pending_applications, user.approved_applications, user.rejected_applications)
+    return cache.get_or_set(
+        (cache.ACCOMMODATIONS,),
+        ('recommendations', user.pk, user.religious_preference, history, count),
+        lambda: _recommend(user, count),
+        timeout=settings.RECOMMENDATION_CACHE_TIMEOUT,
+    )
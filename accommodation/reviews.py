@@ -0,0 +1,85 @@
+"""
+Bulk review of applications
+
+Changes the status of many applications with one ``QuerySet.update()``
+inside a transaction. Because ``update()`` bypasses the model signals, the
+status counters (see counters.py) are adjusted from a grouped count of the
+affected rows, and the notifications and cache invalidation happen here.
+
+Approving can optionally settle the accommodation: competing pending
+applications for the same units are rejected and the accommodations are
+marked Occupied, all in the same transaction.
+"""
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from . import cache, counters, tasks
+from .models import Accommodation, Application
+
+STATUSES = tuple(status for status, _ in Application.STATUS_CHOICES)
+
+
+@dataclass
+class ReviewResult:
+    updated: int = 0
+    rejected_competing: int = 0
+    occupied: int = 0
+
+
+def _set_status(ids, status, now):
+    """Move the applications ``ids`` to ``status`` and keep the counters in step"""
+    if not ids:
+        return 0, []
+    applications = Application.objects.filter(pk__in=ids)
+    groups = applications.order_by().values_list('user_id', 'accommodation_id', 'status').annotate(n=Count('id'))
+    changes = [(user_id, accommodation_id, old, status, n) for user_id, accommodation_id, old, n in groups]
+    updated = applications.update(status=status, updated_at=now)
+    counters.apply_status_changes(changes)
+    tasks.application_statuses_changed(ids, status, now)
+    return updated, changes
+
+
+def update_statuses(applications, status, reject_competing=False):
+    """
+    Set ``status`` on every application in the ``applications`` queryset.
+
+    With ``reject_competing`` (approvals only) the other pending applications
+    for the same accommodations are rejected and those accommodations become
+    Occupied. Returns a :class:`ReviewResult`.
+    """
+    if status not in STATUSES:
+        raise ValueError(f'Unknown application status: {status!r}')
+
+    result = ReviewResult()
+    now = timezone.now()
+    with transaction.atomic():
+        # Lock the rows so the counted groups match what the UPDATE changes
+        ids = list(
+            applications.exclude(status=status).select_for_update().order_by('pk').values_list('pk', flat=True)
+        )
+        result.updated, changes = _set_status(ids, status, now)
+
+        if reject_competing and status == 'Approved' and changes:
+            accommodation_ids = list(
+                Accommodation.objects.filter(pk__in={change[1] for change in changes})
+                .select_for_update().order_by('pk').values_list('pk', flat=True)
+            )
+            competing = list(
+                Application.objects.filter(accommodation_id__in=accommodation_ids, status='Pending')
+                .exclude(pk__in=ids).select_for_update().order_by('pk').values_list('pk', flat=True)
+            )
+            result.rejected_competing, _ = _set_status(competing, 'Rejected', now)
+            result.occupied = (
+                Accommodation.objects.filter(pk__in=accommodation_ids)
+                .exclude(status='Occupied')
+                .update(status='Occupied', updated_at=now)
+            )
+
+    if result.updated or result.rejected_competing:
+        cache.bump(cache.APPLICATIONS)
+    if result.occupied:
+        cache.bump(cache.ACCOMMODATIONS)
+    return result
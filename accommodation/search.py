@@ -0,0 +1,310 @@
+"""
+Accommodation listing search
+
+Builds the filtered queryset used by the listing page. Plain browsing pages
+through it with keyset pagination ordered on ``(-created_at, id)`` or on the
+selected price sort; keyword searches without a sort are ranked by relevance
+through :mod:`accommodation.fulltext`. Price, bedroom and bathroom ranges are
+served by the indexes on those columns and amenity filters by
+:mod:`accommodation.amenities`. Searches near a place or point go through
+the geohash index (see :mod:`accommodation.geo`) and can be sorted by
+distance, which is paged by number like relevance.
+"""
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urlencode
+
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from . import amenities, fulltext, geo
+from .models import Accommodation
+from .pagination import paginate_keyset
+
+LISTING_ORDERING = ('-created_at', '-id')
+LISTING_PAGE_SIZE = 24
+
+# Each ordering has a matching composite index (see Accommodation.Meta)
+SORT_ORDERINGS = {
+    'newest': LISTING_ORDERING,
+    'price_asc': ('price', 'id'),
+    'price_desc': ('-price', '-id'),
+}
+SORT_CHOICES = (
+    ('newest', 'Newest first'),
+    ('price_asc', 'Price: low to high'),
+    ('price_desc', 'Price: high to low'),
+)
+# Only offered for searches near somewhere; it has no keyset ordering
+DISTANCE_SORT = 'distance'
+DISTANCE_SORT_CHOICE = (DISTANCE_SORT, 'Distance: nearest first')
+
+# Upper bounds of the range filters: the largest values the columns hold
+# (see Accommodation), so out-of-range input is ignored rather than sent to
+# the database, and never converted to an int digit by digit
+MAX_PRICE_FILTER = Decimal('99999999.99')
+MAX_BATHROOMS_FILTER = Decimal('99.9')
+MAX_BEDROOMS_FILTER = 1000
+MAX_NUMBER_LENGTH = 20
+
+
+# (value, label, lowest, highest) - bounds are inclusive, None is open-ended
+BEDROOM_BUCKETS = (
+    ('1', '1 bedroom', None, 1),
+    ('2', '2 bedrooms', 2, 2),
+    ('3', '3 bedrooms', 3, 3),
+    ('4+', '4+ bedrooms', 4, None),
+)
+# (value, label, lowest, below) - monthly price in [lowest, below)
+PRICE_BANDS = (
+    ('0-500', 'Under $500', None, 500),
+    ('500-1000', '$500 - $1,000', 500, 1000),
+    ('1000-2000', '$1,000 - $2,000', 1000, 2000),
+    ('2000+', '$2,000 and up', 2000, None),
+)
+
+
+def bedroom_bucket_q(value):
+    for bucket, _, lowest, highest in BEDROOM_BUCKETS:
+        if bucket == value:
+            q = Q()
+            if lowest is not None:
+                q &= Q(bedrooms__gte=lowest)
+            if highest is not None:
+                q &= Q(bedrooms__lte=highest)
+            return q
+    return None
+
+
+def price_band_q(value):
+    for band, _, lowest, below in PRICE_BANDS:
+        if band == value:
+            q = Q()
+            if lowest is not None:
+                q &= Q(price__gte=lowest)
+            if below is not None:
+                q &= Q(price__lt=below)
+            return q
+    return None
+
+
+def _decimal(value, maximum):
+    """A non-negative number up to ``maximum`` from a query parameter, or None"""
+    try:
+        number = Decimal(str(value).strip()[:MAX_NUMBER_LENGTH])
+    except (InvalidOperation, ValueError):
+        return None
+    return number if number.is_finite() and 0 <= number <= maximum else None
+
+
+def _count(value, maximum):
+    """A whole number up to ``maximum`` from a query parameter, or None"""
+    value = str(value).strip()
+    if not value.isdigit() or len(value) > MAX_NUMBER_LENGTH:
+        return None
+    number = int(value)
+    return number if number <= maximum else None
+
+
+class ListingQuery:
+    """The filter state of the accommodations listing page"""
+
+    def __init__(self, religious_preference='', type='', location='', keywords='',
+                 status='', bedrooms='', price_band='', min_price=None, max_price=None,
+                 min_bedrooms=None, min_bathrooms=None, amenities=(), sort='',
+                 near='', radius=None):
+        self.religious_preference = religious_preference
+        self.type = type
+        self.location = location.strip()
+        self.keywords = keywords.strip()
+        self.status = status
+        self.bedrooms = bedrooms
+        self.price_band = price_band
+        self.min_price = min_price
+        self.max_price = max_price
+        self.min_bedrooms = min_bedrooms
+        self.min_bathrooms = min_bathrooms
+        self.amenities = tuple(amenities)
+        self.near = ' '.join(near.split())[:100]
+        self.radius = int(radius) if radius in geo.RADIUS_CHOICES else geo.DEFAULT_RADIUS_KM
+        self.sort = sort if sort in SORT_ORDERINGS or (sort == DISTANCE_SORT and self.near) else ''
+
+    @classmethod
+    def from_params(cls, params):
+        return cls(
+            religious_preference=params.get('religious_preference', ''),
+            type=params.get('type', ''),
+            location=params.get('location', ''),
+            keywords=params.get('q', ''),
+            status=params.get('status', ''),
+            bedrooms=params.get('bedrooms', ''),
+            price_band=params.get('price_band', ''),
+            min_price=_decimal(params.get('min_price', ''), MAX_PRICE_FILTER),
+            max_price=_decimal(params.get('max_price', ''), MAX_PRICE_FILTER),
+            min_bedrooms=_count(params.get('min_bedrooms', ''), MAX_BEDROOMS_FILTER),
+            min_bathrooms=_decimal(params.get('min_bathrooms', ''), MAX_BATHROOMS_FILTER),
+            amenities=amenities.parse(
+                ','.join(params.getlist('amenities')) if hasattr(params, 'getlist') else params.get('amenities', ''),
+                limit=amenities.MAX_AMENITY_FILTERS,
+            ),
+            sort=params.get('sort', ''),
+            near=params.get('near', ''),
+            radius=_count(params.get('radius', ''), geo.MAX_RADIUS_KM),
+        )
+
+    @cached_property
+    def center(self):
+        """``(latitude, longitude)`` of ``near``, or None if it is unset or unknown"""
+        return geo.resolve(self.near) if self.near else None
+
+    def key(self):
+        """Hashable representation of the filter state"""
+        return (
+            self.religious_preference, self.type, self.status, self.bedrooms, self.price_band,
+            self.sort,
+        ) + self.base_key()
+
+    def base_key(self):
+        """Hashable representation of the filters that are not facets"""
+        return (
+            self.location, self.keywords, self.min_price, self.max_price,
+            self.min_bedrooms, self.min_bathrooms,
+            tuple(sorted(map(amenities.canonical_key, self.amenities))),
+            self.near, self.radius if self.near else None,
+        )
+
+    @property
+    def sort_choices(self):
+        """Sorts offered for this search"""
+        return SORT_CHOICES + (DISTANCE_SORT_CHOICE,) if self.near else SORT_CHOICES
+
+    @property
+    def ordering(self):
+        """Keyset ordering for the selected sort, or None for relevance and distance"""
+        if self.sort == DISTANCE_SORT:
+            return None
+        if self.sort:
+            return SORT_ORDERINGS[self.sort]
+        return None if self.keywords else LISTING_ORDERING
+
+    def querystring(self, **extra):
+        """Encode the filter state for pagination links"""
+        params = {
+            'religious_preference': self.religious_preference,
+            'type': self.type,
+            'location': self.location,
+            'q': self.keywords,
+            'status': self.status,
+            'bedrooms': self.bedrooms,
+            'price_band': self.price_band,
+            'min_price': self.min_price,
+            'max_price': self.max_price,
+            'min_bedrooms': self.min_bedrooms,
+            'min_bathrooms': self.min_bathrooms,
+            'amenities': ', '.join(self.amenities),
+            'sort': self.sort,
+            'near': self.near,
+            'radius': self.radius if self.near else None,
+        }
+        params.update(extra)
+        return urlencode({k: v for k, v in params.items() if v not in (None, '')})
+
+    def next_page_querystring(self, page):
+        """Querystring for the page after ``page``, or '' on the last page"""
+        if not page.has_next:
+            return ''
+        if self.ordering is None:
+            return self.querystring(page=page.number + 1)
+        return self.querystring(cursor=page.next_cursor)
+
+    def _filter_non_facets(self, accommodations_list):
+        if self.min_price is not None:
+            accommodations_list = accommodations_list.filter(price__gte=self.min_price)
+        if self.max_price is not None:
+            accommodations_list = accommodations_list.filter(price__lte=self.max_price)
+        if self.min_bedrooms is not None:
+            accommodations_list = accommodations_list.filter(bedrooms__gte=self.min_bedrooms)
+        if self.min_bathrooms is not None:
+            accommodations_list = accommodations_list.filter(bathrooms__gte=self.min_bathrooms)
+
+        accommodations_list = amenities.filter_amenities(accommodations_list, self.amenities)
+
+        if self.location:
+            accommodations_list = accommodations_list.filter(location_search_q(self.location))
+
+        if self.near:
+            if self.center is None:
+                return accommodations_list.none()
+            accommodations_list = geo.filter_within(accommodations_list, *self.center, self.radius)
+
+        return accommodations_list
+
+    def base_queryset(self):
+        """Accommodations matching the filters that are not facets"""
+        accommodations_list = self._filter_non_facets(Accommodation.objects.all())
+
+        if self.keywords:
+            # Match only: ranking is left to the caller
+            matches = fulltext.apply_search(Accommodation.objects.all(), self.keywords)
+            accommodations_list = accommodations_list.filter(pk__in=matches.values('pk'))
+
+        return accommodations_list
+
+    def queryset(self):
+        accommodations_list = Accommodation.objects.all()
+
+        if self.religious_preference and self.religious_preference != 'Any':
+            # IN on a single column keeps the composite index usable, unlike an OR
+            accommodations_list = accommodations_list.filter(
+                religious_preference__in=[self.religious_preference, 'Any']
+            )
+
+        if self.type:
+            accommodations_list = accommodations_list.filter(type=self.type)
+
+        if self.status:
+            accommodations_list = accommodations_list.filter(status=self.status)
+
+        for q in (bedroom_bucket_q(self.bedrooms), price_band_q(self.price_band)):
+            if q is not None:
+                accommodations_list = accommodations_list.filter(q)
+
+        return self._filter_non_facets(accommodations_list)
+
+
+def location_search_q(term):
+    """
+    Match a free-text location against ``location`` and ``address``.
+
+    On PostgreSQL both columns carry trigram GIN indexes on ``UPPER(col)``
+    (see migration 0003), which serve the ``icontains`` lookups directly for
+    terms of three characters or more; shorter ones scan the table.
+    """
+    return Q(location__icontains=term) | Q(address__icontains=term)
+
+
+def search_listings(query, cursor=None, page=1, page_size=LISTING_PAGE_SIZE):
+    """
+    Return one page of accommodations matching ``query``.
+
+    Keyword searches without an explicit sort and distance sorts are ranked
+    and paged by ``page`` number; everything else is paged by ``cursor`` in
+    the order of the selected sort (newest first by default). Searches near
+    somewhere annotate each row with its ``distance_km``.
+    """
+    # The listing cards show each accommodation's amenities
+    queryset = query.queryset().prefetch_related('amenities')
+    ordering = query.ordering
+    if query.sort == DISTANCE_SORT:
+        if query.center is None:
+            # Unknown place: nothing matches
+            return fulltext.SearchPage([], 1, False, page_size)
+        if query.keywords:
+            queryset = fulltext.apply_search(queryset, query.keywords)
+        return geo.nearest_page(queryset, *query.center, page=page, page_size=page_size)
+    if query.center is not None:
+        queryset = geo.annotate_distance(queryset, *query.center)
+    if ordering is None:
+        return fulltext.search_page(queryset, query.keywords, page=page, page_size=page_size)
+    if query.keywords:
+        queryset = fulltext.apply_search(queryset, query.keywords)
+    return paginate_keyset(queryset, ordering, cursor=cursor, page_size=page_size)
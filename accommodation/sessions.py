@@ -0,0 +1,34 @@
+"""
+Session housekeeping
+
+With the ``db`` and ``cached_db`` session engines every login leaves a row
+in ``django_session`` until it is removed. Django's ``clearsessions`` deletes
+all expired rows in one statement, which on a large table holds locks for
+as long as the delete takes. :func:`delete_expired` removes them in batches
+of ``batch_size`` primary keys, each in its own short transaction, walking
+the ``expire_date`` index. Cached copies (``cached_db``) expire from the
+cache on their own.
+"""
+import time
+
+from django.contrib.sessions.models import Session
+from django.db import transaction
+from django.utils import timezone
+
+
+def delete_expired(batch_size=1000, pause=0, using='default', now=None):
+    """Delete sessions that expired before ``now``; returns the number deleted"""
+    now = now or timezone.now()
+    deleted = 0
+    while True:
+        with transaction.atomic(using=using):
+            keys = list(
+                Session.objects.using(using).filter(expire_date__lt=now)
+                .order_by('expire_date').values_list('pk', flat=True)[:batch_size]
+            )
+            if not keys:
+                return deleted
+            deleted += Session.objects.using(using).filter(pk__in=keys).delete()[0]
+        if pause:
+            # Leave room for other writers between batches
+            time.sleep(pause)
@@ -0,0 +1,96 @@
+"""
+Model signal receivers keeping derived data in sync with listings and
+applications
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cache, counters, fulltext, geo, images, recommendations, tasks
+from .models import Accommodation, AccommodationImage, Application, Place, User
+
+
+@receiver(pre_save, sender=Accommodation)
+def geocode_accommodation(sender, instance, raw=False, using='default', update_fields=None, **kwargs):
+    """Place a listing from its location and address before it is written"""
+    # A plain save() lists every field but the counters (see
+    # ApplicationCounters.save) and Accommodation.save adds the coordinates
+    # to saves of the location or address; other saves leave the place alone
+    if raw or (update_fields is not None and not {'location', 'address', 'geohash'} & update_fields):
+        return
+    moved = update_fields is not None and {'location', 'address'} & update_fields
+    if not moved and {'location', 'address'} & instance.get_deferred_fields():
+        return
+    geo.locate([instance], using=using)
+
+
+@receiver(post_save, sender=Accommodation)
+def update_search_index(sender, instance, **kwargs):
+    """Refresh the full-text index entry for a saved accommodation"""
+    fulltext.index_accommodation(instance)
+
+
+@receiver(post_delete, sender=Accommodation)
+def remove_from_search_index(sender, instance, using, **kwargs):
+    """Drop a deleted accommodation from the full-text index and the recommender"""
+    fulltext.unindex_accommodation(instance.pk, using=using)
+    recommendations.forget(instance.pk)
+
+
+@receiver(post_delete, sender=AccommodationImage)
+def delete_image_files(sender, instance, using, **kwargs):
+    """Remove a deleted photo's files once the deletion is committed"""
+    transaction.on_commit(
+        partial(images.delete_files, instance.content_hash, images.image_files(instance)), using=using
+    )
+
+
+@receiver(post_save, sender=Application)
+def update_application_counters(sender, instance, created, raw=False, **kwargs):
+    """Count new applications and status transitions, and queue their notifications"""
+    if raw:
+        # Fixtures carry their own counter values
+        return
+    old_status = None if created else getattr(instance, '_loaded_status', None)
+    if created or old_status is not None:
+        counters.record_status_change(instance, old_status, instance.status)
+    if created:
+        tasks.application_submitted(instance)
+    elif old_status is not None and old_status != instance.status:
+        tasks.application_status_changed(instance)
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Application)
+def release_application_counters(sender, instance, **kwargs):
+    """Uncount deleted applications, including cascaded deletes"""
+    counters.record_status_change(instance, getattr(instance, '_loaded_status', instance.status), None)
+
+
+@receiver(post_save, sender=Accommodation)
+@receiver(post_delete, sender=Accommodation)
+def invalidate_accommodation_cache(sender, **kwargs):
+    cache.bump(cache.ACCOMMODATIONS)
+
+
+@receiver(post_save, sender=Application)
+@receiver(post_delete, sender=Application)
+def invalidate_application_cache(sender, **kwargs):
+    # Application writes also move the counters stored on accommodations
+    cache.bump(cache.APPLICATIONS)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_cache(sender, **kwargs):
+    cache.bump(cache.USERS)
+
+
+@receiver(post_save, sender=Place)
+@receiver(post_delete, sender=Place)
+def invalidate_place_cache(sender, **kwargs):
+    cache.bump(cache.PLACES)
+    # Cached listing pages of searches near a place
+    cache.bump(cache.ACCOMMODATIONS)
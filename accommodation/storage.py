@@ -0,0 +1,66 @@
+"""
+Django storage backed by a Supabase Storage bucket
+
+Used for accommodation photos when ``IMAGE_STORAGE`` is
+``accommodation.storage.SupabaseStorage``. Files are uploaded with the
+service client (see supabase_client.py) and served from the bucket's public
+URL, with ``IMAGE_CACHE_MAX_AGE`` as their Cache-Control max-age. The bucket
+must exist and be public.
+"""
+import mimetypes
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from django.utils.deconstruct import deconstructible
+from storage3.utils import StorageException
+
+from .supabase_client import get_supabase_service_client
+
+
+@deconstructible
+class SupabaseStorage(Storage):
+    def __init__(self, bucket=None, cache_max_age=None):
+        self.bucket = bucket or settings.SUPABASE_STORAGE_BUCKET
+        self.cache_max_age = settings.IMAGE_CACHE_MAX_AGE if cache_max_age is None else cache_max_age
+
+    def _bucket(self):
+        return get_supabase_service_client().storage.from_(self.bucket)
+
+    def _open(self, name, mode='rb'):
+        return ContentFile(self._bucket().download(name), name=name)
+
+    def _save(self, name, content):
+        content.seek(0)
+        self._bucket().upload(name, content.read(), file_options={
+            'content-type': mimetypes.guess_type(name)[0] or 'application/octet-stream',
+            'cache-control': str(self.cache_max_age),
+            'upsert': 'true',
+        })
+        return name
+
+    def _stat(self, name):
+        directory, filename = posixpath.split(name)
+        entries = self._bucket().list(directory, {'search': filename, 'limit': 100})
+        return next((entry for entry in entries if entry.get('name') == filename), None)
+
+    def exists(self, name):
+        return self._stat(name) is not None
+
+    def size(self, name):
+        entry = self._stat(name)
+        if entry is None:
+            raise FileNotFoundError(name)
+        return (entry.get('metadata') or {}).get('size', 0)
+
+    def delete(self, name):
+        try:
+            self._bucket().remove([name])
+        except StorageException:
+            # Deleting a missing file is not an error for Django storages
+            pass
+
+    def url(self, name):
+        # storage3 always appends a query string separator, even an empty one
+        return self._bucket().get_public_url(name).removesuffix('?')
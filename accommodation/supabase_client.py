@@ -1,29 +1,107 @@
 """
 Supabase client configuration and helper functions
+
+Clients are built lazily, once per (url, key) and per process, and then
+reused so their HTTP sessions keep connections alive between calls. The
+registry is reset in forked children (gunicorn pre-fork workers) so sockets
+are never shared across processes. Async clients are additionally kept per
+event loop, since their HTTP sessions are bound to the loop they were
+created on; they are held through a weak reference to the loop and dropped
+once it is closed.
+
+Shared clients are created without session persistence: use them for
+service-level storage/database calls, not for signing individual users in.
 """
-from supabase import create_client, Client
-from django.conf import settings
+import asyncio
 import os
+import threading
+import weakref
+
+from supabase import Client, create_client
+from supabase.lib.client_options import ClientOptions
+from django.conf import settings
 
+try:
+    from gotrue import AsyncMemoryStorage
+    from supabase._async.client import AsyncClient, create_client as create_async_client
+except ImportError:  # pragma: no cover - older supabase releases
+    AsyncClient = None
+    create_async_client = None
 
-def get_supabase_client() -> Client:
-    """Get Supabase client instance"""
+
+_clients = {}
+# event loop -> {(url, key): client}
+_async_clients = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def reset_clients():
+    """Forget every cached client (after fork, in tests, or on key rotation)"""
+    _clients.clear()
+    _async_clients.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_clients)
+
+
+def _client_options(**overrides):
+    return ClientOptions(auto_refresh_token=False, persist_session=False, **overrides)
+
+
+def _credentials(service=False):
     url = settings.SUPABASE_URL
-    key = settings.SUPABASE_KEY
-    
+    key = (settings.SUPABASE_SERVICE_KEY or settings.SUPABASE_KEY) if service else settings.SUPABASE_KEY
+
     if not url or not key:
+        if service:
+            raise ValueError("Supabase URL and SERVICE_KEY must be set in environment variables")
         raise ValueError("Supabase URL and KEY must be set in environment variables")
-    
-    return create_client(url, key)
+    return url, key
+
+
+def _get_client(url, key) -> Client:
+    registry_key = (os.getpid(), url, key)
+    client = _clients.get(registry_key)
+    if client is None:
+        with _lock:
+            client = _clients.get(registry_key)
+            if client is None:
+                client = _clients[registry_key] = create_client(url, key, options=_client_options())
+    return client
+
+
+def get_supabase_client() -> Client:
+    """Get Supabase client instance"""
+    return _get_client(*_credentials())
 
 
 def get_supabase_service_client() -> Client:
     """Get Supabase service client with elevated permissions"""
-    url = settings.SUPABASE_URL
-    key = settings.SUPABASE_SERVICE_KEY or settings.SUPABASE_KEY
-    
-    if not url or not key:
-        raise ValueError("Supabase URL and SERVICE_KEY must be set in environment variables")
-    
-    return create_client(url, key)
+    return _get_client(*_credentials(service=True))
+
+
+async def _get_async_client(url, key):
+    if create_async_client is None:
+        raise RuntimeError("The installed supabase package has no asyncio client")
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop, {}).get((url, key))
+    if client is None:
+        client = await create_async_client(url, key, options=_client_options(storage=AsyncMemoryStorage()))
+        with _lock:
+            for closed in [other for other in _async_clients if other.is_closed()]:
+                del _async_clients[closed]
+            # Unless another coroutine on this loop finished creating one meanwhile
+            client = _async_clients.setdefault(loop, {}).setdefault((url, key), client)
+    return client
+
+
+async def get_async_supabase_client() -> 'AsyncClient':
+    """Get the asyncio Supabase client for the running event loop"""
+    return await _get_async_client(*_credentials())
+
 
+async def get_async_supabase_service_client() -> 'AsyncClient':
+    """Get the asyncio Supabase service client for the running event loop"""
+    return await _get_async_client(*_credentials(service=True))
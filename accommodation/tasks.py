@@ -0,0 +1,137 @@
+"""
+Background tasks run by the job queue (see jobs.py)
+
+Each notification is enqueued with an idempotency key derived from the event
+it reports, so saving the same change twice, or retrying a request, never
+sends a second email. Uploaded photos are resized here too.
+"""
+from django.conf import settings
+from django.core.mail import send_mail, send_mass_mail
+
+from . import images, jobs
+from .models import Application, ContactMessage, User
+
+APPLICATION_SUBMITTED = 'application_submitted'
+APPLICATION_STATUS_CHANGED = 'application_status_changed'
+CONTACT_MESSAGE = 'contact_message'
+PROCESS_IMAGE = 'process_image'
+
+
+def staff_recipients():
+    """Addresses that receive admin notifications"""
+    if settings.NOTIFICATION_EMAILS:
+        return list(settings.NOTIFICATION_EMAILS)
+    return list(
+        User.objects.filter(role='admin', is_active=True).exclude(email='').values_list('email', flat=True)
+    )
+
+
+def _status_key(application_id, status, changed_at):
+    return f'{APPLICATION_STATUS_CHANGED}:{application_id}:{status}:{changed_at.timestamp()}'
+
+
+def application_submitted(application):
+    """Queue the notifications for a new application"""
+    jobs.enqueue(
+        APPLICATION_SUBMITTED,
+        {'application_id': application.pk},
+        idempotency_key=f'{APPLICATION_SUBMITTED}:{application.pk}',
+    )
+
+
+def application_status_changed(application):
+    """Queue the applicant's notification for a status change"""
+    jobs.enqueue(
+        APPLICATION_STATUS_CHANGED,
+        {'application_id': application.pk, 'status': application.status},
+        idempotency_key=_status_key(application.pk, application.status, application.updated_at),
+    )
+
+
+def application_statuses_changed(application_ids, status, changed_at):
+    """Queue status notifications for a bulk review in one INSERT"""
+    jobs.enqueue_many(
+        (
+            APPLICATION_STATUS_CHANGED,
+            {'application_id': application_id, 'status': status},
+            _status_key(application_id, status, changed_at),
+        )
+        for application_id in application_ids
+    )
+
+
+def contact_message_received(contact_message):
+    """Queue forwarding a contact form submission to the staff"""
+    jobs.enqueue(
+        CONTACT_MESSAGE,
+        {'message_id': contact_message.pk},
+        idempotency_key=f'{CONTACT_MESSAGE}:{contact_message.pk}',
+    )
+
+
+def image_uploaded(image, reprocess=False):
+    """Queue generating the resized variants of an uploaded photo"""
+    key = f'{PROCESS_IMAGE}:{image.pk}'
+    if reprocess:
+        # A new job even if the first one already ran
+        key = None
+    jobs.enqueue(PROCESS_IMAGE, {'image_id': image.pk}, idempotency_key=key)
+
+
+@jobs.task(APPLICATION_SUBMITTED)
+def send_application_submitted(application_id):
+    application = Application.objects.select_related('accommodation').filter(pk=application_id).first()
+    if application is None:
+        return
+    title = application.accommodation.title
+    messages = [(
+        f'Application received: {title}',
+        f'Hi {application.user_name},\n\nWe have received your application for "{title}". '
+        'You will get another email once it has been reviewed.\n\nAMS',
+        None,
+        [application.user_email],
+    )]
+    staff = staff_recipients()
+    if staff:
+        messages.append((
+            f'New application for {title}',
+            f'{application.user_name} <{application.user_email}, {application.user_phone}> '
+            f'applied for "{title}":\n\n{application.message}',
+            None,
+            staff,
+        ))
+    send_mass_mail(messages, fail_silently=False)
+
+
+@jobs.task(APPLICATION_STATUS_CHANGED)
+def send_application_status_changed(application_id, status):
+    application = Application.objects.select_related('accommodation').filter(pk=application_id).first()
+    if application is None:
+        return
+    title = application.accommodation.title
+    send_mail(
+        f'Your application for {title} was {status.lower()}',
+        f'Hi {application.user_name},\n\nThe status of your application for "{title}" '
+        f'is now: {status}.\n\nAMS',
+        None,
+        [application.user_email],
+    )
+
+
+@jobs.task(CONTACT_MESSAGE)
+def send_contact_message(message_id):
+    contact_message = ContactMessage.objects.filter(pk=message_id).first()
+    staff = staff_recipients()
+    if contact_message is None or not staff:
+        return
+    send_mail(
+        f'[Contact] {contact_message.subject}',
+        f'From: {contact_message.name} <{contact_message.email}>\n\n{contact_message.message}',
+        None,
+        staff,
+    )
+
+
+@jobs.task(PROCESS_IMAGE)
+def process_image(image_id):
+    images.process(image_id)
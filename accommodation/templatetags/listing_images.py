@@ -0,0 +1,17 @@
+from django import template
+
+from accommodation import images
+
+register = template.Library()
+
+
+@register.inclusion_tag('accommodation/picture.html')
+def accommodation_picture(entry, sizes='100vw'):
+    """Responsive ``<picture>`` for one entry of ``Accommodation.images``"""
+    return {'picture': images.picture(entry) if entry else None, 'sizes': sizes}
+
+
+@register.filter
+def image_url(name):
+    """Public URL of an image file in the configured storage"""
+    return images.url(name) if name else ''
@@ -0,0 +1,49 @@
+"""
+Template warmup
+
+Templates are loaded through Django's cached loader (``TEMPLATE_CACHE``), which
+keeps each compiled template for the life of the process. It compiles lazily,
+so without warmup the first request for every page in each new worker pays
+for finding the file and parsing it, and ``admin.html`` and ``base.html`` are
+large. :func:`warm_templates` compiles every project template up front; the
+WSGI and ASGI entry points call it when a worker imports the application.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(engine):
+    """Relative names of the ``.html`` files in the engine's ``DIRS``"""
+    for directory in engine.engine.dirs:
+        for root, _, files in os.walk(directory):
+            for file_name in sorted(files):
+                if file_name.endswith('.html'):
+                    yield os.path.relpath(os.path.join(root, file_name), directory).replace(os.sep, '/')
+
+
+def warm_templates():
+    """Compile every project template into the cached loader; returns the count"""
+    if not (settings.TEMPLATE_CACHE and settings.TEMPLATE_WARMUP):
+        return 0
+    start = time.perf_counter()
+    compiled = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+            except Exception:
+                # The page will raise the same error when it is requested
+                logger.exception('Could not compile template %s', name)
+            else:
+                compiled += 1
+    logger.info('Compiled %d templates in %.1f ms', compiled, (time.perf_counter() - start) * 1000)
+    return compiled
@@ -0,0 +1,76 @@
+"""
+In-memory stand-in for the Supabase client's storage API
+
+Implements the calls accommodation.storage makes on a bucket with the
+responses and errors of the Storage API, so the storage can be tested
+without a Supabase project::
+
+    client = StubSupabaseClient('https://stub.supabase.co')
+    with mock.patch('accommodation.storage.get_supabase_service_client', return_value=client):
+        ...
+"""
+import posixpath
+
+from storage3.utils import StorageException
+
+
+class StubSupabaseClient:
+    def __init__(self, url):
+        self.url = url
+        self.storage = StubStorage(url)
+
+
+class StubStorage:
+    def __init__(self, url):
+        self.url = url
+        self.buckets = {}
+
+    def from_(self, bucket):
+        if bucket not in self.buckets:
+            self.buckets[bucket] = StubBucket(self.url, bucket)
+        return self.buckets[bucket]
+
+
+class StubBucket:
+    def __init__(self, url, bucket):
+        self.url = url
+        self.id = bucket
+        self.files = {}
+        self.uploads = []
+
+    def upload(self, path, file, file_options=None):
+        file_options = file_options or {}
+        if path in self.files and file_options.get('upsert') != 'true':
+            raise StorageException({'statusCode': 400, 'error': 'Duplicate', 'message': 'The resource already exists'})
+        self.uploads.append(path)
+        self.files[path] = {
+            'data': bytes(file),
+            'metadata': {
+                'size': len(file),
+                'mimetype': file_options.get('content-type', 'text/plain;charset=UTF-8'),
+                'cacheControl': f'max-age={file_options.get("cache-control", 3600)}',
+            },
+        }
+
+    def download(self, path):
+        if path not in self.files:
+            raise StorageException({'statusCode': 400, 'error': 'not_found', 'message': 'Object not found'})
+        return self.files[path]['data']
+
+    def list(self, path=None, options=None):
+        """Files directly under ``path`` whose name starts with ``options['search']``"""
+        options = {'limit': 100, 'offset': 0, 'search': '', **(options or {})}
+        entries = []
+        for name in sorted(self.files):
+            directory, filename = posixpath.split(name)
+            if directory == (path or '').strip('/') and filename.lower().startswith(options['search'].lower()):
+                entries.append({'name': filename, 'metadata': dict(self.files[name]['metadata'])})
+        return entries[options['offset']:options['offset'] + options['limit']]
+
+    def remove(self, paths):
+        # Missing files are skipped, not reported
+        return [{'name': path} for path in paths if self.files.pop(path, None) is not None]
+
+    def get_public_url(self, path):
+        # storage3 appends the (here empty) query string
+        return f'{self.url}/storage/v1/object/public/{self.id}/{path}?'
@@ -0,0 +1,106 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+
+from accommodation import amenities, benchmarks
+from accommodation.models import Accommodation, AccommodationAmenity, Amenity
+
+
+class CanonicalNameTests(TestCase):
+
+    def test_spelling_variants_share_a_key(self):
+        self.assertEqual({amenities.canonical_key(name) for name in ('WiFi', 'wifi', ' Wi-Fi ', 'WI_FI')}, {'wifi'})
+        self.assertEqual(amenities.canonical_key('Straße'), 'strasse')
+        self.assertEqual(amenities.canonical_key(' - '), '')
+
+    def test_parse_keeps_the_first_spelling(self):
+        self.assertEqual(amenities.parse('WiFi,  Air   conditioning, wi-fi, , Gym'), ['WiFi', 'Air conditioning', 'Gym'])
+        self.assertEqual(amenities.parse('a, b, c', limit=2), ['a', 'b'])
+        self.assertEqual(amenities.parse(None), [])
+
+    def test_intern_reuses_existing_amenities(self):
+        first = amenities.intern(['WiFi', 'Parking'])
+        with self.assertNumQueries(1):
+            again = amenities.intern(['wi-fi', 'PARKING', ''])
+        self.assertEqual(again, first)
+        self.assertEqual(Amenity.objects.get(key='wifi').name, 'WiFi')
+        self.assertEqual(amenities.intern([' ', '--']), {})
+
+
+class SetAmenitiesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = benchmarks.seed(accommodations=3, applications=0)
+        cls.ids = list(Accommodation.objects.order_by('pk').values_list('pk', flat=True))
+
+    def names(self, pk):
+        return sorted(Accommodation.objects.get(pk=pk).amenities.values_list('name', flat=True))
+
+    def test_set_many_replaces_the_links(self):
+        amenities.set_many({self.ids[0]: ['WiFi', 'wifi', 'Gym'], self.ids[1]: ['Gym']})
+        amenities.set_many({self.ids[0]: ['Parking']})
+        self.assertEqual(self.names(self.ids[0]), ['Parking'])
+        self.assertEqual(self.names(self.ids[1]), ['Gym'])
+        # Amenities are shared, not copied per listing
+        self.assertEqual(Amenity.objects.filter(key='gym').count(), 1)
+
+    def test_filter_requires_every_amenity(self):
+        amenities.set_many({self.ids[0]: ['WiFi', 'Gym'], self.ids[1]: ['WiFi'], self.ids[2]: []})
+        matching = amenities.filter_amenities(Accommodation.objects.all(), ['wi-fi', 'GYM'])
+        self.assertEqual(list(matching.values_list('pk', flat=True)), [self.ids[0]])
+        self.assertEqual(set(amenities.filter_amenities(Accommodation.objects.all(), ['']).values_list('pk', flat=True)), set(self.ids))
+
+
+class AmenityDataMigrationTests(TransactionTestCase):
+    # Restore the gazetteer rows of migration 0016 for the tests that follow
+    serialized_rollback = True
+    before = [('accommodation', '0010_amenity')]
+    after = [('accommodation', '0011_amenity_data')]
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate(self.before)
+        self.executor.loader.build_graph()
+        self.addCleanup(self.migrate_to_latest)
+
+    def migrate_to_latest(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def create_listings(self, apps, *amenity_lists):
+        Accommodation = apps.get_model('accommodation', 'Accommodation')
+        return [
+            Accommodation.objects.create(
+                title='Room', description='', type='Room', location='Lahore', address='', price=Decimal(100),
+                religious_preference='Any', bedrooms=1, bathrooms=Decimal(1), amenities=names,
+                contact_email='owner@example.com', contact_phone='0300',
+            ).pk
+            for names in amenity_lists
+        ]
+
+    def test_lists_become_interned_links_and_back(self):
+        apps = self.executor.loader.project_state(self.before).apps
+        first, second, empty = self.create_listings(apps, ['WiFi', 'wi-fi', 'Parking'], ['WIFI', ' Gym '], [])
+
+        self.executor.migrate(self.after)
+        apps = MigrationExecutor(connection).loader.project_state(self.after).apps
+        Amenity = apps.get_model('accommodation', 'Amenity')
+        links = apps.get_model('accommodation', 'AccommodationAmenity').objects
+        self.assertEqual(sorted(Amenity.objects.values_list('key', 'name')), [
+            ('gym', 'Gym'), ('parking', 'Parking'), ('wifi', 'WiFi'),
+        ])
+        self.assertEqual(
+            sorted(links.values_list('accommodation_id', 'amenity__key', 'name')),
+            [(first, 'parking', 'Parking'), (first, 'wifi', 'WiFi'), (second, 'gym', 'Gym'), (second, 'wifi', 'WiFi')],
+        )
+        self.assertFalse(links.filter(accommodation_id=empty).exists())
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        Accommodation = executor.loader.project_state(self.before).apps.get_model('accommodation', 'Accommodation')
+        self.assertEqual(
+            dict(Accommodation.objects.values_list('pk', 'amenities')),
+            {first: ['Parking', 'WiFi'], second: ['Gym', 'WiFi'], empty: []},
+        )
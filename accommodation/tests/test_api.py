@@ -0,0 +1,51 @@
+from django.test import TestCase
+
+from accommodation import amenities, benchmarks
+from accommodation.models import Accommodation
+
+
+class AccommodationValidatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = benchmarks.seed(accommodations=3, applications=0)
+
+    def setUp(self):
+        self.client.force_login(self.dataset.user)
+        self.accommodation = Accommodation.objects.get(pk=self.dataset.accommodation_id)
+        self.url = f'/api/v1/accommodations/{self.accommodation.pk}/'
+
+    def test_unchanged_listing_is_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_amenity_changes_invalidate_the_etag(self):
+        response = self.client.get(self.url)
+        self.assertNotIn('Sauna', response.json()['amenities'])
+
+        amenities.set_amenities(self.accommodation, ['Sauna'])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['amenities'], ['Sauna'])
+
+    def test_bulk_amenity_changes_invalidate_the_list_etag(self):
+        response = self.client.get('/api/v1/accommodations/')
+        amenities.set_many({self.accommodation.pk: ['Rooftop']})
+        response = self.client.get('/api/v1/accommodations/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        listing, = [row for row in response.json()['results'] if row['id'] == self.accommodation.pk]
+        self.assertEqual(listing['amenities'], ['Rooftop'])
+
+    def test_list_is_modified_by_a_deletion(self):
+        url = '/api/v1/accommodations/'
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        Accommodation.objects.exclude(pk=self.accommodation.pk).first().delete()
+        for headers in ({'HTTP_IF_NONE_MATCH': response['ETag']}, {'HTTP_IF_MODIFIED_SINCE': 'Fri, 01 Jan 2100 00:00:00 GMT'}):
+            with self.subTest(**headers):
+                self.assertEqual(self.client.get(url, **headers).status_code, 200)
+
+    def test_detail_keeps_last_modified(self):
+        response = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
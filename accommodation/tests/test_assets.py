@@ -0,0 +1,95 @@
+import os
+import tempfile
+from pathlib import Path
+
+from django.test import SimpleTestCase, override_settings
+
+from accommodation import assets
+
+
+class MinifyCssTests(SimpleTestCase):
+
+    def test_comments_and_whitespace_are_removed(self):
+        css = '/* header */\n.card  > .title ,\na:hover {\n  color : red;\n  margin: 0  auto ;\n}\n'
+        self.assertEqual(assets.minify_css(css), '.card>.title,a:hover{color :red;margin:0 auto}\n')
+
+    def test_strings_are_left_alone(self):
+        css = '.quote::before { content: "/* not a comment */  ;}"; font-family: \'Open  Sans\', serif; }'
+        self.assertEqual(
+            assets.minify_css(css),
+            '.quote::before{content:"/* not a comment */  ;}";font-family:\'Open  Sans\',serif}\n',
+        )
+
+    def test_descendant_selectors_keep_their_space(self):
+        self.assertEqual(assets.minify_css('nav   ul/* list */li  { }'), 'nav ul li{}\n')
+
+
+class BundleTests(SimpleTestCase):
+
+    def setUp(self):
+        sources = tempfile.TemporaryDirectory()
+        build = tempfile.TemporaryDirectory()
+        self.addCleanup(sources.cleanup)
+        self.addCleanup(build.cleanup)
+        self.sources = Path(sources.name)
+        (self.sources / 'css').mkdir()
+        self.write('css/first.css', 'a { color: red; }')
+        self.write('css/second.css', 'b { color: blue; }')
+        settings = override_settings(
+            STATICFILES_DIRS=[self.sources],
+            STATICFILES_FINDERS=[
+                'django.contrib.staticfiles.finders.FileSystemFinder', 'accommodation.assets.BundleFinder',
+            ],
+            CSS_BUNDLES={'css/all.min.css': ['css/first.css', 'css/second.css']},
+            CSS_BUNDLE_ROOT=build.name,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.target = os.path.join(build.name, 'css', 'all.min.css')
+
+    def write(self, name, css, mtime=None):
+        path = self.sources / name
+        path.write_text(css, encoding='utf-8')
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def read(self):
+        with open(self.target, encoding='utf-8') as bundle:
+            return bundle.read()
+
+    def test_sources_are_concatenated_in_order(self):
+        self.assertEqual(assets.build_bundle('css/all.min.css'), self.target)
+        self.assertEqual(self.read(), 'a{color:red}\nb{color:blue}\n')
+
+    def test_bundles_are_rebuilt_only_when_a_source_is_newer(self):
+        assets.build_bundle('css/all.min.css')
+        os.utime(self.target, (2_000_000_000, 2_000_000_000))
+        self.write('css/second.css', 'b { color: green; }', mtime=1_000_000_000)
+        assets.build_bundle('css/all.min.css')
+        self.assertIn('blue', self.read())
+        self.write('css/second.css', 'b { color: green; }', mtime=2_000_000_001)
+        assets.build_bundle('css/all.min.css')
+        self.assertIn('green', self.read())
+
+    def test_finder(self):
+        finder = assets.BundleFinder()
+        self.assertEqual(finder.find('css/first.css'), [])
+        self.assertEqual(finder.find('css/all.min.css'), self.target)
+        self.assertEqual(finder.find('css/all.min.css', all=True), [self.target])
+        listed = [(name, storage.path(name)) for name, storage in finder.list([])]
+        self.assertEqual(listed, [('css/all.min.css', self.target)])
+        self.assertEqual(finder.check(), [])
+
+    def test_check_reports_bad_bundles(self):
+        bundles = {'css/missing.min.css': ['css/nowhere.css'], 'css/nested.min.css': ['css/missing.min.css']}
+        with self.settings(CSS_BUNDLES=bundles):
+            errors = assets.BundleFinder().check()
+        self.assertEqual([error.id for error in errors], ['accommodation.E001'] * 2)
+        self.assertIn('css/nowhere.css not found', errors[0].msg)
+        self.assertIn('cannot include another bundle', errors[1].msg)
+
+
+class ProjectBundleTests(SimpleTestCase):
+
+    def test_configured_bundles_resolve(self):
+        self.assertEqual(assets.BundleFinder().check(), [])
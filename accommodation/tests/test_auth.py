@@ -0,0 +1,101 @@
+from unittest import mock
+
+from django.contrib.auth import authenticate
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accommodation.backends import find_user
+from accommodation.models import User
+
+ARGON2 = 'accommodation.hashers.ConfigurableArgon2PasswordHasher'
+PBKDF2 = 'accommodation.hashers.ConfigurablePBKDF2PasswordHasher'
+FAST_HASHERS = dict(ARGON2_TIME_COST=1, ARGON2_MEMORY_COST=256, PBKDF2_ITERATIONS=1000)
+
+
+@override_settings(PASSWORD_HASHERS=[PBKDF2, ARGON2], **FAST_HASHERS)
+class EmailBackendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.jane = User.objects.create_user('jane', 'Jane.Doe@Example.com', 'secret-pw')
+        cls.root = User.objects.create_user('root', '', 'secret-pw')
+
+    def test_email_ignores_case_and_spaces(self):
+        for identifier in ('jane.doe@example.com', ' JANE.DOE@EXAMPLE.COM ', 'Jane.Doe@Example.com'):
+            with self.subTest(identifier=identifier):
+                self.assertEqual(find_user(identifier), self.jane)
+        self.assertEqual(authenticate(email='JANE.doe@example.com', password='secret-pw'), self.jane)
+
+    def test_identifiers_without_at_are_usernames(self):
+        self.assertEqual(find_user('jane'), self.jane)
+        self.assertIsNone(find_user('Jane'))
+        self.assertEqual(authenticate(username='root', password='secret-pw'), self.root)
+
+    def test_blank_emails_never_match(self):
+        self.assertIsNone(find_user(''))
+        self.assertIsNone(find_user(None))
+        self.assertIsNone(authenticate(email='', password='secret-pw'))
+
+    def test_wrong_password_and_inactive_users(self):
+        self.assertIsNone(authenticate(email='jane.doe@example.com', password='wrong'))
+        User.objects.filter(pk=self.jane.pk).update(is_active=False)
+        self.assertIsNone(authenticate(email='jane.doe@example.com', password='secret-pw'))
+
+    def test_unknown_addresses_are_hashed_too(self):
+        with mock.patch.object(User, 'set_password') as set_password:
+            self.assertIsNone(authenticate(email='nobody@example.com', password='secret-pw'))
+        set_password.assert_called_once_with('secret-pw')
+
+    def test_login_view(self):
+        response = self.client.post(reverse('auth_login'), {'email': 'JANE.DOE@example.com', 'password': 'secret-pw'})
+        self.assertRedirects(response, reverse('accommodations'), fetch_redirect_response=False)
+        self.assertEqual(int(self.client.session['_auth_user_id']), self.jane.pk)
+
+
+class EmailConstraintTests(TestCase):
+
+    def test_emails_are_unique_ignoring_case(self):
+        User.objects.create_user('jane', 'jane@example.com')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user('jane2', 'JANE@Example.com')
+        with self.assertRaisesMessage(ValidationError, 'A user with that email address already exists.'):
+            User(username='jane3', email='Jane@example.com').validate_constraints()
+
+    def test_several_accounts_may_have_no_email(self):
+        User.objects.create_user('root', '')
+        User.objects.create_user('admin', '')
+        self.assertEqual(User.objects.filter(email='').count(), 2)
+
+
+@override_settings(**FAST_HASHERS)
+class RehashOnLoginTests(TestCase):
+
+    def setUp(self):
+        with self.settings(PASSWORD_HASHERS=[PBKDF2, ARGON2]):
+            self.user = User.objects.create_user('jane', 'jane@example.com', 'secret-pw')
+
+    def stored_hash(self):
+        return User.objects.values_list('password', flat=True).get(pk=self.user.pk)
+
+    def test_hashes_move_to_the_preferred_algorithm(self):
+        self.assertTrue(self.stored_hash().startswith('pbkdf2_sha256$1000$'))
+        with self.settings(PASSWORD_HASHERS=[ARGON2, PBKDF2]):
+            self.assertEqual(authenticate(email='jane@example.com', password='secret-pw'), self.user)
+            self.assertTrue(self.stored_hash().startswith('argon2$argon2id$v=19$m=256,t=1,p=1$'))
+            # Old hashes of the other kind keep working after the upgrade
+            self.assertEqual(authenticate(email='jane@example.com', password='secret-pw'), self.user)
+
+    def test_hashes_follow_cost_changes(self):
+        with self.settings(PASSWORD_HASHERS=[PBKDF2, ARGON2], PBKDF2_ITERATIONS=1500):
+            authenticate(email='jane@example.com', password='secret-pw')
+            self.assertTrue(self.stored_hash().startswith('pbkdf2_sha256$1500$'))
+        with self.settings(PASSWORD_HASHERS=[ARGON2, PBKDF2], ARGON2_MEMORY_COST=512):
+            authenticate(email='jane@example.com', password='secret-pw')
+            self.assertIn('$m=512,t=1,p=1$', self.stored_hash())
+
+    def test_failed_logins_do_not_rehash(self):
+        before = self.stored_hash()
+        with self.settings(PASSWORD_HASHERS=[ARGON2, PBKDF2]):
+            self.assertIsNone(authenticate(email='jane@example.com', password='wrong'))
+        self.assertEqual(self.stored_hash(), before)
@@ -0,0 +1,107 @@
+import io
+import os
+import tempfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+
+from accommodation import benchmarks, bulk
+from accommodation.models import Accommodation
+
+
+class BulkImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = benchmarks.seed(accommodations=3, applications=0)
+        lines = ''.join(bulk.export_accommodations('csv')).splitlines(keepends=True)
+        cls.header, cls.rows = lines[0], lines[1:]
+        # The same listings as new rows: an empty id column
+        cls.new_rows = [',' + row.split(',', 1)[1] for row in cls.rows]
+
+    def import_csv(self, lines, **kwargs):
+        return bulk.import_accommodations(bulk.read_rows(io.StringIO(self.header + ''.join(lines)), 'csv'), **kwargs)
+
+    def test_invalid_rows_are_skipped_in_every_chunk(self):
+        # Every column but the id is missing
+        invalid = ',\n'
+        before = Accommodation.objects.count()
+        result = self.import_csv([self.new_rows[0], invalid, self.new_rows[1], self.new_rows[2]], chunk_size=2)
+        self.assertEqual((result.created, result.updated, result.failed), (3, 0, 1))
+        self.assertEqual([line for line, _ in result.errors], [3])
+        self.assertEqual(Accommodation.objects.count(), before + 3)
+
+    def test_rows_with_an_id_update_and_unknown_ids_are_reported(self):
+        missing = '999999,' + self.rows[0].split(',', 1)[1]
+        result = self.import_csv([self.rows[0], missing])
+        self.assertEqual((result.created, result.updated, result.failed), (0, 1, 1))
+        self.assertEqual(result.errors, [(3, {'id': ['Accommodation 999999 does not exist']})])
+
+    def test_database_error_fails_only_its_chunk(self):
+        bulk_create = Accommodation.objects.bulk_create
+        errors = [DatabaseError('deadlock')]
+
+        def fail_once(objs, *args, **kwargs):
+            if errors:
+                raise errors.pop()
+            return bulk_create(objs, *args, **kwargs)
+
+        with mock.patch.object(Accommodation.objects, 'bulk_create', side_effect=fail_once):
+            result = self.import_csv(self.new_rows, chunk_size=2)
+        self.assertEqual((result.created, result.failed), (1, 2))
+        self.assertEqual(result.errors[0], (2, {'__all__': ['Database error: deadlock']}))
+
+    def test_dry_run_writes_nothing(self):
+        before = Accommodation.objects.count()
+        result = self.import_csv(self.new_rows, dry_run=True)
+        self.assertEqual(result.created, 3)
+        self.assertEqual(Accommodation.objects.count(), before)
+
+    def test_undecodable_stream_stops_at_the_line(self):
+        # Large enough for the text stream to decode several blocks before the bad one
+        rows = self.new_rows * 50
+        data = (self.header + ''.join(rows)).encode() + b'\xff\xfe,broken\n' + self.new_rows[0].encode()
+        result = bulk.import_accommodations(bulk.read_rows(bulk.text_stream(io.BytesIO(data)), 'csv'), chunk_size=1)
+        self.assertTrue(0 < result.created < len(rows))
+        self.assertIn(f'could not be decoded after line {result.created + 1}:', result.read_error)
+
+    def test_check_encoding_names_the_first_bad_line(self):
+        data = io.BytesIO(b'\xef\xbb\xbfid,title\n1,ok\n2,caf\xe9\n3,ok\n')
+        with self.assertRaisesMessage(bulk.ImportFormatError, 'Line 3 is not valid utf-8-sig'):
+            bulk.check_encoding(data, chunk_size=4)
+        self.assertEqual(data.tell(), 0)
+        bulk.check_encoding(io.BytesIO(self.header.encode() + 'Café'.encode()), chunk_size=3)
+
+    def test_command_rejects_an_undecodable_file(self):
+        before = Accommodation.objects.count()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'units.csv')
+            with open(path, 'wb') as output:
+                output.write((self.header + self.new_rows[0]).encode() + b'\xff\n')
+            with self.assertRaisesMessage(CommandError, 'Line 3 is not valid utf-8-sig'):
+                call_command('import_accommodations', path, stdout=io.StringIO())
+        self.assertEqual(Accommodation.objects.count(), before)
+
+    def test_jsonl_lines_that_are_not_objects(self):
+        result = bulk.import_accommodations(bulk.read_rows(io.StringIO('[1, 2]\n\n{"title": \n'), 'jsonl'))
+        self.assertEqual([line for line, _ in result.errors], [1, 3])
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class ImportViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = benchmarks.seed(accommodations=3, applications=0)
+
+    def test_undecodable_upload_writes_nothing(self):
+        self.client.force_login(self.dataset.admin)
+        lines = ''.join(bulk.export_accommodations('csv')).splitlines(keepends=True)
+        data = (lines[0] + ',' + lines[1].split(',', 1)[1]).encode() + b'\xff\n'
+        before = Accommodation.objects.count()
+        response = self.client.post('/admin/accommodations/import/', {
+            'file': SimpleUploadedFile('units.csv', data, content_type='text/csv'),
+        })
+        self.assertContains(response, 'Could not read the file: Line 3 is not valid utf-8-sig')
+        self.assertEqual(Accommodation.objects.count(), before)
@@ -0,0 +1,120 @@
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from accommodation import benchmarks, cache
+from accommodation.models import Accommodation, Application, Place, User
+
+
+class CacheVersionTests(SimpleTestCase):
+
+    def test_bump_changes_the_keys_of_its_namespace_only(self):
+        listing_key = cache.make_key((cache.ACCOMMODATIONS,), 'grid', 1)
+        users_key = cache.make_key((cache.USERS,), 'grid', 1)
+        cache.bump(cache.ACCOMMODATIONS)
+        self.assertNotEqual(cache.make_key((cache.ACCOMMODATIONS,), 'grid', 1), listing_key)
+        self.assertEqual(cache.make_key((cache.USERS,), 'grid', 1), users_key)
+
+
+    def test_get_or_set_counts_hits_and_misses(self):
+        calls = []
+        before = cache.cache_stats()
+        for _ in range(3):
+            value = cache.get_or_set((cache.USERS,), ('counted',), lambda: calls.append(1) or 'value')
+        self.assertEqual((value, len(calls)), ('value', 1))
+        stats = cache.cache_stats()
+        self.assertEqual((stats['hits'] - before['hits'], stats['misses'] - before['misses']), (2, 1))
+        self.assertEqual(set(stats['namespaces']), set(cache.NAMESPACES))
+
+
+class AnonymousPageCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.calls = 0
+        self.status = 200
+
+        @cache.cache_anonymous_page()
+        def view(request):
+            self.calls += 1
+            return HttpResponse(f'render {self.calls}', status=self.status)
+
+        self.view = view
+        # A path of its own, so other tests' pages are never hits
+        self.path = f'/cached-{id(self)}/'
+
+    def get(self, path=None, user=None, method='get'):
+        request = getattr(RequestFactory(), method)(path or self.path)
+        request.user = user or AnonymousUser()
+        return self.view(request)
+
+    def test_anonymous_gets_are_served_from_the_cache(self):
+        self.assertEqual(self.get().content, b'render 1')
+        self.assertEqual(self.get().content, b'render 1')
+        self.assertEqual(self.get(self.path + '?page=2').content, b'render 2')
+        self.assertEqual(self.calls, 2)
+
+    def test_bumping_the_namespace_drops_the_page(self):
+        self.get()
+        cache.bump(cache.USERS)
+        self.get()
+        self.assertEqual(self.calls, 1)
+        cache.bump(cache.ACCOMMODATIONS)
+        self.assertEqual(self.get().content, b'render 2')
+
+    def test_users_posts_and_errors_reach_the_view(self):
+        self.get(user=User(username='jane'))
+        self.get(method='post')
+        self.status = 404
+        self.get()
+        self.get()
+        self.assertEqual(self.calls, 4)
+
+
+class SignalInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = benchmarks.seed(accommodations=2, applications=1)
+
+    def assertBumps(self, namespaces, write):
+        versions = {namespace: cache.namespace_version(namespace) for namespace in cache.NAMESPACES}
+        write()
+        changed = {namespace for namespace in cache.NAMESPACES if cache.namespace_version(namespace) != versions[namespace]}
+        self.assertEqual(changed, set(namespaces))
+
+    def test_writes_bump_their_namespace(self):
+        accommodation = Accommodation.objects.get(pk=self.dataset.accommodation_id)
+        application = Application.objects.first()
+        user = User.objects.get(pk=self.dataset.user.pk)
+        # Saving or deleting an application also moves the counters on its
+        # listing and user, but with update() calls that send no signals
+        self.assertBumps({cache.ACCOMMODATIONS}, lambda: accommodation.save(update_fields=['title']))
+        self.assertBumps({cache.APPLICATIONS}, lambda: application.save(update_fields=['message']))
+        self.assertBumps({cache.USERS}, lambda: user.save(update_fields=['first_name']))
+        self.assertBumps({cache.PLACES, cache.ACCOMMODATIONS}, lambda: Place.objects.create(
+            name='Atlantis', key='atlantis', kind=Place.CITY, latitude=0, longitude=0,
+        ))
+        self.assertBumps({cache.APPLICATIONS}, application.delete)
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_saving_a_listing_drops_cached_pages(self):
+        self.client.get('/')
+        with self.assertNumQueries(0):
+            self.client.get('/')
+        Accommodation.objects.get(pk=self.dataset.accommodation_id).save()
+        before = cache.cache_stats()['misses']
+        self.client.get('/')
+        self.assertEqual(cache.cache_stats()['misses'], before + 1)
+
+
+class WarnIfPrivateTests(SimpleTestCase):
+
+    @override_settings(SHARED_CACHE=False, DEBUG=False)
+    def test_private_cache_in_a_deployment(self):
+        with self.assertLogs('accommodation.cache', 'WARNING') as logs:
+            self.assertTrue(cache.warn_if_private())
+        self.assertIn('Set CACHE_URL', logs.output[0])
+
+    def test_shared_cache_or_debug(self):
+        for overrides in ({'SHARED_CACHE': True, 'DEBUG': False}, {'SHARED_CACHE': False, 'DEBUG': True}):
+            with self.subTest(**overrides), override_settings(**overrides):
+                self.assertFalse(cache.warn_if_private())
@@ -0,0 +1,144 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from harmony_housing.pooled_postgresql import base
+
+TRANSACTION_STATUS_INTRANS = 2
+
+
+class FakeConnection:
+    """Just enough of a psycopg connection for the pool"""
+
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+        self.closed = 0
+        self.rollbacks = 0
+        self.info = SimpleNamespace(transaction_status=base.TRANSACTION_STATUS_IDLE)
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        if not self.healthy:
+            raise base.DatabaseError('server closed the connection unexpectedly')
+        self.rollbacks += 1
+        self.info.transaction_status = base.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def execute(self, sql):
+        if not self.connection.healthy:
+            raise base.DatabaseError('server closed the connection unexpectedly')
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def pool(self, max_size=2, timeout=0, max_idle=300):
+        self.opened = []
+
+        def connect():
+            self.opened.append(FakeConnection())
+            return self.opened[-1]
+
+        return base.ConnectionPool(connect, max_size=max_size, timeout=timeout, max_idle=max_idle)
+
+    def test_checkout_and_return_reuse_the_connection(self):
+        pool = self.pool()
+        connection = pool.get()
+        self.assertEqual((pool.size, pool.idle), (1, 0))
+        pool.put(connection)
+        self.assertEqual((pool.size, pool.idle), (1, 1))
+        self.assertIs(pool.get(), connection)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_full_pool_times_out(self):
+        pool = self.pool(max_size=1)
+        pool.get()
+        with self.assertRaises(base.PoolTimeout):
+            pool.get()
+
+    def test_failed_connect_frees_the_slot(self):
+        pool = base.ConnectionPool(mock.Mock(side_effect=base.DatabaseError), max_size=1, timeout=0, max_idle=300)
+        with self.assertRaises(base.DatabaseError):
+            pool.get()
+        self.assertEqual(pool.size, 0)
+
+    def test_dirty_connection_is_rolled_back_on_return(self):
+        pool = self.pool()
+        connection = pool.get()
+        connection.info.transaction_status = TRANSACTION_STATUS_INTRANS
+        pool.put(connection)
+        self.assertEqual(connection.rollbacks, 1)
+        self.assertEqual(pool.idle, 1)
+
+    def test_connection_that_cannot_roll_back_is_discarded(self):
+        pool = self.pool()
+        connection = pool.get()
+        connection.info.transaction_status = TRANSACTION_STATUS_INTRANS
+        connection.healthy = False
+        pool.put(connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual((pool.size, pool.idle), (0, 0))
+
+    def test_closed_and_expired_connections_are_replaced(self):
+        pool = self.pool(max_idle=-1)
+        connection = pool.get()
+        pool.put(connection)
+        self.assertIsNot(pool.get(), connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.size, 1)
+
+
+class PooledDatabaseWrapperTests(SimpleTestCase):
+    alias = 'pool-tests'
+
+    def setUp(self):
+        self.addCleanup(base._pools.clear)
+        self.wrapper = base.DatabaseWrapper({
+            'ENGINE': 'harmony_housing.pooled_postgresql',
+            'NAME': 'postgres',
+            'OPTIONS': {},
+            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': True,
+            'POOL': {'MAX_SIZE': 2, 'TIMEOUT': 0},
+        }, self.alias)
+        self.pool = base.get_pool(self.alias, self.wrapper.pool_settings, FakeConnection)
+
+    def test_close_returns_the_connection_to_the_pool(self):
+        connection = self.wrapper.get_new_connection({})
+        self.wrapper.connection = connection
+        self.wrapper._close()
+        self.assertFalse(connection.closed)
+        self.assertEqual(self.pool.idle, 1)
+        self.assertIs(self.wrapper.get_new_connection({}), connection)
+
+    def test_connection_failing_its_ping_is_discarded(self):
+        dead = self.pool.get()
+        self.pool.put(dead)
+        dead.healthy = False
+        connection = self.wrapper.get_new_connection({})
+        self.assertIsNot(connection, dead)
+        self.assertTrue(dead.closed)
+        self.assertEqual((self.pool.size, self.pool.idle), (1, 0))
+
+    def test_forked_process_gets_its_own_pool(self):
+        self.assertIs(self.wrapper.pool, self.pool)
+        with mock.patch.object(base.os, 'getpid', return_value=-1):
+            child_pool = self.wrapper.pool
+        self.assertIsNot(child_pool, self.pool)
+        self.assertEqual(child_pool.size, 0)
+        self.assertIs(self.wrapper.pool, self.pool)
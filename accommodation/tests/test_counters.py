@@ -0,0 +1,85 @@
+from django.test import TestCase
+
+from accommodation import benchmarks, counters, reviews
+from accommodation.models import Accommodation, Application, User
+
+
+class ApplicationCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = benchmarks.seed(accommodations=2, applications=0, users=1)
+
+    def setUp(self):
+        self.accommodation = Accommodation.objects.get(pk=self.dataset.accommodation_id)
+        self.user = self.dataset.user
+
+    def apply(self, status='Pending'):
+        return Application.objects.create(
+            accommodation=self.accommodation, user=self.user, user_name='Seed', user_email='seed@example.invalid',
+            user_phone='03001234567', message='Hello', status=status,
+        )
+
+    def assertCounters(self, pending, approved, rejected):
+        for model, pk in ((User, self.user.pk), (Accommodation, self.accommodation.pk)):
+            row = model.objects.get(pk=pk)
+            with self.subTest(model=model.__name__):
+                self.assertEqual(
+                    (row.pending_applications, row.approved_applications, row.rejected_applications),
+                    (pending, approved, rejected),
+                )
+        self.assertEqual(counters.reconcile(dry_run=True), {'user': 0, 'accommodation': 0})
+
+    def test_create_transition_and_delete(self):
+        application = self.apply()
+        self.assertCounters(1, 0, 0)
+        application.status = 'Approved'
+        application.save(update_fields=['status', 'updated_at'])
+        self.assertCounters(0, 1, 0)
+        application.save()
+        self.assertCounters(0, 1, 0)
+        application.delete()
+        self.assertCounters(0, 0, 0)
+
+    def test_stale_instances_count_the_stored_status(self):
+        application = self.apply()
+        first, second = Application.objects.get(pk=application.pk), Application.objects.get(pk=application.pk)
+        first.status = 'Approved'
+        first.save()
+        # second was loaded as Pending before first was saved
+        second.status = 'Rejected'
+        second.save()
+        self.assertCounters(0, 0, 1)
+
+    def test_repeated_transition_counts_once(self):
+        application = self.apply()
+        for stale in (Application.objects.get(pk=application.pk), Application.objects.get(pk=application.pk)):
+            stale.status = 'Approved'
+            stale.save(update_fields=['status'])
+        self.assertCounters(0, 1, 0)
+
+    def test_saves_without_the_status_do_not_lock_the_row(self):
+        application = self.apply()
+        application.message = 'Updated'
+        with self.assertNumQueries(1):
+            application.save(update_fields=['message'])
+
+    def test_bulk_review(self):
+        for _ in range(3):
+            self.apply()
+        self.apply('Rejected')
+        result = reviews.update_statuses(Application.objects.all(), 'Approved')
+        self.assertEqual(result.updated, 4)
+        self.assertCounters(0, 4, 0)
+
+    def test_cascade_delete(self):
+        self.apply()
+        self.apply('Approved')
+        self.accommodation.delete()
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(user.total_applications, 0)
+
+    def test_reconcile_repairs_drift(self):
+        self.apply()
+        User.objects.filter(pk=self.user.pk).update(pending_applications=5, rejected_applications=2)
+        self.assertEqual(counters.reconcile(), {'user': 1, 'accommodation': 0})
+        self.assertCounters(1, 0, 0)
@@ -0,0 +1,96 @@
+from unittest import mock
+
+from django.core.cache import cache as django_cache
+from django.db.models import F, Value
+from django.db.models.functions import Mod
+from django.test import TestCase
+
+from accommodation import amenities, benchmarks, facets
+from accommodation.models import Accommodation
+from accommodation.search import BEDROOM_BUCKETS, PRICE_BANDS, ListingQuery
+
+CHOICES = {
+    'type': [value for value, _ in Accommodation.ACCOMMODATION_TYPES],
+    'religious_preference': [value for value, _ in Accommodation.RELIGIOUS_PREFERENCES if value != 'Any'],
+    'status': [value for value, _ in Accommodation.STATUS_CHOICES],
+    'bedrooms': [value for value, *_ in BEDROOM_BUCKETS],
+    'price_band': [value for value, *_ in PRICE_BANDS],
+}
+
+
+class FacetCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = benchmarks.seed(accommodations=60, applications=0)
+        # Spread the seeded prices over every price band
+        Accommodation.objects.update(price=Mod(F('id') * 370, Value(2600)))
+
+    def setUp(self):
+        # Rolled back writes of other tests leave their counts cached
+        django_cache.clear()
+
+    def assertCountsMatchQueries(self, **filters):
+        """Every count equals the size of the result set that option would give"""
+        counts = facets.facet_counts(ListingQuery(**filters))
+        self.assertEqual(counts['total'], ListingQuery(**filters).queryset().count())
+        for facet, values in CHOICES.items():
+            for value in values:
+                with self.subTest(filters=filters, facet=facet, value=value):
+                    expected = ListingQuery(**{**filters, facet: value}).queryset().count()
+                    self.assertEqual(counts[facet].get(value, 0), expected)
+
+    def test_no_filters(self):
+        self.assertCountsMatchQueries()
+        counts = facets.facet_counts(ListingQuery())
+        self.assertEqual(sum(counts['type'].values()), Accommodation.objects.count())
+
+    def test_counts_are_disjunctive(self):
+        self.assertCountsMatchQueries(type='Room', status='Available')
+        self.assertCountsMatchQueries(religious_preference='Muslim', price_band='500-1000', bedrooms='4+')
+        self.assertCountsMatchQueries(location='Lahore', bedrooms='2')
+
+    def test_a_selection_keeps_its_own_facet_counts(self):
+        everything = facets.facet_counts(ListingQuery())
+        rooms = facets.facet_counts(ListingQuery(type='Room'))
+        self.assertEqual(rooms['type'], everything['type'])
+        self.assertEqual(rooms['total'], everything['type'].get('Room', 0))
+
+    def test_counts_follow_writes(self):
+        before = facets.facet_counts(ListingQuery())['status'].get('Occupied', 0)
+        accommodation = Accommodation.objects.filter(status='Available').first()
+        accommodation.status = 'Occupied'
+        accommodation.save()
+        self.assertEqual(facets.facet_counts(ListingQuery())['status'].get('Occupied', 0), before + 1)
+
+    def test_options_mark_the_selection(self):
+        options = facets.facet_options(ListingQuery(type='House'))
+        self.assertEqual([value for value, _, _, selected in options['type'] if selected], ['House'])
+        self.assertEqual([value for value, *_ in options['religious_preference']], CHOICES['religious_preference'])
+
+
+class AmenityOptionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = benchmarks.seed(accommodations=3, applications=0)
+        ids = list(Accommodation.objects.order_by('pk').values_list('pk', flat=True))
+        amenities.set_many({ids[0]: ['WiFi', 'Parking', 'Balcony'], ids[1]: ['WiFi'], ids[2]: ['Gym']})
+
+    def test_counts_over_the_results(self):
+        self.assertEqual(
+            facets.amenity_options(ListingQuery()),
+            [('WiFi', 'WiFi', 2, False), ('Balcony', 'Balcony', 1, False), ('Gym', 'Gym', 1, False),
+             ('Parking', 'Parking', 1, False)],
+        )
+        # Amenities combine with AND: with WiFi required, Gym would leave nothing
+        self.assertEqual(
+            facets.amenity_options(ListingQuery(amenities=['wifi'])),
+            [('WiFi', 'WiFi', 2, True), ('Balcony', 'Balcony', 1, False), ('Parking', 'Parking', 1, False)],
+        )
+
+    def test_selected_amenities_are_always_listed(self):
+        options = facets.amenity_options(ListingQuery(amenities=['Sauna']))
+        self.assertEqual(options, [('Sauna', 'Sauna', 0, True)])
+        # Past the limit, but selected
+        with mock.patch.object(facets, 'AMENITY_FACET_LIMIT', 1):
+            options = facets.amenity_options(ListingQuery(amenities=['parking']))
+        self.assertEqual(options, [('Balcony', 'Balcony', 1, False), ('Parking', 'Parking', 1, True)])
@@ -0,0 +1,121 @@
+from django.test import TestCase, override_settings
+
+from accommodation import benchmarks, fulltext
+from accommodation.models import Accommodation
+
+
+def _listing(title, description='A room.', location='Lahore', address='1 Mall Road'):
+    return Accommodation.objects.create(
+        title=title, description=description, type='Room', location=location, address=address,
+        price=10_000, religious_preference='Any', bedrooms=1, bathrooms=1,
+        contact_email='owner@example.invalid', contact_phone='0300',
+    )
+
+
+class TokenizeTests(TestCase):
+    def test_query_syntax_is_dropped(self):
+        self.assertEqual(fulltext.tokenize('"Furnished" AND room* -near: (DHA)'), ['furnished', 'and', 'room', 'near', 'dha'])
+
+    def test_no_terms(self):
+        for text in ('', None, '-', '"', '!!', '*:()'):
+            with self.subTest(text=text):
+                self.assertEqual(fulltext.tokenize(text), [])
+
+    def test_page_numbers(self):
+        for value, expected in (('3', 3), (1, 1), ('0', 1), ('-2', 1), ('abc', 1), ('²', 1),
+                                (str(fulltext.MAX_PAGE_NUMBER), fulltext.MAX_PAGE_NUMBER),
+                                (str(fulltext.MAX_PAGE_NUMBER + 1), 1), ('99999999999999999999', 1)):
+            with self.subTest(value=value):
+                self.assertEqual(fulltext.page_number(value), expected)
+
+    def test_unicode_words(self):
+        self.assertEqual(fulltext.tokenize('CAFÉ near لاہور, snake_case'), ['café', 'near', 'لاہور', 'snake_case'])
+
+    def test_terms_are_capped(self):
+        self.assertEqual(len(fulltext.tokenize(' '.join(['word'] * 20))), fulltext.MAX_QUERY_TERMS)
+
+
+class SearchPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.title_match = _listing('Furnished studio', description='Quiet street.')
+        cls.description_match = _listing('Quiet room', description='Comes furnished with a desk.')
+        cls.other = _listing('Shared house', description='Near the park.')
+
+    def test_title_matches_rank_first(self):
+        page = fulltext.search_page(Accommodation.objects.all(), 'furnished')
+        self.assertEqual([a.pk for a in page], [self.title_match.pk, self.description_match.pk])
+
+    def test_last_term_is_a_prefix(self):
+        page = fulltext.search_page(Accommodation.objects.all(), 'furn')
+        self.assertEqual(len(page), 2)
+
+    def test_every_term_must_match(self):
+        page = fulltext.search_page(Accommodation.objects.all(), 'furnished desk')
+        self.assertEqual([a.pk for a in page], [self.description_match.pk])
+
+    def test_no_terms_is_an_empty_page(self):
+        for text in ('-', '"', '!!'):
+            with self.subTest(text=text):
+                page = fulltext.search_page(Accommodation.objects.all(), text)
+                self.assertEqual((list(page), page.has_next), ([], False))
+
+    def test_query_operators_are_plain_words(self):
+        listing = _listing('AND OR NOT room')
+        for text in ('and', 'not room', 'room OR', 'NOT(room)', 'room*', '"or"'):
+            with self.subTest(text=text):
+                self.assertIn(listing, fulltext.search_page(Accommodation.objects.all(), text))
+
+    def test_accents_case_and_other_scripts(self):
+        cafe = _listing('Café near campus')
+        hostel = _listing('لاہور hostel')
+        for text, expected in (('cafe', cafe), ('CAFÉ', cafe), ('لاہور', hostel)):
+            with self.subTest(text=text):
+                self.assertEqual(list(fulltext.search_page(Accommodation.objects.all(), text)), [expected])
+
+    def test_location_and_address_are_searched(self):
+        listing = _listing('Flat', location='Gulberg', address='12 Canal View')
+        for text in ('gulb', 'canal view'):
+            with self.subTest(text=text):
+                self.assertEqual(list(fulltext.search_page(Accommodation.objects.all(), text)), [listing])
+
+    def test_pages_follow_the_ranking(self):
+        for number in range(5):
+            _listing(f'Paged flat {number}')
+        ranked = fulltext.search_page(Accommodation.objects.all(), 'paged', page_size=10)
+        first = fulltext.search_page(Accommodation.objects.all(), 'paged', page_size=3)
+        second = fulltext.search_page(Accommodation.objects.all(), 'paged', page=2, page_size=3)
+        self.assertEqual((first.has_next, second.has_next, second.has_previous), (True, False, True))
+        self.assertEqual(list(first) + list(second), list(ranked))
+
+    def test_index_follows_saves_and_deletes(self):
+        self.other.title = 'Furnished house'
+        self.other.save()
+        self.assertEqual(len(fulltext.search_page(Accommodation.objects.all(), 'furnished')), 3)
+        self.other.delete()
+        self.assertEqual(len(fulltext.search_page(Accommodation.objects.all(), 'furnished')), 2)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class SearchRequestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = benchmarks.seed(accommodations=5, applications=0)
+
+    def setUp(self):
+        self.client.force_login(self.dataset.user)
+
+    def test_punctuation_only_keywords(self):
+        for q in ('-', '"', '!!'):
+            with self.subTest(q=q):
+                self.assertEqual(self.client.get('/accommodations/', {'q': q}).status_code, 200)
+                response = self.client.get('/api/search/', {'q': q})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_huge_page_numbers(self):
+        params = {'q': 'room', 'page': '99999999999999999999'}
+        self.assertEqual(self.client.get('/accommodations/', params).status_code, 200)
+        response = self.client.get('/api/search/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['page'], 1)
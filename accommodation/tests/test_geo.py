@@ -0,0 +1,169 @@
+import math
+import random
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from accommodation import benchmarks, geo
+from accommodation.models import Accommodation
+
+
+def _distance_km(center, point):
+    """The equirectangular distance geo uses, in plain Python"""
+    dlat = point[0] - center[0]
+    dlon = (point[1] - center[1]) * math.cos(math.radians(center[0]))
+    return math.hypot(dlat, dlon) * geo.KM_PER_DEGREE
+
+
+class GeohashTests(SimpleTestCase):
+
+    def test_encode(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744), 'u4pruydqq')
+        self.assertEqual(geo.encode(-90, -180, precision=3), '000')
+
+    def test_covering_cells_contain_the_whole_bounding_box(self):
+        rng = random.Random(7)
+        centres = ((31.5204, 74.3587), (0.001, -0.001), (-33.9, 18.4), (64.1, -21.9), (10.0, 179.995))
+        for (latitude, longitude), radius in ((centre, radius) for centre in centres for radius in geo.RADIUS_CHOICES):
+            prefixes = geo.covering_prefixes(latitude, longitude, radius)
+            with self.subTest(centre=(latitude, longitude), radius=radius):
+                self.assertTrue(0 < len(prefixes) <= geo.MAX_COVERING_CELLS)
+                lat_degrees, lon_degrees = geo.radius_degrees(latitude, radius)
+                for _ in range(200):
+                    lat = latitude + rng.uniform(-lat_degrees, lat_degrees)
+                    # Points past the antimeridian wrap around
+                    lon = (longitude + rng.uniform(-lon_degrees, lon_degrees) + 180) % 360 - 180
+                    self.assertTrue(geo.encode(lat, lon).startswith(tuple(prefixes)), (lat, lon))
+
+    def test_circles_around_a_pole_span_every_longitude(self):
+        self.assertEqual(geo.radius_degrees(89.99, 50)[1], 180)
+        self.assertEqual(geo.covering_prefixes(89.99, 0, 50), [])
+
+
+class RadiusSearchTests(TestCase):
+    centres = ((31.5204, 74.3587), (0.01, 0.01), (-33.9249, 18.4241))
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(24)
+        cls.points = {}
+        template = benchmarks.seed(accommodations=1, applications=0)
+        listing = Accommodation.objects.get(pk=template.accommodation_id)
+        for centre in cls.centres:
+            for _ in range(60):
+                point = (centre[0] + rng.uniform(-0.6, 0.6), centre[1] + rng.uniform(-0.6, 0.6))
+                listing.pk = None
+                listing._state.adding = True
+                listing.save()
+                Accommodation.objects.filter(pk=listing.pk).update(
+                    latitude=point[0], longitude=point[1], geohash=geo.encode(*point),
+                )
+                cls.points[listing.pk] = point
+        Accommodation.objects.exclude(pk__in=cls.points).delete()
+
+    def test_matches_a_brute_force_search(self):
+        for centre in self.centres:
+            for radius in geo.RADIUS_CHOICES:
+                with self.subTest(centre=centre, radius=radius):
+                    found = set(geo.filter_within(Accommodation.objects.all(), *centre, radius).values_list('pk', flat=True))
+                    expected = {pk for pk, point in self.points.items() if _distance_km(centre, point) <= radius}
+                    self.assertEqual(found, expected)
+
+    def test_circle_around_a_pole(self):
+        pks = list(self.points)[:2]
+        for pk, point in zip(pks, ((89.8, 170.0), (89.8, -10.0))):
+            Accommodation.objects.filter(pk=pk).update(latitude=point[0], longitude=point[1], geohash=geo.encode(*point))
+        found = geo.filter_within(Accommodation.objects.all(), 89.99, 0.0, 50)
+        self.assertEqual(set(found.values_list('pk', flat=True)), set(pks))
+
+    def test_listings_without_coordinates_are_never_near(self):
+        pk = next(iter(self.points))
+        Accommodation.objects.filter(pk=pk).update(latitude=None, longitude=None, geohash='')
+        found = geo.filter_within(Accommodation.objects.all(), *self.points[pk], 50)
+        self.assertNotIn(pk, set(found.values_list('pk', flat=True)))
+
+    def test_nearest_page_orders_by_distance(self):
+        centre = self.centres[0]
+        nearby = geo.filter_within(Accommodation.objects.all(), *centre, 25)
+        page = geo.nearest_page(nearby, *centre, page_size=10)
+        distances = [listing.distance_km for listing in page]
+        self.assertEqual(distances, sorted(distances))
+        self.assertAlmostEqual(distances[0], min(
+            _distance_km(centre, point) for pk, point in self.points.items() if _distance_km(centre, point) <= 25
+        ), places=6)
+
+
+class GeocodeTests(TestCase):
+
+    def test_most_specific_place_wins(self):
+        self.assertEqual(geo.geocode('Near LUMS, DHA', 'Lahore'), (31.4706, 74.4098))
+        self.assertEqual(geo.geocode('Gulberg III', 'Lahore'), (31.51, 74.344))
+        self.assertEqual(geo.geocode('Lahore'), (31.5204, 74.3587))
+
+    def test_ambiguous_areas_need_their_city(self):
+        self.assertEqual(geo.geocode('DHA Phase 5', 'Karachi'), (24.8, 67.065))
+        self.assertIsNone(geo.geocode('DHA Phase 5'))
+        self.assertIsNone(geo.geocode('Atlantis'))
+
+    def test_resolve_coordinates(self):
+        self.assertEqual(geo.resolve(' 31.5, 74.35 '), (31.5, 74.35))
+        for near in ('91,0', '0,181', '31.5', '', 'Atlantis'):
+            with self.subTest(near=near):
+                self.assertIsNone(geo.resolve(near))
+
+
+class GeocodeListingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = benchmarks.seed(accommodations=3, applications=0)
+
+    def setUp(self):
+        self.accommodation = Accommodation.objects.get(pk=self.dataset.accommodation_id)
+
+    def test_saving_the_location_moves_the_listing(self):
+        changes = (('location', 'Karachi', (24.8607, 67.0011)), ('location', 'Lahore', (31.5204, 74.3587)),
+                   ('address', 'Gulberg III', (31.51, 74.344)))
+        for field, value, point in changes:
+            with self.subTest(field=field, value=value):
+                listing = Accommodation.objects.only('pk', field).get(pk=self.accommodation.pk)
+                setattr(listing, field, value)
+                listing.save(update_fields=[field])
+                self.assertEqual(
+                    Accommodation.objects.values_list('latitude', 'longitude', 'geohash').get(pk=listing.pk),
+                    (*point, geo.encode(*point)),
+                )
+
+    def test_other_saves_leave_the_place_alone(self):
+        Accommodation.objects.filter(pk=self.accommodation.pk).update(latitude=1.0, longitude=2.0, geohash='s00')
+        listing = Accommodation.objects.get(pk=self.accommodation.pk)
+        listing.title = 'Renamed'
+        listing.save(update_fields=['title'])
+        self.assertEqual(Accommodation.objects.get(pk=listing.pk).geohash, 's00')
+
+    def test_geocoding_changes_the_api_validators(self):
+        self.client.force_login(self.dataset.user)
+        Accommodation.objects.update(latitude=None, longitude=None, geohash='')
+        for url in (f'/api/v1/accommodations/{self.accommodation.pk}/', '/api/v1/accommodations/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                geo.geocode_accommodations(missing_only=True)
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, 200)
+                Accommodation.objects.update(latitude=None, longitude=None, geohash='')
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class NearRequestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = benchmarks.seed(accommodations=40, applications=0)
+
+    def test_listing_page_and_api_stay_within_the_radius(self):
+        self.client.force_login(self.dataset.user)
+        centre = geo.resolve('Lahore')
+        response = self.client.get('/accommodations/', {'near': 'Lahore', 'radius': 10, 'sort': 'distance'})
+        listings = list(response.context['accommodations'])
+        self.assertTrue(listings)
+        for listing in listings:
+            self.assertLessEqual(_distance_km(centre, (listing.latitude, listing.longitude)), 10)
+        response = self.client.get('/api/v1/accommodations/', {'near': 'Lahore', 'radius': 10})
+        self.assertEqual({row['location'] for row in response.json()['results']}, {'Lahore'})
@@ -0,0 +1,170 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accommodation import benchmarks, jobs, tasks
+from accommodation.models import Accommodation, Application, ContactMessage, Job
+
+
+@override_settings(JOB_MAX_ATTEMPTS=3, JOB_RETRY_BACKOFF=10, JOB_LOCK_TIMEOUT=600)
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.failures = 0
+        registry = {'test.record': self.record, 'test.flaky': self.flaky}
+        patcher = mock.patch.dict(jobs._registry, registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def record(self, **payload):
+        self.calls.append(payload)
+
+    def flaky(self, **payload):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError('SMTP unavailable')
+        self.calls.append(payload)
+
+    def test_run_pending_runs_the_handler(self):
+        job = jobs.enqueue('test.record', {'application_id': 7})
+        self.assertEqual(jobs.run_pending('worker-a'), (1, 0))
+        self.assertEqual(self.calls, [{'application_id': 7}])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_at), (Job.DONE, 1, None))
+        self.assertEqual(jobs.run_pending('worker-a'), (0, 0))
+
+    def test_unknown_tasks_are_refused(self):
+        with self.assertRaises(jobs.UnknownTask):
+            jobs.enqueue('test.missing')
+
+    def test_idempotency_key_queues_once(self):
+        first = jobs.enqueue('test.record', {'n': 1}, idempotency_key='application:7:submitted')
+        second = jobs.enqueue('test.record', {'n': 2}, idempotency_key='application:7:submitted')
+        self.assertEqual(first.pk, second.pk)
+        jobs.enqueue_many([
+            ('test.record', {'n': 3}, 'application:7:submitted'),
+            ('test.record', {'n': 4}, 'application:8:submitted'),
+        ])
+        self.assertEqual(sorted(Job.objects.values_list('payload__n', flat=True)), [1, 4])
+
+    def test_rolled_back_writes_queue_nothing(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            jobs.enqueue('test.record', idempotency_key='rolled-back')
+            raise RuntimeError
+        self.assertFalse(Job.objects.exists())
+
+    def test_a_claimed_job_is_not_claimed_again(self):
+        job = jobs.enqueue('test.record')
+        self.assertEqual(jobs.claim('worker-a'), [job])
+        self.assertEqual(jobs.claim('worker-b'), [])
+        self.assertEqual(Job.objects.get().locked_by, 'worker-a')
+
+    def test_claim_loses_to_a_concurrent_worker(self):
+        job = jobs.enqueue('test.record')
+        filter_jobs = Job.objects.filter
+
+        def claimed_meanwhile(*args, **kwargs):
+            # Another worker claims the job between the read and the UPDATE
+            if 'locked_at' in kwargs:
+                Job.objects.filter(pk=job.pk).update(status=Job.RUNNING, locked_at=timezone.now())
+            return filter_jobs(*args, **kwargs)
+
+        with mock.patch.object(Job.objects, 'filter', side_effect=claimed_meanwhile):
+            self.assertEqual(jobs.claim('worker-a'), [])
+
+    def test_jobs_of_a_dead_worker_are_reclaimed(self):
+        job = jobs.enqueue('test.record')
+        jobs.claim('worker-a')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(seconds=601))
+        self.assertEqual(jobs.claim('worker-b'), [job])
+        job.refresh_from_db()
+        self.assertEqual((job.locked_by, job.attempts), ('worker-b', 2))
+
+    def test_failures_are_retried_with_backoff(self):
+        self.failures = 1
+        job = jobs.enqueue('test.flaky', {'n': 1})
+        started = timezone.now()
+        with self.assertLogs('accommodation.jobs', 'WARNING'):
+            self.assertEqual(jobs.run_pending('worker-a'), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), (Job.QUEUED, 1, ''))
+        self.assertIn('SMTP unavailable', job.last_error)
+        self.assertGreaterEqual(job.run_at, started + timedelta(seconds=10))
+        # Not due until the backoff has passed
+        self.assertEqual(jobs.run_pending('worker-a'), (0, 0))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.assertEqual(jobs.run_pending('worker-a'), (1, 0))
+        self.assertEqual(self.calls, [{'n': 1}])
+
+    def test_gives_up_after_max_attempts(self):
+        self.failures = 3
+        job = jobs.enqueue('test.flaky')
+        with self.assertLogs('accommodation.jobs', 'WARNING') as logs:
+            for _ in range(3):
+                Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+                self.assertEqual(jobs.run_pending('worker-a'), (0, 1))
+        self.assertIn('failed permanently after 3 attempts', logs.output[-1])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 3))
+        self.assertEqual(self.calls, [])
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        for attempts, delay in ((1, 10), (2, 20), (4, 80), (20, jobs.MAX_BACKOFF)):
+            with self.subTest(attempts=attempts):
+                self.assertTrue(delay <= jobs.backoff(attempts) <= delay * 1.1)
+
+    def test_purge_keeps_recent_and_unfinished_jobs(self):
+        old, recent, failed = (jobs.enqueue('test.record') for _ in range(3))
+        Job.objects.filter(pk__in=[old.pk, recent.pk]).update(status=Job.DONE)
+        Job.objects.filter(pk=failed.pk).update(status=Job.FAILED)
+        Job.objects.filter(pk__in=[old.pk, failed.pk]).update(updated_at=timezone.now() - timedelta(days=8))
+        self.assertEqual(jobs.purge(7), 1)
+        self.assertFalse(Job.objects.filter(pk=old.pk).exists())
+
+    def test_run_jobs_burst(self):
+        jobs.enqueue('test.record', {'n': 1})
+        jobs.enqueue('test.record', {'n': 2})
+        output = io.StringIO()
+        # The worker also warns that the test cache is private to the process
+        with self.assertLogs('accommodation.cache', 'WARNING'):
+            call_command('run_jobs', '--burst', stdout=output)
+        self.assertIn('Ran 2 job(s): 2 succeeded, 0 failed.', output.getvalue())
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 2)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class NotificationTransactionTests(TestCase):
+    """Requests write their rows and queue the notification jobs atomically"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = benchmarks.seed(accommodations=2, applications=0)
+
+    def test_application_is_queued_with_its_notification(self):
+        self.client.force_login(self.dataset.user)
+        url = reverse('apply_accommodation', args=[self.dataset.accommodation_id])
+        data = {'user_name': 'Seed', 'user_email': 'seed@example.invalid', 'user_phone': '03001234567', 'message': 'Hi'}
+        with mock.patch.object(jobs, 'enqueue', side_effect=DatabaseError), self.assertRaises(DatabaseError):
+            with self.assertLogs('django.request', 'ERROR'):
+                self.client.post(url, data)
+        self.assertFalse(Application.objects.exists())
+        self.assertEqual(Accommodation.objects.get(pk=self.dataset.accommodation_id).pending_applications, 0)
+
+        self.client.post(url, data)
+        application = Application.objects.get()
+        self.assertTrue(Job.objects.filter(name=tasks.APPLICATION_SUBMITTED, payload={'application_id': application.pk}))
+
+    def test_contact_message_is_queued_with_its_notification(self):
+        data = {'name': 'Ann', 'email': 'ann@example.invalid', 'subject': 'Hi', 'message': 'Hello'}
+        with mock.patch.object(jobs, 'enqueue', side_effect=DatabaseError), self.assertRaises(DatabaseError):
+            with self.assertLogs('django.request', 'ERROR'):
+                self.client.post(reverse('contact'), data)
+        self.assertFalse(ContactMessage.objects.exists())
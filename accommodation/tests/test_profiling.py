@@ -0,0 +1,81 @@
+import logging
+import threading
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from accommodation import benchmarks, profiling
+
+
+class RequestProfileTests(SimpleTestCase):
+
+    def test_concurrent_queries_are_all_counted(self):
+        profile = profiling.RequestProfile()
+
+        def record():
+            for _ in range(2000):
+                profile.add('SELECT 1', 0.001)
+
+        threads = [threading.Thread(target=record) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(profile.queries, 16000)
+        self.assertEqual(profile.statements['SELECT 1'], 16000)
+        self.assertAlmostEqual(profile.db_time, 16.0)
+        self.assertEqual(profile.duplicates(), [('SELECT 1', 16000)])
+
+    def test_percentiles(self):
+        values = list(range(1, 101))
+        self.assertEqual(profiling.percentiles(values), {'p50': 51, 'p95': 96, 'p99': 100, 'max': 100})
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class QueryProfilerMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = benchmarks.seed(accommodations=5, applications=5)
+
+    def setUp(self):
+        profiling.reset_stats()
+        self.addCleanup(profiling.reset_stats)
+
+    def test_requests_are_recorded_per_url_name(self):
+        self.client.force_login(self.dataset.admin)
+        response = self.client.get(reverse('accommodations'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", app;dur=[\d.]+, total;dur=')
+        self.client.get(reverse('accommodations'))
+
+        stats = self.client.get(reverse('query_stats')).json()
+        self.assertEqual(stats['accommodations']['requests'], 2)
+        self.assertEqual(stats['accommodations']['window'], 2)
+        self.assertGreater(stats['accommodations']['queries']['max'], 0)
+        self.assertEqual(sum(stats['accommodations']['histogram'].values()), 2)
+
+        self.client.post(reverse('query_stats'))
+        self.assertNotIn('accommodations', profiling.profiler_stats())
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_can_be_turned_off(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('about')))
+        self.assertEqual(profiling.profiler_stats()['about']['requests'], 1)
+
+    def test_slow_queries_are_logged(self):
+        with self.settings(SLOW_QUERY_MS=0), self.assertLogs('accommodation.slow_queries', 'WARNING') as logs:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 42')
+        self.assertIn('SELECT 42', logs.output[0])
+        self.assertGreaterEqual(logs.records[0].duration_ms, 0)
+
+    def test_slow_query_logger_is_configured(self):
+        logger = logging.getLogger('accommodation.slow_queries')
+        self.assertFalse(logger.propagate)
+        self.assertTrue(logger.handlers)
+        self.assertEqual(logger.level, logging.WARNING)
+
+    def test_fast_queries_are_not_logged(self):
+        with self.assertNoLogs('accommodation.slow_queries'):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 42')
@@ -0,0 +1,97 @@
+from asgiref.sync import async_to_sync
+from django.core.cache import cache as django_cache
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accommodation import async_views, benchmarks, counters
+
+
+# The manifest only exists after collectstatic. Budgets include the session
+# read, which cached_db makes on an empty cache and signed cookies never make.
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+)
+class QueryCountTests(TestCase):
+    """
+    Every route runs a fixed number of queries, whatever the size of the
+    data. A failure here means a view or template started issuing more (or
+    fewer) queries: fix the N+1, or update QUERY_BUDGETS if the change is
+    intended.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = benchmarks.seed(accommodations=30, applications=90)
+
+    def setUp(self):
+        django_cache.clear()
+        self.clients = benchmarks.Clients()
+
+    def assertWithinBudgets(self, dataset):
+        for route in benchmarks.route_requests(dataset):
+            with self.subTest(route=route.name):
+                client = self.clients[route.user]
+                django_cache.clear()
+                with self.assertNumQueries(benchmarks.QUERY_BUDGETS.get(route.name, -1)):
+                    response = benchmarks.consume(client.get(route.path))
+                self.assertLess(response.status_code, 400, route.path)
+
+    def test_every_route_has_a_budget(self):
+        routes = {route.name for route in benchmarks.route_requests(self.dataset)}
+        self.assertEqual(routes, set(benchmarks.QUERY_BUDGETS))
+
+    def test_query_counts(self):
+        self.assertWithinBudgets(self.dataset)
+
+    def test_query_counts_do_not_grow_with_the_data(self):
+        larger = benchmarks.seed(accommodations=120, applications=600, random_seed=1)
+        self.assertWithinBudgets(larger)
+
+    def test_seeded_counters_are_consistent(self):
+        self.assertEqual(counters.reconcile(dry_run=True), {'user': 0, 'accommodation': 0})
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class AdminDashboardCacheTests(TestCase):
+    """A warm admin dashboard only queries the paginated sections"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = benchmarks.seed(accommodations=10, applications=10)
+
+    def setUp(self):
+        django_cache.clear()
+        self.client.force_login(self.dataset.admin)
+
+    def users_queries(self, queries):
+        return [query['sql'] for query in queries if 'ORDER BY "accommodation_user"."date_joined" DESC' in query['sql']]
+
+    def test_warm_dashboard_skips_the_users_query(self):
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(len(self.users_queries(cold)), 1)
+        # Session, admin user, recent accommodations and applications
+        with self.assertNumQueries(4) as warm:
+            response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(self.users_queries(warm), [])
+        self.assertContains(response, self.dataset.user.email)
+
+    @override_settings(ASYNC_CONCURRENT_QUERIES=False)
+    def test_warm_async_dashboard_skips_the_users_query(self):
+        request = AsyncRequestFactory().get(reverse('admin_dashboard'))
+
+        async def auser():
+            return self.dataset.admin
+
+        request.auser = auser
+        view = async_to_sync(async_views.admin_dashboard)
+        with CaptureQueriesContext(connection) as cold:
+            view(request)
+        self.assertEqual(len(self.users_queries(cold)), 1)
+        with self.assertNumQueries(2) as warm:
+            response = view(request)
+        self.assertEqual(self.users_queries(warm), [])
+        self.assertIn(self.dataset.user.email, response.content.decode())
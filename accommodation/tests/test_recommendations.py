@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+
+from accommodation import benchmarks, recommendations
+from accommodation.models import Accommodation, Application
+
+NOW = datetime(2026, 6, 1, tzinfo=dt_timezone.utc)
+
+
+def _row(pk, kind='Room', religion='Any', location='Lahore', price=20000, status='Available', age_days=10):
+    return (pk, kind, religion, location, Decimal(price), status, NOW - timedelta(days=age_days))
+
+
+class FeatureIndexTests(SimpleTestCase):
+
+    def index(self, *rows):
+        index = recommendations.FeatureIndex()
+        index.upsert(rows)
+        return index
+
+    def top(self, index, religion='', applied=(), count=10):
+        return [pk for pk, _ in index.top(religion, list(applied), count=count, now=NOW)]
+
+    def test_without_history_newest_available_first(self):
+        index = self.index(_row(1, age_days=30), _row(2, age_days=1), _row(3, age_days=5), _row(4, status='Occupied'))
+        self.assertEqual(self.top(index), [2, 3, 1])
+        self.assertEqual(self.top(index, count=2), [2, 3])
+        self.assertEqual(self.top(index, count=0), [])
+
+    def test_religious_preference(self):
+        index = self.index(_row(1, religion='Muslim'), _row(2, religion='Hindu'), _row(3, religion='Any'))
+        self.assertEqual(set(self.top(index, 'Muslim')), {1, 3})
+        self.assertEqual(set(self.top(index, 'Any')), {1, 2, 3})
+        self.assertEqual(set(self.top(index, '')), {1, 2, 3})
+
+    def test_history_favours_type_location_and_price(self):
+        index = self.index(
+            _row(1, kind='Studio', location='Karachi', price=15000),
+            _row(2, kind='Studio', location=' karachi ', price=16000, age_days=40),
+            _row(3, kind='House', location='Lahore', price=90000, age_days=0),
+            _row(4, kind='Studio', location='Karachi', price=80000, age_days=40),
+        )
+        ranked = self.top(index, applied=[1])
+        # The applied listing itself is left out
+        self.assertEqual(ranked[:2], [2, 4])
+        self.assertEqual(ranked[-1], 3)
+
+    def test_updates_and_removals(self):
+        index = self.index(_row(1), _row(2, age_days=1))
+        index.upsert([_row(2, status='Occupied')])
+        self.assertEqual(self.top(index), [1])
+        index.remove(1)
+        self.assertEqual(self.top(index), [])
+        self.assertEqual(len(index), 1)
+
+    def test_no_candidates(self):
+        self.assertEqual(self.top(self.index()), [])
+        self.assertEqual(self.top(self.index(_row(1)), applied=[1]), [])
+
+
+class RecommendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = benchmarks.seed(accommodations=30, applications=0, users=1)
+
+    def test_recommendations_exclude_applied_listings_at_once(self):
+        user = self.dataset.user
+        first = recommendations.recommend(user)
+        self.assertTrue(first)
+        for listing in first:
+            self.assertEqual(listing.status, 'Available')
+            self.assertIn(listing.religious_preference, (user.religious_preference, 'Any'))
+        Application.objects.create(
+            accommodation=first[0], user=user, user_name='Seed', user_email='seed@example.invalid',
+            user_phone='03001234567', message='Hello',
+        )
+        user.refresh_from_db()
+        self.assertNotIn(first[0], recommendations.recommend(user))
+
+    def test_sync_follows_other_workers(self):
+        index = recommendations.FeatureIndex()
+        index.sync()
+        self.assertEqual(len(index), Accommodation.objects.count())
+        listing = Accommodation.objects.filter(status='Available').first()
+
+        # Writes that bypass this index's signals, as in another worker
+        Accommodation.objects.filter(pk=listing.pk).update(status='Occupied', updated_at=NOW.replace(year=2099))
+        Accommodation.objects.exclude(pk=listing.pk).first().delete()
+        index.sync()
+        self.assertEqual(len(index), Accommodation.objects.count())
+        self.assertNotIn(listing.pk, [pk for pk, _ in index.top('', [], count=100)])
+
+    def test_sync_finds_deletions_hidden_by_inserts(self):
+        index = recommendations.FeatureIndex()
+        index.sync()
+        deleted = Accommodation.objects.filter(status='Available').first()
+        late = Accommodation.objects.get(pk=deleted.pk)
+        deleted.delete()
+        # A listing committed late, with an updated_at before the last sync:
+        # the row count is back where the index left it
+        late.pk = None
+        late._state.adding = True
+        late.save()
+        Accommodation.objects.filter(pk=late.pk).update(updated_at=NOW.replace(year=2000))
+        index.sync()
+        ranked = [pk for pk, _ in index.top('', [], count=100)]
+        self.assertNotIn(deleted.pk, ranked)
+        self.assertIn(late.pk, ranked)
+        self.assertEqual(len(index), Accommodation.objects.count())
@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+
+from accommodation import benchmarks
+from accommodation.models import Accommodation
+from accommodation.search import ListingQuery
+
+
+class ListingQueryParamsTests(TestCase):
+    """Range filters ignore values they cannot use instead of failing"""
+
+    def query(self, querystring):
+        return ListingQuery.from_params(QueryDict(querystring))
+
+    def test_valid_ranges(self):
+        query = self.query('min_price=100&max_price=2500.50&min_bedrooms=2&min_bathrooms=1.5')
+        self.assertEqual(query.min_price, Decimal('100'))
+        self.assertEqual(query.max_price, Decimal('2500.50'))
+        self.assertEqual(query.min_bedrooms, 2)
+        self.assertEqual(query.min_bathrooms, Decimal('1.5'))
+
+    def test_huge_exponents_are_ignored(self):
+        query = self.query('min_bedrooms=1e99999999&min_price=1e99999999&max_price=9e999&min_bathrooms=1e50')
+        self.assertEqual(
+            (query.min_bedrooms, query.min_price, query.max_price, query.min_bathrooms), (None, None, None, None),
+        )
+
+    def test_invalid_values_are_ignored(self):
+        for value in ('-1', 'NaN', 'Infinity', 'abc', '2.5', '1' * 40):
+            with self.subTest(value=value):
+                self.assertIsNone(self.query(f'min_bedrooms={value}').min_bedrooms)
+        for value in ('-1', 'NaN', 'sNaN', '-Infinity', '100000000'):
+            with self.subTest(value=value):
+                self.assertIsNone(self.query(f'min_price={value}').min_price)
+
+    def test_radius_is_one_of_the_choices(self):
+        self.assertEqual(self.query('near=Lahore&radius=10').radius, 10)
+        self.assertEqual(self.query('near=Lahore&radius=7').radius, 5)
+        self.assertEqual(self.query('near=Lahore&radius=1e99999999').radius, 5)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class ListingFilterRequestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = benchmarks.seed(accommodations=10, applications=0)
+
+    def test_out_of_range_filters_do_not_fail(self):
+        self.client.force_login(self.dataset.user)
+        for path in ('/accommodations/', '/api/v1/accommodations/'):
+            with self.subTest(path=path):
+                response = self.client.get(path, {'min_bedrooms': '1e99999999', 'max_price': '1e400'})
+                self.assertEqual(response.status_code, 200)
+
+
+class LocationSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = benchmarks.seed(accommodations=3, applications=0)
+        cls.listing = Accommodation.objects.get(pk=cls.dataset.accommodation_id)
+        Accommodation.objects.filter(pk=cls.listing.pk).update(location='Karachi', address='12 Zamzama Lane, DHA')
+        Accommodation.objects.exclude(pk=cls.listing.pk).update(location='Lahore', address='1 Mall Road')
+
+    def matches(self, location):
+        return list(ListingQuery(location=location).queryset().values_list('pk', flat=True))
+
+    def test_terms_match_anywhere_in_location_or_address(self):
+        for term in ('karachi', 'rach', 'zamzama', 'DH', 'mz'):
+            with self.subTest(term=term):
+                self.assertEqual(self.matches(term), [self.listing.pk])
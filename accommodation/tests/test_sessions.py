@@ -0,0 +1,99 @@
+import io
+import os
+import runpy
+from datetime import timedelta
+from unittest import mock
+
+import environ
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accommodation import sessions
+from harmony_housing import settings as settings_module
+
+
+class DeleteExpiredTests(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        for n in range(5):
+            Session.objects.create(session_key=f'expired{n}', session_data='', expire_date=self.now - timedelta(hours=n + 1))
+        Session.objects.create(session_key='expiring', session_data='', expire_date=self.now)
+        Session.objects.create(session_key='live', session_data='', expire_date=self.now + timedelta(days=1))
+
+    def test_deletes_in_batches(self):
+        with mock.patch.object(sessions.time, 'sleep') as sleep:
+            deleted = sessions.delete_expired(batch_size=2, pause=0.5, now=self.now)
+        self.assertEqual(deleted, 5)
+        # Three batches of at most two rows, each followed by a pause
+        self.assertEqual(sleep.call_args_list, [mock.call(0.5)] * 3)
+        self.assertEqual(sorted(Session.objects.values_list('pk', flat=True)), ['expiring', 'live'])
+        self.assertEqual(sessions.delete_expired(now=self.now), 0)
+
+    def test_command(self):
+        output = io.StringIO()
+        call_command('clear_expired_sessions', '--batch-size', '3', stdout=output)
+        self.assertIn('Deleted 6 expired sessions.', output.getvalue())
+        self.assertEqual(list(Session.objects.values_list('pk', flat=True)), ['live'])
+
+
+class StorageSettingsTests(SimpleTestCase):
+    """SESSION_STORAGE and MESSAGE_STORAGE, read when the settings module loads"""
+
+    def load(self, **variables):
+        # Without the developer's .env, which could set any of these
+        with mock.patch.dict(os.environ, variables), mock.patch.object(environ.Env, 'read_env'):
+            for name in ('CACHE_URL', 'SESSION_STORAGE', 'MESSAGE_STORAGE'):
+                if name not in variables:
+                    os.environ.pop(name, None)
+            return runpy.run_path(settings_module.__file__)
+
+    def test_session_storage_follows_the_cache(self):
+        self.assertEqual(self.load()['SESSION_ENGINE'], 'django.contrib.sessions.backends.db')
+        shared = self.load(CACHE_URL='redis://cache.internal:6379/1')
+        self.assertEqual(shared['SESSION_ENGINE'], 'django.contrib.sessions.backends.cached_db')
+        self.assertEqual(
+            self.load(SESSION_STORAGE='signed_cookies')['SESSION_ENGINE'],
+            'django.contrib.sessions.backends.signed_cookies',
+        )
+
+    def test_cached_db_needs_a_shared_cache(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, 'needs a cache shared by every worker'):
+            self.load(SESSION_STORAGE='cached_db')
+
+    def test_message_storage(self):
+        self.assertEqual(self.load()['MESSAGE_STORAGE'], 'django.contrib.messages.storage.cookie.CookieStorage')
+        self.assertEqual(
+            self.load(MESSAGE_STORAGE='session')['MESSAGE_STORAGE'],
+            'django.contrib.messages.storage.session.SessionStorage',
+        )
+
+    def test_unknown_values_are_refused(self):
+        for name in ('SESSION_STORAGE', 'MESSAGE_STORAGE'):
+            with self.subTest(name=name), self.assertRaisesMessage(ImproperlyConfigured, f"{name} must be one of"):
+                self.load(**{name: 'memcache'})
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    SESSION_ENGINE='django.contrib.sessions.backends.db',
+)
+class MessageStorageTests(TestCase):
+    contact = {'name': 'Ann', 'email': 'ann@example.com', 'subject': 'Hi', 'message': 'Hello'}
+
+    def test_cookie_messages_leave_the_session_alone(self):
+        response = self.client.post(reverse('contact'), self.contact)
+        self.assertIn('messages', response.cookies)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertFalse(Session.objects.exists())
+        self.assertContains(self.client.get(reverse('contact')), 'Thank you for contacting us!')
+
+    @override_settings(MESSAGE_STORAGE='django.contrib.messages.storage.session.SessionStorage')
+    def test_session_messages_write_the_session(self):
+        self.client.post(reverse('contact'), self.contact)
+        self.assertTrue(Session.objects.exists())
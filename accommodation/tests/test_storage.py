@@ -0,0 +1,65 @@
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, override_settings
+
+from accommodation import images
+from accommodation.storage import SupabaseStorage
+
+from .supabase_stub import StubSupabaseClient
+
+STUB_URL = 'https://stub.supabase.co'
+
+
+@override_settings(
+    IMAGE_STORAGE='accommodation.storage.SupabaseStorage', SUPABASE_STORAGE_BUCKET='photos', IMAGE_CACHE_MAX_AGE=600,
+)
+class SupabaseStorageTests(SimpleTestCase):
+
+    def setUp(self):
+        client = StubSupabaseClient(STUB_URL)
+        patcher = mock.patch('accommodation.storage.get_supabase_service_client', return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.storage = SupabaseStorage()
+        self.bucket = client.storage.from_('photos')
+
+    def test_upload(self):
+        name = self.storage.save('images/ab/abc.jpg', ContentFile(b'jpeg bytes'))
+        self.assertEqual(name, 'images/ab/abc.jpg')
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.storage.size(name), 10)
+        with self.storage.open(name) as stored:
+            self.assertEqual(stored.read(), b'jpeg bytes')
+        metadata = self.bucket.files[name]['metadata']
+        self.assertEqual((metadata['mimetype'], metadata['cacheControl']), ('image/jpeg', 'max-age=600'))
+
+    def test_reupload_of_a_content_addressed_name(self):
+        _, name = images._hashed_name(images.ORIGINALS_DIR, b'png bytes', 'png')
+        self.assertEqual(images._store(name, b'png bytes'), name)
+        self.assertEqual(images._store(name, b'png bytes'), name)
+        self.assertEqual(self.bucket.uploads, [name])
+        # Two workers storing the same photo at once both upload it
+        self.assertEqual(self.storage._save(name, ContentFile(b'png bytes')), name)
+        self.assertEqual(list(self.bucket.files), [name])
+
+    def test_exists_needs_the_exact_name(self):
+        self.storage.save('images/ab/abcdef.jpg', ContentFile(b'x'))
+        for name in ('images/ab/abc', 'images/ab/abcdef', 'images/abcdef.jpg', 'images/cd/abcdef.jpg'):
+            with self.subTest(name=name):
+                self.assertFalse(self.storage.exists(name))
+
+    def test_missing_files(self):
+        with self.assertRaises(FileNotFoundError):
+            self.storage.size('images/ab/missing.jpg')
+        self.storage.delete('images/ab/missing.jpg')
+
+    def test_delete(self):
+        name = self.storage.save('images/ab/abc.jpg', ContentFile(b'x'))
+        self.storage.delete(name)
+        self.assertFalse(self.storage.exists(name))
+
+    def test_url(self):
+        self.assertEqual(
+            images.url('images/ab/abc.webp'), f'{STUB_URL}/storage/v1/object/public/photos/images/ab/abc.webp',
+        )
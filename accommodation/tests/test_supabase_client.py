@@ -0,0 +1,92 @@
+import asyncio
+import gc
+import os
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from accommodation import supabase_client
+from accommodation.tests.supabase_stub import StubSupabaseClient
+
+
+@override_settings(SUPABASE_URL='https://stub.supabase.co', SUPABASE_KEY='anon', SUPABASE_SERVICE_KEY='service')
+class ClientRegistryTests(SimpleTestCase):
+
+    def setUp(self):
+        supabase_client.reset_clients()
+        self.addCleanup(supabase_client.reset_clients)
+        self.created = []
+
+        def create_client(url, key, options=None):
+            self.created.append((url, key))
+            return StubSupabaseClient(url)
+
+        async def create_async_client(url, key, options=None):
+            return create_client(url, key, options)
+
+        for name, fake in (('create_client', create_client), ('create_async_client', create_async_client)):
+            patcher = mock.patch.object(supabase_client, name, side_effect=fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_clients_are_reused(self):
+        client = supabase_client.get_supabase_client()
+        self.assertIs(supabase_client.get_supabase_client(), client)
+        self.assertEqual(self.created, [('https://stub.supabase.co', 'anon')])
+
+    def test_one_client_per_url_and_key(self):
+        anon = supabase_client.get_supabase_client()
+        service = supabase_client.get_supabase_service_client()
+        with self.settings(SUPABASE_URL='https://other.supabase.co'):
+            other = supabase_client.get_supabase_client()
+        self.assertEqual(len({id(anon), id(service), id(other)}), 3)
+        self.assertEqual(other.url, 'https://other.supabase.co')
+        with self.settings(SUPABASE_SERVICE_KEY=''):
+            # The service client falls back to the anon key
+            self.assertIs(supabase_client.get_supabase_service_client(), anon)
+
+    def test_missing_credentials(self):
+        with self.settings(SUPABASE_KEY=''), self.assertRaisesMessage(ValueError, 'URL and KEY'):
+            supabase_client.get_supabase_client()
+        with self.settings(SUPABASE_URL=''), self.assertRaisesMessage(ValueError, 'SERVICE_KEY'):
+            supabase_client.get_supabase_service_client()
+
+    def test_forked_children_build_their_own_clients(self):
+        client = supabase_client.get_supabase_client()
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                fresh = not supabase_client._clients and supabase_client.get_supabase_client() is not client
+                os.write(write, b'1' if fresh else b'0')
+            finally:
+                os._exit(0)
+        os.close(write)
+        with os.fdopen(read, 'rb') as result:
+            self.assertEqual(result.read(), b'1')
+        os.waitpid(pid, 0)
+        self.assertIs(supabase_client.get_supabase_client(), client)
+
+    def test_async_clients_are_kept_per_loop(self):
+        async def get_both():
+            return await supabase_client.get_async_supabase_client(), await supabase_client.get_async_supabase_client()
+
+        first, again = asyncio.run(get_both())
+        self.assertIs(first, again)
+        second, _ = asyncio.run(get_both())
+        self.assertIsNot(second, first)
+
+    def test_async_clients_of_closed_loops_are_dropped(self):
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(supabase_client.get_async_supabase_client())
+        self.assertIn(loop, supabase_client._async_clients)
+        loop.close()
+        asyncio.run(supabase_client.get_async_supabase_service_client())
+        self.assertNotIn(loop, supabase_client._async_clients)
+
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(supabase_client.get_async_supabase_client())
+        loop.close()
+        del loop
+        gc.collect()
+        self.assertEqual(len(supabase_client._async_clients), 0)
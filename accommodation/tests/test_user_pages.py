@@ -0,0 +1,114 @@
+import re
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from accommodation import async_views, benchmarks, dashboard
+from accommodation.models import User
+
+
+def _next_cursor(html):
+    match = re.search(r'cursor=([\w-]+)', html)
+    return match.group(1) if match else None
+
+
+class SearchUsersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = benchmarks.seed(accommodations=5, applications=0, users=30)
+        cls.jane = User.objects.create_user(
+            'jane', 'Jane.Doe@Example.com', 'pw', first_name='Jane', last_name='Doe', phone='+92 42 1234567',
+        )
+        cls.john = User.objects.create_user(
+            'john', 'jd@example.com', 'pw', first_name='John', last_name='Dover', role='admin',
+        )
+
+    def search(self, *args, **kwargs):
+        return [user.pk for user in dashboard.search_users(*args, **kwargs)]
+
+    def test_prefix_of_each_field(self):
+        for term in ('jane.d', 'JANE', 'doe', '+92 42', 'Jane Do'):
+            with self.subTest(term=term):
+                self.assertEqual(self.search(term), [self.jane.pk])
+
+    def test_full_name_needs_the_whole_first_name(self):
+        self.assertEqual(self.search('ja doe'), [])
+        self.assertEqual(self.search('john d'), [self.john.pk])
+
+    def test_not_a_substring_search(self):
+        self.assertEqual(self.search('example'), [])
+
+    def test_filters(self):
+        self.assertEqual(self.search('j', role='admin'), [self.john.pk])
+        self.assertEqual(set(self.search('', role='admin')), {self.john.pk, self.dataset.admin.pk})
+
+    def test_newest_first_across_pages(self):
+        first = dashboard.search_users(page_size=10)
+        second = dashboard.search_users(cursor=first.next_cursor, page_size=10)
+        users = list(User.objects.order_by('-date_joined', '-id').values_list('pk', flat=True))
+        self.assertEqual([user.pk for user in first] + [user.pk for user in second], users[:20])
+
+    def test_broad_terms_walk_the_join_order(self):
+        # Every seeded phone number starts with 0300
+        with mock.patch.object(dashboard, 'MAX_SEARCH_CANDIDATES', 5):
+            page = dashboard.search_users('0300', page_size=10)
+        expected = User.objects.filter(phone__startswith='0300').order_by('-date_joined', '-id')[:10]
+        self.assertEqual([user.pk for user in page], [user.pk for user in expected])
+        self.assertTrue(page.has_next)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class UserPagesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = benchmarks.seed(accommodations=30, applications=30, users=30)
+        cls.many = benchmarks.seed(accommodations=25, applications=25, users=1, random_seed=1)
+
+    def setUp(self):
+        self.client.force_login(self.dataset.admin)
+
+    def test_manage_users_pages_keep_the_filters(self):
+        response = self.client.get(reverse('manage_users'), {'role': 'user'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Next Page')
+        self.assertContains(response, 'role=user&amp;cursor=')
+        cursor = _next_cursor(response.content.decode())
+        response = self.client.get(reverse('manage_users'), {'role': 'user', 'cursor': cursor})
+        self.assertContains(response, 'First Page')
+        self.assertTrue(all(user.role == 'user' for user in response.context['users']))
+
+    def test_manage_users_ignores_unknown_filters_and_cursors(self):
+        response = self.client.get(reverse('manage_users'), {'role': 'owner', 'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['filters']['role'], '')
+
+    def test_view_user_pages_applications(self):
+        user = self.many.user
+        response = self.client.get(reverse('view_user', args=[user.pk]))
+        self.assertEqual(len(response.context['applications']), dashboard.DASHBOARD_PAGE_SIZE)
+        self.assertContains(response, 'Applications (25)')
+        self.assertContains(response, 'Older Applications')
+        cursor = _next_cursor(response.content.decode())
+        response = self.client.get(reverse('view_user', args=[user.pk]), {'cursor': cursor})
+        self.assertContains(response, 'Newest')
+
+    # Test transactions are not visible to the threads concurrent queries use
+    @override_settings(ASYNC_CONCURRENT_QUERIES=False)
+    def test_async_view_user_pages_applications(self):
+        factory = AsyncRequestFactory()
+
+        async def auser():
+            return self.dataset.admin
+
+        def get(**params):
+            request = factory.get(reverse('view_user', args=[self.many.user.pk]), params)
+            request.auser = auser
+            return async_to_sync(async_views.view_user)(request, user_id=self.many.user.pk)
+
+        html = get().content.decode()
+        self.assertEqual(html.count('View Details'), dashboard.DASHBOARD_PAGE_SIZE)
+        self.assertIn('Older Applications', html)
+        html = get(cursor=_next_cursor(html)).content.decode()
+        self.assertIn('Newest', html)
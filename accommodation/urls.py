@@ -1,5 +1,11 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, views
+
+if settings.ASYNC_VIEWS:
+    from . import async_views as read_views
+else:
+    read_views = views
 
 urlpatterns = [
     path('', views.index, name='index'),
@@ -8,18 +14,33 @@ urlpatterns = [
     path('auth/login/', views.auth_login, name='auth_login'),
     path('auth/signup/', views.auth_signup, name='auth_signup'),
     path('auth/logout/', views.auth_logout, name='auth_logout'),
-    path('accommodations/', views.accommodations, name='accommodations'),
-    path('my-applications/', views.my_applications, name='my_applications'),
+    path('accommodations/', read_views.accommodations, name='accommodations'),
+    path('accommodations/recommended/', views.recommended_accommodations, name='recommended_accommodations'),
+    path('api/search/', views.search_api, name='search_api'),
+    path('api/v1/accommodations/', api.accommodation_list, name='api_accommodation_list'),
+    path('api/v1/accommodations/<int:accommodation_id>/', api.accommodation_detail, name='api_accommodation_detail'),
+    path('api/v1/applications/', api.application_list, name='api_application_list'),
+    path('api/v1/applications/<int:application_id>/', api.application_detail, name='api_application_detail'),
+    path('api/v1/users/', api.user_list, name='api_user_list'),
+    path('api/v1/users/<int:user_id>/', api.user_detail, name='api_user_detail'),
+    path('my-applications/', read_views.my_applications, name='my_applications'),
     path('apply/<int:accommodation_id>/', views.apply_accommodation, name='apply_accommodation'),
-    path('admin/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin/', read_views.admin_dashboard, name='admin_dashboard'),
+    path('admin/cache-stats/', views.cache_stats, name='cache_stats'),
+    path('admin/query-stats/', views.query_stats, name='query_stats'),
     path('admin/accommodations/create/', views.create_accommodation, name='create_accommodation'),
+    path('admin/accommodations/import/', views.import_accommodations, name='import_accommodations'),
+    path('admin/accommodations/export/', views.export_accommodations, name='export_accommodations'),
     path('admin/accommodations/<int:accommodation_id>/edit/', views.edit_accommodation, name='edit_accommodation'),
     path('admin/accommodations/<int:accommodation_id>/delete/', views.delete_accommodation, name='delete_accommodation'),
+    path('admin/accommodations/<int:accommodation_id>/images/', views.upload_accommodation_images, name='upload_accommodation_images'),
+    path('admin/accommodations/<int:accommodation_id>/images/<int:image_id>/delete/', views.delete_accommodation_image, name='delete_accommodation_image'),
+    path('admin/applications/bulk-update-status/', views.bulk_update_application_status, name='bulk_update_application_status'),
     path('admin/applications/<int:application_id>/', views.view_application, name='view_application'),
     path('admin/applications/<int:application_id>/update-status/', views.update_application_status, name='update_application_status'),
     path('admin/users/', views.manage_users, name='manage_users'),
     path('admin/users/create/', views.create_user, name='create_user'),
-    path('admin/users/<int:user_id>/', views.view_user, name='view_user'),
+    path('admin/users/<int:user_id>/', read_views.view_user, name='view_user'),
     path('admin/users/<int:user_id>/edit/', views.edit_user, name='edit_user'),
     path('admin/users/<int:user_id>/delete/', views.delete_user, name='delete_user'),
 ]
@@ -1,13 +1,27 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.db.models import Q
-from django.http import JsonResponse
-from .models import Accommodation, Application, User
-from .forms import AccommodationForm, ApplicationForm, UserSignupForm
-
-
+from django.core.cache import cache as django_cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
+from urllib.parse import urlencode
+from .models import Accommodation, AccommodationImage, Application, User
+from . import bulk, cache, dashboard, facets, fulltext, geo, images, profiling, recommendations, reviews, tasks
+from .cache import cache_anonymous_page
+from .forms import AccommodationForm, ApplicationForm, ContactForm, UserSignupForm
+from .fulltext import SEARCH_PAGE_SIZE, tokenize
+from .pagination import InvalidCursor
+from .search import ListingQuery, search_listings
+
+
+@cache_anonymous_page()
 def index(request):
     """Home page"""
     return render(request, 'accommodation/index.html')
@@ -21,23 +35,16 @@ def auth_login(request):
         return redirect('accommodations')
     
     if request.method == 'POST':
-        email = request.POST.get('email')
-        password = request.POST.get('password')
+        # One indexed lookup on lower(email), see backends.EmailBackend
+        user = authenticate(request, email=request.POST.get('email'), password=request.POST.get('password'))
         
-        try:
-            user = User.objects.get(email=email)
-            user = authenticate(request, username=user.username, password=password)
-            
-            if user is not None:
-                login(request, user)
-                messages.success(request, f'Welcome back, {user.get_full_name() or user.email}!')
-                if user.role == 'admin':
-                    return redirect('admin_dashboard')
-                return redirect('accommodations')
-            else:
-                messages.error(request, 'Invalid email or password')
-        except User.DoesNotExist:
-            messages.error(request, 'Invalid email or password')
+        if user is not None:
+            login(request, user)
+            messages.success(request, f'Welcome back, {user.get_full_name() or user.email}!')
+            if user.role == 'admin':
+                return redirect('admin_dashboard')
+            return redirect('accommodations')
+        messages.error(request, 'Invalid email or password')
     
     return render(request, 'accommodation/auth.html', {'mode': 'login'})
 
@@ -70,51 +77,110 @@ def auth_logout(request):
 @login_required
 def accommodations(request):
     """Accommodation listing page with filters"""
-    accommodations_list = Accommodation.objects.all()
-    
-    # Apply filters
-    religious_filter = request.GET.get('religious_preference', '')
-    type_filter = request.GET.get('type', '')
-    location_search = request.GET.get('location', '')
+    query = ListingQuery.from_params(request.GET)
+    cursor = request.GET.get('cursor')
+    page_number = _page_number(request)
     
-    if religious_filter and religious_filter not in ['Any', '']:
-        accommodations_list = accommodations_list.filter(
-            Q(religious_preference=religious_filter) | Q(religious_preference='Any')
+    try:
+        page = cache.get_or_set(
+            (cache.ACCOMMODATIONS,),
+            ('listing', query.key(), cursor, page_number),
+            lambda: search_listings(query, cursor=cursor, page=page_number),
         )
+    except InvalidCursor:
+        # Stale or tampered cursor - start again from the first page
+        cursor, page_number = None, 1
+        page = search_listings(query)
     
-    if type_filter:
-        accommodations_list = accommodations_list.filter(type=type_filter)
+    context = {
+        'accommodations': page,
+        'page': page,
+        'grid_cache_key': cache.make_key(
+            (cache.ACCOMMODATIONS,), 'grid', query.key(), cursor, page_number, request.user.role
+        ),
+        'grid_cache_timeout': settings.LISTING_CACHE_TIMEOUT,
+        'next_page_query': query.next_page_querystring(page),
+        'first_page_query': query.querystring(),
+        'is_first_page': not (request.GET.get('cursor') or _page_number(request) > 1),
+        'religious_filter': query.religious_preference,
+        'type_filter': query.type,
+        'location_search': query.location,
+        'keywords': query.keywords,
+        'listing': query,
+        'sort_choices': query.sort_choices,
+        'radius_choices': geo.RADIUS_CHOICES,
+        'facets': facets.facet_options(query),
+    }
+    return render(request, 'accommodation/accommodations.html', context)
+
+
+@login_required
+def search_api(request):
+    """Ranked full-text search over accommodations as JSON"""
+    query = ListingQuery.from_params(request.GET)
+    if not query.keywords:
+        return JsonResponse({'error': 'The q parameter is required.'}, status=400)
+    if not tokenize(query.keywords):
+        return JsonResponse({'error': 'The q parameter must contain at least one word.'}, status=400)
+    # Results are always ranked and paged by number here
+    query.sort = ''
     
-    if location_search:
-        accommodations_list = accommodations_list.filter(
-            Q(location__icontains=location_search) | Q(address__icontains=location_search)
-        )
+    try:
+        page_size = min(max(int(request.GET.get('page_size', SEARCH_PAGE_SIZE)), 1), 100)
+    except ValueError:
+        page_size = SEARCH_PAGE_SIZE
     
+    page = search_listings(query, page=_page_number(request), page_size=page_size)
+    return JsonResponse({
+        'query': query.keywords,
+        'page': page.number,
+        'has_next': page.has_next,
+        'results': [
+            {
+                'id': accommodation.id,
+                'title': accommodation.title,
+                'type': accommodation.type,
+                'location': accommodation.location,
+                'price': str(accommodation.price),
+                'religious_preference': accommodation.religious_preference,
+                'status': accommodation.status,
+                'rank': accommodation.search_rank,
+            }
+            for accommodation in page
+        ],
+    })
+
+
+def _page_number(request):
+    return fulltext.page_number(request.GET.get('page', 1))
+
+
+@login_required
+def recommended_accommodations(request):
+    """Listings scored against the user's preference and past applications"""
     context = {
-        'accommodations': accommodations_list,
-        'religious_filter': religious_filter,
-        'type_filter': type_filter,
-        'location_search': location_search,
+        'accommodations': recommendations.recommend(request.user),
+        'has_history': request.user.total_applications > 0,
     }
-    return render(request, 'accommodation/accommodations.html', context)
+    return render(request, 'accommodation/recommendations.html', context)
 
 
 @login_required
 def my_applications(request):
     """User dashboard - view their own applications"""
-    applications_list = Application.objects.filter(user=request.user).order_by('-created_at')
-    
-    # Count by status
-    pending_count = applications_list.filter(status='Pending').count()
-    approved_count = applications_list.filter(status='Approved').count()
-    rejected_count = applications_list.filter(status='Rejected').count()
+    applications_list = (
+        Application.objects.filter(user=request.user)
+        .select_related('accommodation')
+        .order_by('-created_at')
+    )
     
+    # Status counts are denormalized onto the user row (see counters.py)
     context = {
         'applications': applications_list,
-        'pending_count': pending_count,
-        'approved_count': approved_count,
-        'rejected_count': rejected_count,
-        'total_count': applications_list.count(),
+        'pending_count': request.user.pending_applications,
+        'approved_count': request.user.approved_applications,
+        'rejected_count': request.user.rejected_applications,
+        'total_count': request.user.total_applications,
     }
     return render(request, 'accommodation/my_applications.html', context)
 
@@ -138,7 +204,9 @@ def apply_accommodation(request, accommodation_id):
             application.user_name = request.user.get_full_name() or request.user.email
             application.user_email = request.user.email
             application.user_phone = request.user.phone or form.cleaned_data.get('user_phone', '')
-            application.save()
+            # The counters and the notification job commit with the application
+            with transaction.atomic():
+                application.save()
             
             messages.success(request, 'Your application has been submitted successfully!')
             return redirect('accommodations')
@@ -162,25 +230,67 @@ def is_admin(user):
     return user.is_authenticated and user.role == 'admin'
 
 
+def dashboard_fragments():
+    """Cache keys of the admin.html fragments, invalidated with their data"""
+    return {
+        'fragment_cache_timeout': settings.LISTING_CACHE_TIMEOUT,
+        'stats_cache_key': cache.make_key(cache.NAMESPACES, 'admin_stats'),
+        'users_cache_key': cache.make_key((cache.USERS,), 'admin_users'),
+    }
+
+
+def fragment_cached(fragment_name, *vary_on):
+    """Whether a ``{% cache %}`` fragment is currently in the cache"""
+    return django_cache.get(make_template_fragment_key(fragment_name, vary_on)) is not None
+
+
 @login_required
 @user_passes_test(is_admin)
 def admin_dashboard(request):
     """Admin dashboard"""
-    accommodations_list = Accommodation.objects.all()
-    applications_list = Application.objects.all()
-    users_list = User.objects.all()
-    pending_count = applications_list.filter(status='Pending').count()
+    stats = cache.get_or_set(cache.NAMESPACES, ('dashboard_stats',), dashboard.headline_stats)
+    active_section = request.GET.get('section', 'accommodations')
+    
+    try:
+        accommodations_page = dashboard.recent_accommodations(cursor=request.GET.get('accommodations_cursor'))
+    except InvalidCursor:
+        accommodations_page = dashboard.recent_accommodations()
+    
+    try:
+        applications_page = dashboard.recent_applications(cursor=request.GET.get('applications_cursor'))
+    except InvalidCursor:
+        applications_page = dashboard.recent_applications()
     
     context = {
-        'accommodations': accommodations_list,
-        'applications': applications_list,
-        'users': users_list,
-        'pending_count': pending_count,
-        'total_users': users_list.count(),
+        'stats': stats,
+        'accommodations': accommodations_page,
+        'applications': applications_page,
+        # Only queried while rendering, if the users fragment is not cached
+        'users': dashboard.recent_users(),
+        'pending_count': stats['pending_applications'],
+        'total_users': stats['total_users'],
+        'active_section': active_section if active_section in ('accommodations', 'applications', 'users') else 'accommodations',
+        **dashboard_fragments(),
     }
     return render(request, 'accommodation/admin.html', context)
 
 
+@login_required
+@user_passes_test(is_admin)
+def cache_stats(request):
+    """Cache hit/miss counters for this worker process"""
+    return JsonResponse(cache.cache_stats())
+
+
+@login_required
+@user_passes_test(is_admin)
+def query_stats(request):
+    """Rolling per-endpoint query and timing statistics for this worker process"""
+    if request.method == 'POST':
+        profiling.reset_stats()
+    return JsonResponse(profiling.profiler_stats())
+
+
 @login_required
 @user_passes_test(is_admin)
 def create_accommodation(request):
@@ -197,6 +307,54 @@ def create_accommodation(request):
     return render(request, 'accommodation/create_accommodation.html', {'form': form})
 
 
+@login_required
+@user_passes_test(is_admin)
+def import_accommodations(request):
+    """Bulk create/update accommodations from an uploaded CSV or JSONL file"""
+    result = None
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if upload is None:
+            messages.error(request, 'Please choose a CSV or JSONL file to import.')
+        else:
+            fmt = request.POST.get('format') or bulk.guess_format(upload.name)
+            dry_run = bool(request.POST.get('dry_run'))
+            try:
+                bulk.check_encoding(upload.file)
+                result = bulk.import_accommodations(
+                    bulk.read_rows(bulk.text_stream(upload.file), fmt), dry_run=dry_run,
+                )
+            except bulk.ImportFormatError as exc:
+                messages.error(request, f'Could not read the file: {exc}')
+            else:
+                if result.read_error:
+                    messages.error(
+                        request, f'{result.read_error} The rows before it were {"validated" if dry_run else "imported"}.'
+                    )
+                elif result.failed:
+                    messages.error(request, f'{result.failed} row(s) were skipped because they are invalid.')
+                else:
+                    messages.success(request, 'Import finished without errors.')
+    
+    return render(request, 'accommodation/import_accommodations.html', {
+        'result': result,
+        'formats': bulk.FORMATS,
+    })
+
+
+@login_required
+@user_passes_test(is_admin)
+def export_accommodations(request):
+    """Stream every accommodation as CSV or JSONL"""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in bulk.FORMATS:
+        fmt = 'csv'
+    content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(bulk.export_accommodations(fmt), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="accommodations.{fmt}"'
+    return response
+
+
 @login_required
 @user_passes_test(is_admin)
 def edit_accommodation(request, accommodation_id):
@@ -212,7 +370,57 @@ def edit_accommodation(request, accommodation_id):
     else:
         form = AccommodationForm(instance=accommodation)
     
-    return render(request, 'accommodation/edit_accommodation.html', {'form': form, 'accommodation': accommodation})
+    return render(request, 'accommodation/edit_accommodation.html', {
+        'form': form,
+        'accommodation': accommodation,
+        'photos': accommodation.photos.all(),
+    })
+
+
+@login_required
+@user_passes_test(is_admin)
+def upload_accommodation_images(request, accommodation_id):
+    """Upload photos for an accommodation"""
+    accommodation = get_object_or_404(Accommodation, id=accommodation_id)
+    
+    if request.method == 'POST':
+        uploaded = 0
+        for upload in request.FILES.getlist('images'):
+            try:
+                with transaction.atomic():
+                    image, created = images.add_image(accommodation, upload, alt=request.POST.get('alt', ''))
+                    if created:
+                        tasks.image_uploaded(image)
+            except images.ImageError as exc:
+                messages.error(request, f'{upload.name}: {exc}')
+                continue
+            uploaded += created
+        if uploaded:
+            messages.success(request, f'{uploaded} photo{"s" if uploaded != 1 else ""} uploaded. Resized versions will appear shortly.')
+    
+    return redirect('edit_accommodation', accommodation_id=accommodation.id)
+
+
+@login_required
+@user_passes_test(is_admin)
+def delete_accommodation_image(request, accommodation_id, image_id):
+    """Delete one photo of an accommodation"""
+    image = get_object_or_404(AccommodationImage, id=image_id, accommodation_id=accommodation_id)
+    
+    if request.method == 'POST':
+        with transaction.atomic():
+            image.delete()
+            images.refresh_manifest(accommodation_id)
+        messages.success(request, 'Photo deleted.')
+    
+    return redirect('edit_accommodation', accommodation_id=accommodation_id)
+
+
+def image_file(request, path):
+    """Serve a content-addressed image from MEDIA_ROOT with far-future caching"""
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    patch_cache_control(response, public=True, max_age=settings.IMAGE_CACHE_MAX_AGE, immutable=True)
+    return response
 
 
 @login_required
@@ -239,12 +447,50 @@ def update_application_status(request, application_id):
         status = request.POST.get('status')
         if status in ['Pending', 'Approved', 'Rejected']:
             application.status = status
-            application.save()
+            application.save(update_fields=['status', 'updated_at'])
             messages.success(request, f'Application {status.lower()}!')
     
     return redirect('admin_dashboard')
 
 
+@login_required
+@user_passes_test(is_admin)
+def bulk_update_application_status(request):
+    """Approve or reject many applications at once"""
+    if request.method != 'POST':
+        return redirect('admin_dashboard')
+    
+    status = request.POST.get('status')
+    ids = [value for value in request.POST.getlist('application_ids') if value.isdigit()]
+    accommodation_id = request.POST.get('accommodation_id', '')
+    
+    if status not in reviews.STATUSES:
+        messages.error(request, 'Please choose a valid status.')
+    elif accommodation_id.isdigit():
+        # "All pending applications for this accommodation"
+        result = reviews.update_statuses(
+            Application.objects.filter(accommodation_id=accommodation_id, status='Pending'), status
+        )
+        messages.success(request, f'{result.updated} pending application(s) marked {status.lower()}.')
+    elif ids:
+        result = reviews.update_statuses(
+            Application.objects.filter(pk__in=ids),
+            status,
+            reject_competing=bool(request.POST.get('reject_competing')),
+        )
+        summary = f'{result.updated} application(s) marked {status.lower()}.'
+        if result.rejected_competing or result.occupied:
+            summary += (
+                f' {result.rejected_competing} competing application(s) rejected,'
+                f' {result.occupied} accommodation(s) marked occupied.'
+            )
+        messages.success(request, summary)
+    else:
+        messages.error(request, 'Select at least one application.')
+    
+    return redirect(f"{reverse('admin_dashboard')}?section=applications")
+
+
 @login_required
 @user_passes_test(is_admin)
 def view_application(request, application_id):
@@ -256,9 +502,36 @@ def view_application(request, application_id):
 @login_required
 @user_passes_test(is_admin)
 def manage_users(request):
-    """List all users"""
-    users_list = User.objects.all().order_by('-date_joined')
-    return render(request, 'accommodation/manage_users.html', {'users': users_list})
+    """Search and page through users, newest first"""
+    filters = {
+        'q': request.GET.get('q', '').strip()[:100],
+        'role': request.GET.get('role', ''),
+        'religious_preference': request.GET.get('religious_preference', ''),
+    }
+    role_choices = User._meta.get_field('role').choices
+    religion_choices = User._meta.get_field('religious_preference').choices
+    if filters['role'] not in dict(role_choices):
+        filters['role'] = ''
+    if filters['religious_preference'] not in dict(religion_choices):
+        filters['religious_preference'] = ''
+    
+    search_filters = (filters['q'], filters['role'], filters['religious_preference'])
+    try:
+        users_page = dashboard.search_users(*search_filters, cursor=request.GET.get('cursor'))
+    except InvalidCursor:
+        users_page = dashboard.search_users(*search_filters)
+    
+    filter_params = {name: value for name, value in filters.items() if value}
+    context = {
+        'users': users_page,
+        'filters': filters,
+        'role_choices': role_choices,
+        'religion_choices': religion_choices,
+        'filter_query': urlencode(filter_params),
+        'next_page_query': urlencode({**filter_params, 'cursor': users_page.next_cursor}) if users_page.has_next else '',
+        'is_first_page': not request.GET.get('cursor'),
+    }
+    return render(request, 'accommodation/manage_users.html', context)
 
 
 @login_required
@@ -282,10 +555,15 @@ def create_user(request):
 def view_user(request, user_id):
     """View user details and their applications"""
     user = get_object_or_404(User, id=user_id)
-    user_applications = Application.objects.filter(user=user).order_by('-created_at')
+    try:
+        applications_page = dashboard.user_applications(user.pk, cursor=request.GET.get('cursor'))
+    except InvalidCursor:
+        applications_page = dashboard.user_applications(user.pk)
+    # Counts come from the denormalized counters on the user row
     return render(request, 'accommodation/view_user.html', {
         'user_obj': user,
-        'applications': user_applications
+        'applications': applications_page,
+        'is_first_page': not request.GET.get('cursor'),
     })
 
 
@@ -303,6 +581,11 @@ def edit_user(request, user_id):
         user.role = request.POST.get('role', user.role)
         user.religious_preference = request.POST.get('religious_preference', user.religious_preference) or None
         user.is_active = request.POST.get('is_active') == 'on'
+        try:
+            user.validate_constraints()
+        except ValidationError as exc:
+            messages.error(request, ' '.join(exc.messages))
+            return render(request, 'accommodation/edit_user.html', {'user_obj': user})
         user.save()
         messages.success(request, 'User updated successfully!')
         return redirect('view_user', user_id=user.id)
@@ -327,6 +610,7 @@ def delete_user(request, user_id):
     return render(request, 'accommodation/delete_user.html', {'user_obj': user})
 
 
+@cache_anonymous_page()
 def about(request):
     """About page"""
     return render(request, 'accommodation/about.html')
@@ -335,14 +619,14 @@ def about(request):
 def contact(request):
     """Contact page"""
     if request.method == 'POST':
-        name = request.POST.get('name')
-        email = request.POST.get('email')
-        subject = request.POST.get('subject')
-        message = request.POST.get('message')
-        
-        # Here you can add email sending logic or save to database
-        messages.success(request, 'Thank you for contacting us! We will get back to you soon.')
-        return redirect('contact')
+        form = ContactForm(request.POST)
+        if form.is_valid():
+            # Saved right away; the staff email is sent by the job queue
+            with transaction.atomic():
+                tasks.contact_message_received(form.save())
+            messages.success(request, 'Thank you for contacting us! We will get back to you soon.')
+            return redirect('contact')
+        messages.error(request, 'Please fill in every field with a valid email address.')
     
     return render(request, 'accommodation/contact.html')
 
@@ -0,0 +1,17 @@
+"""
+Gunicorn profile for serving the project over ASGI
+
+    gunicorn -c gunicorn_asgi.conf.py
+
+Runs uvicorn workers and switches on the async read views
+(accommodation/async_views.py).
+"""
+import os
+
+wsgi_app = 'harmony_housing.asgi:application'
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+bind = '0.0.0.0:' + os.environ.get('PORT', '8000')
+accesslog = '-'
+
+os.environ.setdefault('ASYNC_VIEWS', 'True')
@@ -0,0 +1,190 @@
+"""
+PostgreSQL backend that borrows connections from an in-process pool
+
+Django opens a connection on the first query of a request and closes it when
+the request finishes (CONN_MAX_AGE = 0). With this backend "closing" hands
+the connection back to a per-process pool instead, so the next request
+skips the TCP + TLS + auth handshake with the Supabase pooler.
+
+Configured through the ``POOL`` key of the database settings::
+
+    'POOL': {
+        'MAX_SIZE': 4,     # connections per worker process
+        'TIMEOUT': 10,     # seconds to wait for a free connection
+        'MAX_IDLE': 300,   # drop connections idle for longer than this
+    }
+
+With ``CONN_HEALTH_CHECKS`` enabled every borrowed connection is checked
+with ``SELECT 1`` before use and silently replaced if it has gone away.
+"""
+import os
+import threading
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresDatabaseWrapper
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+# psycopg2's TRANSACTION_STATUS_IDLE and psycopg 3's TransactionStatus.IDLE
+TRANSACTION_STATUS_IDLE = 0
+
+DEFAULT_POOL_SETTINGS = {
+    'MAX_SIZE': 4,
+    'TIMEOUT': 10,
+    'MAX_IDLE': 300,
+}
+
+
+class PoolTimeout(DatabaseError):
+    """No connection became available within the pool timeout"""
+
+
+class ConnectionPool:
+    """A small thread-safe LIFO pool of open psycopg connections"""
+
+    def __init__(self, connect, max_size, timeout, max_idle):
+        self._connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle = []
+        self._size = 0
+        self._condition = threading.Condition()
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    def get(self):
+        deadline = time.monotonic() + self.timeout
+        with self._condition:
+            while True:
+                while self._idle:
+                    connection, released_at = self._idle.pop()
+                    if time.monotonic() - released_at <= self.max_idle and not connection.closed:
+                        return connection
+                    self._discard(connection)
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    raise PoolTimeout(
+                        f'No database connection available after {self.timeout}s '
+                        f'(pool size {self.max_size})'
+                    )
+        try:
+            return self._connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def put(self, connection, discard=False):
+        if not discard and not connection.closed:
+            try:
+                _reset(connection)
+            except Exception:
+                discard = True
+        with self._condition:
+            if discard or connection.closed:
+                self._discard(connection)
+            else:
+                self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def _discard(self, connection):
+        self._size -= 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        with self._condition:
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+
+
+def _reset(connection):
+    """Leave no transaction open on a connection going back to the pool"""
+    if connection.info.transaction_status != TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, pool_settings, connect):
+    # Keyed by pid so a forked gunicorn worker never shares sockets with its parent
+    key = (alias, os.getpid())
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(
+                    connect,
+                    max_size=pool_settings['MAX_SIZE'],
+                    timeout=pool_settings['TIMEOUT'],
+                    max_idle=pool_settings['MAX_IDLE'],
+                )
+    return pool
+
+
+class DatabaseWrapper(PostgresDatabaseWrapper):
+
+    def __init__(self, settings_dict, alias=None):
+        super().__init__(settings_dict, alias)
+        if settings_dict.get('CONN_MAX_AGE'):
+            raise ImproperlyConfigured(
+                'The pooled PostgreSQL backend manages connection reuse itself; '
+                'set CONN_MAX_AGE to 0.'
+            )
+        self.pool_settings = {**DEFAULT_POOL_SETTINGS, **settings_dict.get('POOL', {})}
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.pool_settings, self._open_pooled_connection)
+
+    def _open_pooled_connection(self):
+        return super().get_new_connection(self.get_connection_params())
+
+    def get_new_connection(self, conn_params):
+        # Mirrors the isolation level bookkeeping of the parent class, which
+        # only runs for brand new connections
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = (
+            IsolationLevel(isolation_level) if isolation_level is not None
+            else IsolationLevel.READ_COMMITTED
+        )
+
+        pool = self.pool
+        for _ in range(pool.max_size + 1):
+            connection = pool.get()
+            if not self.settings_dict['CONN_HEALTH_CHECKS'] or self._ping(connection):
+                return connection
+            pool.put(connection, discard=True)
+        raise PoolTimeout('Could not obtain a healthy database connection from the pool')
+
+    @staticmethod
+    def _ping(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            _reset(connection)
+            return True
+        except Exception:
+            return False
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.put(self.connection)
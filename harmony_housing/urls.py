@@ -1,11 +1,15 @@
 """
 URL configuration for harmony_housing project.
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from accommodation import views as accommodation_views
+
 # Custom admin site branding
 admin.site.site_header = "Harmony Housing System Admin"
 admin.site.site_title = "System Admin"
@@ -16,6 +20,14 @@ urlpatterns = [
     path('', include('accommodation.urls')),  # Custom admin dashboard at /admin/
 ]
 
+if settings.IMAGE_STORAGE == 'django.core.files.storage.FileSystemStorage':
+    # Photos stored under MEDIA_ROOT have content-hash names and never change
+    urlpatterns.insert(0, re_path(
+        r'^%s(?P<path>images/.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')),
+        accommodation_views.image_file,
+        name='image_file',
+    ))
+
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -10,3 +10,10 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'harmony_housing.settings')
 
 application = get_wsgi_application()
 
+from accommodation.cache import warn_if_private  # noqa: E402
+from accommodation.templating import warm_templates  # noqa: E402
+
+# Compile the templates before the first request instead of during it
+warm_templates()
+warn_if_private()
+